@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, current_app
+from flask_jwt_extended import get_jwt_identity
+from pymongo import UpdateOne
+from src.config import Config
+
+class ResponseCache:
+    """Cache LRU limitado com TTL por entrada e invalidação por tag"""
+
+    def __init__(self, max_entries=1024, default_ttl=30):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # chave -> (expira_em, valor, tags)
+        self._tags = {}  # tag -> {chaves}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expira_em, valor, _ = entry
+            if expira_em <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return valor
+
+    def set(self, key, valor, ttl=None, tags=()):
+        expira_em = time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expira_em, valor, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                antiga = next(iter(self._entries))
+                self._remove(antiga)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate(self, *tags):
+        """Remover todas as entradas marcadas com as tags"""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            chaves = self._tags.get(tag)
+            if chaves is not None:
+                chaves.discard(key)
+                if not chaves:
+                    del self._tags[tag]
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+# Cache de respostas do processo (cada worker tem o seu)
+response_cache = ResponseCache(
+    max_entries=Config.CACHE_MAX_ENTRIES,
+    default_ttl=Config.CACHE_DEFAULT_TTL
+)
+
+def geracoes(tags):
+    """Geração atual de cada tag, compartilhada entre os workers (None se indisponível)"""
+    # Cada worker tem o seu cache; a geração no MongoDB (uma leitura por _id)
+    # faz a escrita feita em um worker invalidar a resposta guardada nos outros.
+    if not tags or not Config.CACHE_SHARED_INVALIDATION:
+        return ()
+    from src.database import db
+    try:
+        atuais = {doc["_id"]: doc.get("geracao", 0) for doc in db.cache_geracoes.find({"_id": {"$in": list(tags)}})}
+    except Exception as e:
+        logging.error(f"Erro ao consultar gerações do cache: {e}")
+        return None
+    return tuple(atuais.get(tag, 0) for tag in tags)
+
+def invalidate(*tags):
+    """Invalidar respostas em cache após uma escrita (neste e nos demais workers)"""
+    response_cache.invalidate(*tags)
+    if not tags or not Config.CACHE_SHARED_INVALIDATION:
+        return
+    from src.database import db
+    try:
+        db.cache_geracoes.bulk_write(
+            [UpdateOne({"_id": tag}, {"$inc": {"geracao": 1}}, upsert=True) for tag in tags],
+            ordered=False
+        )
+    except Exception as e:
+        logging.error(f"Erro ao publicar invalidação do cache: {e}")
+
+def cached(ttl=None, tags=(), per_user=False):
+    """Decorator para cachear respostas GET de uma view (usar abaixo de jwt_required)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+
+            escopo = f"user:{get_jwt_identity()}" if per_user else "global"
+            key = f"{request.endpoint}|{request.full_path}|{escopo}"
+
+            # Geração lida antes da view: uma escrita concorrente invalida o que for guardado
+            geracao = geracoes(tags)
+            hit = response_cache.get(key) if geracao is not None else None
+            if hit is not None and hit[3] == geracao:
+                data, status, mimetype, _ = hit
+                response = current_app.response_class(data, status=status, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough and geracao is not None:
+                response_cache.set(
+                    key, (response.get_data(), response.status_code, response.mimetype, geracao), ttl, tags
+                )
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,151 @@
+import logging
+import re
+import threading
+from datetime import datetime
+from src.cache import ResponseCache
+from src.config import Config
+
+_FIM_FRASE = re.compile(r"(?<=[.!?])\s")
+
+def estimar_tokens(texto):
+    """Estimativa barata de tokens (~4 caracteres por token)"""
+    return max(1, len(texto or "") // 4)
+
+def _primeira_frase(texto, limite=200):
+    texto = " ".join((texto or "").split())
+    frase = _FIM_FRASE.split(texto, 1)[0]
+    return frase if len(frase) <= limite else frase[:limite].rstrip() + "…"
+
+class ChatSessoes:
+    """Memória de conversas por (usuário, sessão): LRU no processo + MongoDB com TTL"""
+    # Os turnos recentes vão inteiros para o prompt; os antigos são
+    # compactados em um resumo de tamanho fixo, então o prompt não cresce
+    # com a duração da conversa.
+
+    def __init__(self):
+        self._cache = ResponseCache(
+            max_entries=Config.CHAT_SESSOES_MAX,
+            default_ttl=Config.CHAT_SESSAO_IDLE_SECONDS
+        )
+        self._lock = threading.Lock()
+        self.metricas = {"carregadas_memoria": 0, "carregadas_mongo": 0, "novas": 0, "conflitos": 0, "compactacoes": 0}
+
+    @staticmethod
+    def chave(user, sessao_id):
+        return f"{user}:{sessao_id}"
+
+    def _contar(self, metrica):
+        with self._lock:
+            self.metricas[metrica] += 1
+
+    @staticmethod
+    def _nova(user, sessao_id):
+        return {
+            "user": str(user),
+            "sessao_id": sessao_id,
+            "resumo": "",
+            "turnos": [],
+            "tokens_usados": 0,
+            "criado_em": datetime.utcnow(),
+            "versao": 0
+        }
+
+    def carregar(self, user, sessao_id):
+        """Sessão existente ou nova (versao 0)"""
+        from src.models import ChatSessao
+
+        chave = self.chave(user, sessao_id)
+        sessao = self._cache.get(chave)
+        # A cópia local só vale se a versão no MongoDB é a mesma: outro worker
+        # pode ter gravado um turno ou removido a sessão
+        if sessao is not None and sessao.get("versao", 0) == ChatSessao.versao(chave):
+            self._contar("carregadas_memoria")
+            return dict(sessao)
+
+        sessao = ChatSessao.get(chave)
+        if sessao is not None:
+            self._contar("carregadas_mongo")
+        else:
+            self._contar("novas")
+            sessao = self._nova(user, sessao_id)
+        self._cache.set(chave, sessao)
+        return dict(sessao)
+
+    def excedeu_orcamento(self, sessao):
+        return sessao.get("tokens_usados", 0) >= Config.CHAT_SESSAO_MAX_TOKENS
+
+    def mensagens(self, sessao, sistema, prompt):
+        """Mensagens do prompt: sistema, resumo, turnos recentes que cabem no orçamento e a pergunta"""
+        mensagens = [{"role": "system", "content": sistema}]
+        disponivel = Config.CHAT_TOKENS_CONTEXTO - estimar_tokens(sistema) - estimar_tokens(prompt)
+        if sessao.get("resumo"):
+            resumo = f"Resumo da conversa até aqui:\n{sessao['resumo']}"
+            mensagens.append({"role": "system", "content": resumo})
+            disponivel -= estimar_tokens(resumo)
+
+        janela = []
+        for turno in reversed(sessao.get("turnos", [])):
+            if turno["tokens"] > disponivel:
+                break
+            janela.append({"role": turno["papel"], "content": turno["texto"]})
+            disponivel -= turno["tokens"]
+        mensagens.extend(reversed(janela))
+        mensagens.append({"role": "user", "content": prompt})
+        return mensagens
+
+    def _compactar(self, sessao):
+        """Mover turnos fora da janela para o resumo (mantendo o mais recente)"""
+        turnos = sessao["turnos"]
+        if len(turnos) <= Config.CHAT_JANELA_TURNOS:
+            return
+        antigos, sessao["turnos"] = turnos[:-Config.CHAT_JANELA_TURNOS], turnos[-Config.CHAT_JANELA_TURNOS:]
+
+        linhas = sessao["resumo"].split("\n") if sessao.get("resumo") else []
+        for turno in antigos:
+            autor = "Vendedor" if turno["papel"] == "user" else "IA"
+            linhas.append(f"{autor}: {_primeira_frase(turno['texto'])}")
+        while len(linhas) > 1 and estimar_tokens("\n".join(linhas)) > Config.CHAT_TOKENS_RESUMO:
+            linhas.pop(0)
+        sessao["resumo"] = "\n".join(linhas)[-Config.CHAT_TOKENS_RESUMO * 4:]
+        self._contar("compactacoes")
+
+    def registrar(self, sessao, pergunta, resposta, tokens_usados=0):
+        """Acrescentar o turno e gravar (relendo do MongoDB se outro worker gravou antes)"""
+        from src.models import ChatSessao
+
+        chave = self.chave(sessao["user"], sessao["sessao_id"])
+        agora = datetime.utcnow()
+        for _ in range(3):
+            nova = dict(sessao)
+            nova["turnos"] = list(sessao.get("turnos", [])) + [
+                {"papel": "user", "texto": pergunta, "tokens": estimar_tokens(pergunta), "em": agora},
+                {"papel": "assistant", "texto": resposta, "tokens": estimar_tokens(resposta), "em": agora}
+            ]
+            nova["tokens_usados"] = sessao.get("tokens_usados", 0) + (tokens_usados or 0)
+            self._compactar(nova)
+
+            if ChatSessao.salvar(chave, nova, sessao.get("versao", 0), Config.CHAT_SESSAO_TTL_SECONDS):
+                nova["versao"] = sessao.get("versao", 0) + 1
+                self._cache.set(chave, nova)
+                return nova
+
+            self._contar("conflitos")
+            # Removida ou expirada por outro worker: recomeçar em vez de ressuscitar o histórico
+            sessao = ChatSessao.get(chave) or self._nova(sessao["user"], sessao["sessao_id"])
+
+        logging.warning(f"Sessão de chat {chave} não gravada após conflitos")
+        self._cache.delete(chave)
+        return sessao
+
+    def remover(self, user, sessao_id):
+        from src.models import ChatSessao
+
+        chave = self.chave(user, sessao_id)
+        self._cache.delete(chave)
+        return ChatSessao.remover(chave)
+
+    def stats(self):
+        with self._lock:
+            return {**self.metricas, "memoria": self._cache.stats()}
+
+chat_sessoes = ChatSessoes()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,6 +8,110 @@ class Config:
     # MongoDB Configuration
     MONGODB_URI = os.environ.get('MONGODB_URI') or 'mongodb://localhost:27017/vip_mudancas'
     
+    # Pool de conexões do MongoDB (por processo)
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '50'))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '30000'))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+    # Ex.: "zstd,snappy,zlib" (zstd e snappy exigem pacotes extras)
+    MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', 'zlib')
+    
+    # Servidor de produção (gunicorn)
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '4'))
+    WEB_THREADS = int(os.environ.get('WEB_THREADS', '4'))
+    WEB_BIND = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+    
+    # Numeração sequencial: números reservados por processo a cada ida ao banco
+    SEQUENCE_BLOCK_SIZE = int(os.environ.get('SEQUENCE_BLOCK_SIZE', '10'))
+    
+    # Cache de respostas (por processo)
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '1024'))
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', '30'))
+    # Invalidação entre workers: geração por tag no MongoDB, conferida a cada leitura
+    CACHE_SHARED_INVALIDATION = os.environ.get('CACHE_SHARED_INVALIDATION', 'true').lower() == 'true'
+    
+    # Autocomplete: intervalo de sincronização incremental do índice em memória
+    TYPEAHEAD_REFRESH_SECONDS = int(os.environ.get('TYPEAHEAD_REFRESH_SECONDS', '30'))
+    
+    # Monitoramento de licitações em background
+    MONITOR_ENABLED = os.environ.get('MONITOR_ENABLED', 'True').lower() == 'true'
+    MONITOR_INTERVALO_MINUTOS = int(os.environ.get('MONITOR_INTERVALO_MINUTOS', '60'))
+    MONITOR_MAX_CONCURRENCY = int(os.environ.get('MONITOR_MAX_CONCURRENCY', '2'))
+    MONITOR_TICK_SECONDS = int(os.environ.get('MONITOR_TICK_SECONDS', '30'))
+    MONITOR_LEASE_SECONDS = int(os.environ.get('MONITOR_LEASE_SECONDS', '600'))
+    
+    # Busca nos portais: "ComprasNet=https://...,SIGA-RJ=https://..." (sem URL usa dados simulados)
+    PORTAL_ENDPOINTS = dict(
+        item.split('=', 1) for item in os.environ.get('PORTAL_ENDPOINTS', '').split(',') if '=' in item
+    )
+    FETCH_PAGES_PER_PORTAL = int(os.environ.get('FETCH_PAGES_PER_PORTAL', '5'))
+    FETCH_MAX_CONNECTIONS = int(os.environ.get('FETCH_MAX_CONNECTIONS', '50'))
+    FETCH_PER_HOST_CONCURRENCY = int(os.environ.get('FETCH_PER_HOST_CONCURRENCY', '4'))
+    FETCH_RATE_PER_HOST = float(os.environ.get('FETCH_RATE_PER_HOST', '5'))
+    FETCH_CONNECT_TIMEOUT = float(os.environ.get('FETCH_CONNECT_TIMEOUT', '5'))
+    FETCH_TIMEOUT = float(os.environ.get('FETCH_TIMEOUT', '60'))
+    FETCH_SWEEP_TIMEOUT = float(os.environ.get('FETCH_SWEEP_TIMEOUT', '300'))
+
+    # Editais: download em disco e extração de texto em processos separados
+    EDITAL_DIR = os.environ.get('EDITAL_DIR') or os.path.join(tempfile.gettempdir(), 'vip_editais')
+    EDITAL_MAX_BYTES = int(os.environ.get('EDITAL_MAX_BYTES', str(150 * 1024 * 1024)))
+    EDITAL_MAX_CARACTERES = int(os.environ.get('EDITAL_MAX_CARACTERES', '5000000'))
+    EDITAL_MAX_TERMOS = int(os.environ.get('EDITAL_MAX_TERMOS', '20000'))
+    EDITAL_WORKERS = int(os.environ.get('EDITAL_WORKERS', '2'))
+    EDITAL_LOTE = int(os.environ.get('EDITAL_LOTE', '10'))
+    EDITAL_LEASE_SECONDS = int(os.environ.get('EDITAL_LEASE_SECONDS', '1800'))
+    EDITAL_MAX_TENTATIVAS = int(os.environ.get('EDITAL_MAX_TENTATIVAS', '3'))
+
+    # Similaridade de licitações (TF-IDF) salva em disco para carga rápida
+    TFIDF_PATH = os.environ.get('TFIDF_PATH') or os.path.join(tempfile.gettempdir(), 'vip_tfidf', 'licitacoes.npz')
+    TFIDF_REFRESH_SECONDS = int(os.environ.get('TFIDF_REFRESH_SECONDS', '60'))
+
+    # IA Mirante: cliente LLM compartilhado (OPENAI_BASE_URL permite apontar para um servidor local)
+    OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL')
+    LLM_MODEL = os.environ.get('LLM_MODEL', 'gpt-3.5-turbo')
+    LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', '3'))
+    LLM_READ_TIMEOUT = float(os.environ.get('LLM_READ_TIMEOUT', '20'))
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '8'))
+    # Vagas por processo que jobs em background não usam (ficam para as requisições)
+    LLM_RESERVA_INTERATIVA = int(os.environ.get('LLM_RESERVA_INTERATIVA', '1'))
+    LLM_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', '2'))
+    LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', '0'))
+    # Prazo total por chamada; com LLM_HEDGE_AFTER_MS > 0 uma segunda tentativa
+    # é disparada quando a primeira passa desse tempo (0 desativa)
+    LLM_LATENCY_BUDGET = float(os.environ.get('LLM_LATENCY_BUDGET', '12'))
+    LLM_HEDGE_AFTER_MS = int(os.environ.get('LLM_HEDGE_AFTER_MS', '0'))
+    # Circuito: abre após N falhas seguidas e recusa chamadas pelo intervalo
+    LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES', '5'))
+    LLM_BREAKER_OPEN_SECONDS = float(os.environ.get('LLM_BREAKER_OPEN_SECONDS', '30'))
+    LLM_METRICS_SAMPLES = int(os.environ.get('LLM_METRICS_SAMPLES', '1024'))
+    
+    # Memorização das respostas da IA: LRU no processo + MongoDB com TTL
+    IA_CACHE_TTL_SECONDS = int(os.environ.get('IA_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+    IA_CACHE_MAX_ENTRIES = int(os.environ.get('IA_CACHE_MAX_ENTRIES', '2048'))
+    
+    # Classificação de perfil em lote (clientes sem perfil ou com perfil vencido)
+    PERFIL_VALIDADE_DIAS = int(os.environ.get('PERFIL_VALIDADE_DIAS', '90'))
+    PERFIL_LOTE_CHUNK = int(os.environ.get('PERFIL_LOTE_CHUNK', '100'))
+    PERFIL_LOTE_CONCURRENCY = int(os.environ.get('PERFIL_LOTE_CONCURRENCY', '2'))
+    PERFIL_LOTE_LEASE_SECONDS = int(os.environ.get('PERFIL_LOTE_LEASE_SECONDS', '300'))
+    # Pré-classificação por regras: acima desta confiança o LLM não é chamado
+    # (1.01 desativa). Pesos no formato "empresa=1.5,email_pessoal=-0.5"
+    PERFIL_CONFIANCA_MINIMA = float(os.environ.get('PERFIL_CONFIANCA_MINIMA', '0.7'))
+    PERFIL_PESOS = {
+        chave.strip(): float(valor)
+        for chave, valor in (item.split('=', 1) for item in os.environ.get('PERFIL_PESOS', '').split(',') if '=' in item)
+    }
+    
+    # Sessões de chat: janela de turnos recentes + resumo, com orçamento de tokens
+    CHAT_JANELA_TURNOS = int(os.environ.get('CHAT_JANELA_TURNOS', '6'))
+    CHAT_TOKENS_CONTEXTO = int(os.environ.get('CHAT_TOKENS_CONTEXTO', '1500'))
+    CHAT_TOKENS_RESUMO = int(os.environ.get('CHAT_TOKENS_RESUMO', '300'))
+    CHAT_SESSAO_MAX_TOKENS = int(os.environ.get('CHAT_SESSAO_MAX_TOKENS', '50000'))
+    CHAT_SESSAO_IDLE_SECONDS = int(os.environ.get('CHAT_SESSAO_IDLE_SECONDS', '1800'))
+    CHAT_SESSAO_TTL_SECONDS = int(os.environ.get('CHAT_SESSAO_TTL_SECONDS', '86400'))
+    CHAT_SESSOES_MAX = int(os.environ.get('CHAT_SESSOES_MAX', '1000'))
+
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'vip-mudancas-secret-key-2024'
     JWT_ACCESS_TOKEN_EXPIRES = False  # Token não expira
@@ -1,3 +1,5 @@
+import os
+import threading
 from pymongo import MongoClient
 from src.config import Config
 import logging
@@ -6,42 +8,111 @@ class Database:
     _instance = None
     _client = None
     _db = None
-    
+    _pid = None
+    _lock = threading.Lock()
+    _indexes_ready = False
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Database, cls).__new__(cls)
         return cls._instance
-    
-    def __init__(self):
-        if self._client is None:
-            try:
-                self._client = MongoClient(Config.MONGODB_URI)
-                # Extrair nome do banco da URI ou usar padrão
-                db_name = Config.MONGODB_URI.split('/')[-1] if '/' in Config.MONGODB_URI else 'vip_mudancas'
-                self._db = self._client[db_name]
-                
-                # Testar conexão
-                self._client.admin.command('ping')
-                logging.info(f"Conectado ao MongoDB: {db_name}")
-                
-            except Exception as e:
-                logging.error(f"Erro ao conectar com MongoDB: {e}")
-                # Fallback para MongoDB local
-                self._client = MongoClient('mongodb://localhost:27017/')
-                self._db = self._client['vip_mudancas']
-    
+
+    def _connect(self):
+        """Criar o cliente do processo atual (sem bloquear em ping)"""
+        options = {
+            "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+            "connectTimeoutMS": Config.MONGO_CONNECT_TIMEOUT_MS,
+            "socketTimeoutMS": Config.MONGO_SOCKET_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "connect": False
+        }
+        if Config.MONGO_COMPRESSORS:
+            options["compressors"] = Config.MONGO_COMPRESSORS
+
+        client = MongoClient(Config.MONGODB_URI, **options)
+        # Nome do banco vem da URI; padrão vip_mudancas
+        Database._db = client.get_default_database(default='vip_mudancas')
+        Database._client = client
+        Database._pid = os.getpid()
+        logging.info(f"Cliente MongoDB criado para o processo {Database._pid}: {Database._db.name}")
+
+    def _ensure_client(self):
+        if Database._client is None or Database._pid != os.getpid():
+            with Database._lock:
+                if Database._client is None or Database._pid != os.getpid():
+                    self._connect()
+
     @property
     def db(self):
-        return self._db
-    
+        self._ensure_client()
+        return Database._db
+
     @property
     def client(self):
-        return self._client
-    
+        self._ensure_client()
+        return Database._client
+
+    def ping(self):
+        """Verificar conexão com o MongoDB"""
+        self.client.admin.command('ping')
+        return True
+
+    def ensure_indexes(self):
+        """Criar uma única vez os índices declarados nos modelos"""
+        if Database._indexes_ready:
+            return
+        from src.indexes import apply_indexes
+        apply_indexes(self.db)
+        Database._indexes_ready = True
+
+    def index_report(self):
+        """Relatório de índices ausentes ou extras por coleção"""
+        from src.indexes import index_report
+        return index_report(self.db)
+
     def close(self):
-        if self._client:
-            self._client.close()
+        if Database._client:
+            Database._client.close()
+            Database._client = None
+            Database._db = None
 
-# Instância global do banco
-db = Database().db
+    @staticmethod
+    def _reset_after_fork():
+        # O cliente do processo pai não é fork-safe: o filho cria o seu na primeira consulta
+        Database._client = None
+        Database._db = None
+        Database._pid = None
+        Database._lock = threading.Lock()
 
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=Database._reset_after_fork)
+
+class _LazyCollection:
+    """Coleção resolvida no momento do uso, no cliente do processo atual"""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(Database().db[self._name], attr)
+
+    def __getitem__(self, key):
+        return Database().db[self._name][key]
+
+    def __repr__(self):
+        return f"<LazyCollection {self._name}>"
+
+class _LazyDatabase:
+    """Acesso preguiçoso ao banco: `db.clientes` não conecta na importação"""
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return _LazyCollection(name)
+
+    def __getitem__(self, name):
+        return _LazyCollection(name)
+
+# Instância global do banco
+db = _LazyDatabase()
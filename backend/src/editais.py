@@ -0,0 +1,287 @@
+import codecs
+import logging
+import multiprocessing
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from src.config import Config
+from src.keywords import get_matcher, PALAVRAS_CHAVE_PADRAO
+from src.text import normalizar
+
+_PALAVRA = re.compile(r"[0-9a-z]{3,}")
+
+def _extrair_texto(caminho, max_caracteres):
+    """Extrair texto de um arquivo (executa no pool de processos)"""
+    # O texto é comprimido página a página: nem o PDF nem o texto completo
+    # ficam inteiros na memória do processo.
+    compressor = zlib.compressobj(6)
+    partes = []
+    caracteres = 0
+    paginas = 0
+
+    with open(caminho, "rb") as arquivo:
+        pdf = arquivo.read(5) == b"%PDF-"
+
+    if pdf:
+        from pypdf import PdfReader
+        leitor = PdfReader(caminho)
+        for pagina in leitor.pages:
+            texto = (pagina.extract_text() or "")[:max_caracteres - caracteres]
+            paginas += 1
+            caracteres += len(texto)
+            partes.append(compressor.compress((texto + "\n").encode("utf-8")))
+            if caracteres >= max_caracteres:
+                break
+    else:
+        # Anexos em texto/HTML: decodificar em blocos
+        decodificador = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with open(caminho, "rb") as arquivo:
+            for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+                texto = decodificador.decode(bloco)[:max_caracteres - caracteres]
+                caracteres += len(texto)
+                partes.append(compressor.compress(texto.encode("utf-8")))
+                if caracteres >= max_caracteres:
+                    break
+
+    partes.append(compressor.flush())
+    return b"".join(partes), paginas, caracteres
+
+def _termos(texto, limite):
+    """Palavras distintas (normalizadas) para o índice de texto"""
+    termos = {}
+    for palavra in _PALAVRA.findall(normalizar(texto)):
+        if palavra not in termos:
+            termos[palavra] = None
+            if len(termos) >= limite:
+                break
+    return list(termos)
+
+class EditalPipeline:
+    """Download, extração e indexação do texto dos editais de licitação"""
+
+    # Documento em `jobs` com o estado do processamento pedido pela API
+    JOB = "editais_manual"
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._pid = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._executando = threading.Lock()
+        self.metricas = {
+            "licitacoes": 0, "arquivos": 0, "reaproveitados": 0, "erros": 0,
+            "bytes_baixados": 0, "segundos_download": 0.0,
+            "paginas": 0, "caracteres": 0, "segundos_extracao": 0.0
+        }
+
+    def _get_pool(self):
+        if self._pid == os.getpid() and self._pool is not None:
+            return self._pool
+        with self._lock:
+            if self._pid != os.getpid() or self._pool is None:
+                # spawn: o filho não herda threads nem conexões do worker web
+                self._pool = ProcessPoolExecutor(
+                    max_workers=Config.EDITAL_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=50
+                )
+                self._pid = os.getpid()
+        return self._pool
+
+    def _baixar(self, urls, pasta):
+        """Baixar todos os arquivos em paralelo; retorna [(url, caminho, sha256, bytes, erro)]"""
+        from src.fetcher import fetcher
+
+        async def baixar_todos():
+            import asyncio
+
+            async def baixar(posicao, url):
+                caminho = os.path.join(pasta, f"{posicao}.bin")
+                try:
+                    sha256, tamanho = await fetcher.download(url, caminho, Config.EDITAL_MAX_BYTES)
+                    return url, caminho, sha256, tamanho, None
+                except Exception as e:
+                    return url, caminho, None, 0, str(e)
+
+            return await asyncio.gather(*(baixar(i, url) for i, url in enumerate(urls)))
+
+        inicio = time.perf_counter()
+        resultados = fetcher.run(baixar_todos())
+        self.metricas["segundos_download"] += time.perf_counter() - inicio
+        self.metricas["bytes_baixados"] += sum(r[3] for r in resultados)
+        return resultados
+
+    def processar_licitacao(self, licitacao):
+        """Processar os editais de uma licitação: ([editais], texto, erro)"""
+        from src.models import EditalTexto, Licitacao
+
+        urls = Licitacao.urls_edital(licitacao)
+
+        os.makedirs(Config.EDITAL_DIR, exist_ok=True)
+        editais = []
+        erros = []
+        with tempfile.TemporaryDirectory(dir=Config.EDITAL_DIR) as pasta:
+            extracoes = {}
+            for url, caminho, sha256, tamanho, erro in self._baixar(urls, pasta):
+                if erro:
+                    erros.append(f"{url}: {erro}")
+                    continue
+                editais.append({"url": url, "sha256": sha256, "tamanho_bytes": tamanho})
+                if sha256 in extracoes:
+                    continue
+                if EditalTexto.existe(sha256):
+                    # Mesmo arquivo já extraído (em outra licitação ou varredura)
+                    self.metricas["reaproveitados"] += 1
+                    continue
+                extracoes[sha256] = (
+                    self._get_pool().submit(_extrair_texto, caminho, Config.EDITAL_MAX_CARACTERES),
+                    tamanho,
+                    time.perf_counter()
+                )
+
+            for sha256, (futuro, tamanho, inicio) in extracoes.items():
+                try:
+                    comprimido, paginas, caracteres = futuro.result()
+                except Exception as e:
+                    erros.append(f"{sha256}: {e}")
+                    continue
+                self.metricas["segundos_extracao"] += time.perf_counter() - inicio
+                self.metricas["arquivos"] += 1
+                self.metricas["paginas"] += paginas
+                self.metricas["caracteres"] += caracteres
+                EditalTexto.salvar(sha256, comprimido, paginas, caracteres, tamanho)
+
+        textos = []
+        caracteres = 0
+        for edital in editais:
+            if caracteres >= Config.EDITAL_MAX_CARACTERES:
+                break
+            texto = EditalTexto.texto(edital["sha256"])
+            textos.append(texto)
+            caracteres += len(texto)
+        self.metricas["erros"] += len(erros)
+        return editais, "\n".join(textos), "; ".join(erros) or None
+
+    def processar_pendentes(self, limite=None, palavras_chave=None, ao_processar=None):
+        """Processar até `limite` licitações com edital pendente"""
+        from src.models import Licitacao, MonitoramentoConfig
+
+        if not self._executando.acquire(blocking=False):
+            return {"processadas": 0, "em_andamento": True}
+        try:
+            if palavras_chave is None:
+                palavras_chave = (MonitoramentoConfig.get() or {}).get("palavras_chave")
+            matcher = get_matcher(palavras_chave or PALAVRAS_CHAVE_PADRAO)
+            dono = f"{socket.gethostname()}:{os.getpid()}"
+
+            processadas = 0
+            for _ in range(limite or Config.EDITAL_LOTE):
+                licitacao = Licitacao.reservar_edital(dono, Config.EDITAL_LEASE_SECONDS)
+                if licitacao is None:
+                    break
+                try:
+                    editais, texto, erro = self.processar_licitacao(licitacao)
+                except Exception as e:
+                    logging.error(f"Erro ao processar edital da licitação {licitacao['_id']}: {e}")
+                    editais, texto, erro = [], "", str(e)
+
+                # Sem nenhum arquivo aproveitável a licitação volta para a fila
+                if erro and not editais:
+                    Licitacao.concluir_edital(
+                        licitacao["_id"], dono, editais, erro=erro,
+                        max_tentativas=Config.EDITAL_MAX_TENTATIVAS,
+                        tentativas=licitacao.get("edital_tentativas", 1)
+                    )
+                else:
+                    if erro:
+                        logging.warning(f"Edital da licitação {licitacao['_id']} processado parcialmente: {erro}")
+                    analise = matcher.analisar(
+                        licitacao.get("titulo", ""),
+                        f"{licitacao.get('descricao') or ''}\n{texto}"
+                    )
+                    Licitacao.concluir_edital(
+                        licitacao["_id"], dono, editais,
+                        analise=analise,
+                        termos=_termos(texto, Config.EDITAL_MAX_TERMOS)
+                    )
+                self.metricas["licitacoes"] += 1
+                processadas += 1
+                if ao_processar is not None:
+                    ao_processar()
+            return {"processadas": processadas, "em_andamento": False}
+        finally:
+            self._executando.release()
+
+    def iniciar(self, limite=None):
+        """Processar um lote em background (pedido manual); None se já há um em execução"""
+        from src.models import Job
+
+        dono = f"{socket.gethostname()}:{os.getpid()}"
+        estado = Job.reservar(self.JOB, dono, Config.EDITAL_LEASE_SECONDS)
+        if estado is None:
+            return None
+        novo = {
+            "status": "executando",
+            "limite": limite or Config.EDITAL_LOTE,
+            "processadas": 0,
+            "iniciado_em": datetime.utcnow(),
+            "concluido_em": None,
+            "ultimo_erro": None
+        }
+        Job.checkpoint(self.JOB, dono, novo)
+        threading.Thread(
+            target=self._executar_job, args=(dono, novo["limite"]), name="editais-manual", daemon=True
+        ).start()
+        return self.status_job()
+
+    def _executar_job(self, dono, limite):
+        from src.models import Job
+
+        # Cada licitação concluída renova o lease e atualiza o progresso
+        def ao_processar():
+            Job.checkpoint(self.JOB, dono, incrementos={"processadas": 1},
+                           duracao_segundos=Config.EDITAL_LEASE_SECONDS)
+
+        campos = {"status": "concluido"}
+        try:
+            resultado = self.processar_pendentes(limite=limite, ao_processar=ao_processar)
+            if resultado["em_andamento"]:
+                # O agendador deste processo já está processando a fila
+                campos["status"] = "em_andamento_no_agendador"
+        except Exception as e:
+            logging.error(f"Erro ao processar editais: {e}")
+            campos.update({"status": "interrompido", "ultimo_erro": str(e)})
+        campos["concluido_em"] = datetime.utcnow()
+        Job.liberar(self.JOB, dono, campos)
+
+    def status_job(self):
+        """Estado da última execução manual (compartilhado entre workers)"""
+        from src.models import Job
+
+        estado = Job.get(self.JOB) or {"status": None}
+        estado.pop("_id", None)
+        return estado
+
+    def stats(self):
+        m = dict(self.metricas)
+        m["mb_por_segundo_download"] = round(
+            m["bytes_baixados"] / 1048576 / m["segundos_download"], 3
+        ) if m["segundos_download"] else 0.0
+        m["paginas_por_segundo"] = round(
+            m["paginas"] / m["segundos_extracao"], 3
+        ) if m["segundos_extracao"] else 0.0
+        return m
+
+pipeline = EditalPipeline()
+
+if hasattr(os, 'register_at_fork'):
+    # Pool de processos e locks do pai não podem ser usados no filho
+    os.register_at_fork(after_in_child=pipeline._reset)
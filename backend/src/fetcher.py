@@ -0,0 +1,270 @@
+import asyncio
+import codecs
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+from pymongo import UpdateOne
+from src.config import Config
+from src.database import db
+
+class JSONArrayStreamParser:
+    """Parser incremental de um array JSON de objetos: devolve cada item assim que chega"""
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._iniciado = False
+        self._fim = False
+
+    def feed(self, chunk):
+        if self._fim:
+            return []
+        self._buffer += self._utf8.decode(chunk)
+        return self._extrair()
+
+    def close(self):
+        self._buffer += self._utf8.decode(b"", final=True)
+        itens = self._extrair()
+        if not self._fim and self._buffer.strip():
+            raise ValueError("Resposta JSON incompleta")
+        return itens
+
+    def _extrair(self):
+        itens = []
+        buffer = self._buffer
+        pos = 0
+        if not self._iniciado:
+            pos = self._pular(buffer, pos, " \t\r\n")
+            if pos >= len(buffer):
+                self._buffer = ""
+                return itens
+            if buffer[pos] != "[":
+                raise ValueError("Resposta do portal não é um array JSON")
+            self._iniciado = True
+            pos += 1
+        while True:
+            pos = self._pular(buffer, pos, " \t\r\n,")
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                self._fim = True
+                pos = len(buffer)
+                break
+            try:
+                item, fim = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # item ainda incompleto: aguardar próximo bloco
+            itens.append(item)
+            pos = fim
+        self._buffer = buffer[pos:]
+        return itens
+
+    @staticmethod
+    def _pular(buffer, pos, caracteres):
+        while pos < len(buffer) and buffer[pos] in caracteres:
+            pos += 1
+        return pos
+
+class _TokenBucket:
+    """Limite de requisições por segundo (por host)"""
+
+    def __init__(self, taxa, capacidade):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self.tokens = capacidade
+        self.atualizado = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                self.tokens = min(self.capacidade, self.tokens + (agora - self.atualizado) * self.taxa)
+                self.atualizado = agora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.taxa)
+
+class PortalFetcher:
+    """Cliente HTTP assíncrono compartilhado pelo processo (pool, keep-alive e limites por host)"""
+    # Um event loop dedicado roda em uma thread; chamadas síncronas (rotas,
+    # agendador) submetem corrotinas a ele e reaproveitam a mesma sessão.
+
+    cache_collection = db.http_cache
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._pid = None
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._semaforos = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.metricas = {"requisicoes": 0, "nao_modificado": 0, "erros": 0, "bytes": 0, "itens": 0, "segundos": 0.0}
+
+    def _ensure_loop(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="portal-fetcher", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def run(self, coro, timeout=None):
+        """Executar corrotina no loop do fetcher a partir de código síncrono"""
+        self._ensure_loop()
+        futuro = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return futuro.result(timeout or Config.FETCH_SWEEP_TIMEOUT)
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            import aiohttp
+            connector = aiohttp.TCPConnector(
+                limit=Config.FETCH_MAX_CONNECTIONS,
+                limit_per_host=Config.FETCH_PER_HOST_CONCURRENCY,
+                ttl_dns_cache=300,
+                keepalive_timeout=30
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=Config.FETCH_TIMEOUT,
+                    sock_connect=Config.FETCH_CONNECT_TIMEOUT
+                ),
+                headers={"User-Agent": "VIP-Mudancas-Monitor/1.0", "Accept-Encoding": "gzip, deflate"},
+                auto_decompress=True
+            )
+        return self._session
+
+    def _limites(self, host):
+        if host not in self._semaforos:
+            self._semaforos[host] = asyncio.Semaphore(Config.FETCH_PER_HOST_CONCURRENCY)
+            self._buckets[host] = _TokenBucket(Config.FETCH_RATE_PER_HOST, max(Config.FETCH_RATE_PER_HOST, 1))
+        return self._semaforos[host], self._buckets[host]
+
+    async def fetch(self, url, params=None, parser_factory=JSONArrayStreamParser):
+        """GET condicional com parse em streaming; retorna (status, itens, validadores)"""
+        # Os validadores (ETag/Last-Modified) não são gravados aqui: quem chama
+        # grava com salvar_validadores depois de persistir os itens. Se a
+        # gravação falhar, a próxima busca recebe a página inteira de novo.
+        loop = asyncio.get_running_loop()
+        chave = url if not params else f"{url}?{sorted(params.items())}"
+        cache = await loop.run_in_executor(None, lambda: self.cache_collection.find_one({"_id": chave}))
+
+        headers = {}
+        if cache:
+            if cache.get("etag"):
+                headers["If-None-Match"] = cache["etag"]
+            if cache.get("last_modified"):
+                headers["If-Modified-Since"] = cache["last_modified"]
+
+        semaforo, bucket = self._limites(urlsplit(url).hostname)
+        session = await self._get_session()
+        inicio = time.perf_counter()
+        async with semaforo:
+            await bucket.acquire()
+            self.metricas["requisicoes"] += 1
+            try:
+                async with session.get(url, params=params, headers=headers) as resp:
+                    if resp.status == 304:
+                        self.metricas["nao_modificado"] += 1
+                        return 304, [], None
+                    resp.raise_for_status()
+
+                    parser = parser_factory()
+                    itens = []
+                    async for chunk in resp.content.iter_chunked(64 * 1024):
+                        self.metricas["bytes"] += len(chunk)
+                        itens.extend(parser.feed(chunk))
+                    itens.extend(parser.close())
+
+                    validadores = {
+                        "_id": chave,
+                        "etag": resp.headers.get("ETag"),
+                        "last_modified": resp.headers.get("Last-Modified")
+                    }
+                    status = resp.status
+            except Exception:
+                self.metricas["erros"] += 1
+                raise
+            finally:
+                self.metricas["segundos"] += time.perf_counter() - inicio
+
+        if not (validadores["etag"] or validadores["last_modified"]):
+            validadores = None
+        self.metricas["itens"] += len(itens)
+        return status, itens, validadores
+
+    def salvar_validadores(self, validadores):
+        """Gravar ETag/Last-Modified das páginas cujos itens já foram persistidos"""
+        operacoes = [
+            UpdateOne({"_id": v["_id"]}, {"$set": {"etag": v["etag"], "last_modified": v["last_modified"]}}, upsert=True)
+            for v in validadores if v
+        ]
+        if operacoes:
+            self.cache_collection.bulk_write(operacoes, ordered=False)
+
+    async def download(self, url, destino, max_bytes):
+        """Gravar a resposta em disco em blocos; retorna (sha256, bytes)"""
+        import aiohttp
+        # Arquivos grandes: sem limite total, apenas entre leituras
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=Config.FETCH_CONNECT_TIMEOUT,
+            sock_read=Config.FETCH_TIMEOUT
+        )
+        semaforo, bucket = self._limites(urlsplit(url).hostname)
+        session = await self._get_session()
+        sha256 = hashlib.sha256()
+        total = 0
+        inicio = time.perf_counter()
+        async with semaforo:
+            await bucket.acquire()
+            self.metricas["requisicoes"] += 1
+            try:
+                async with session.get(url, timeout=timeout) as resp:
+                    resp.raise_for_status()
+                    with open(destino, "wb") as arquivo:
+                        async for chunk in resp.content.iter_chunked(256 * 1024):
+                            total += len(chunk)
+                            if total > max_bytes:
+                                raise ValueError(f"Arquivo excede {max_bytes} bytes: {url}")
+                            sha256.update(chunk)
+                            arquivo.write(chunk)
+            except Exception:
+                self.metricas["erros"] += 1
+                raise
+            finally:
+                self.metricas["bytes"] += total
+                self.metricas["segundos"] += time.perf_counter() - inicio
+        return sha256.hexdigest(), total
+
+    async def fetch_many(self, pedidos):
+        """Buscar várias URLs em paralelo; erros são devolvidos por pedido"""
+        async def executar(pedido):
+            try:
+                status, itens, validadores = await self.fetch(pedido["url"], pedido.get("params"))
+                return {**pedido, "status": status, "itens": itens, "validadores": validadores, "erro": None}
+            except Exception as e:
+                logging.error(f"Erro ao buscar {pedido['url']}: {e}")
+                return {**pedido, "status": None, "itens": [], "validadores": None, "erro": str(e)}
+
+        return await asyncio.gather(*(executar(pedido) for pedido in pedidos))
+
+fetcher = PortalFetcher()
+
+if hasattr(os, 'register_at_fork'):
+    # Loop, sessão e conexões do processo pai não podem ser usados no filho
+    os.register_at_fork(after_in_child=fetcher._reset)
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import logging
+import threading
+from src.cache import ResponseCache
+from src.config import Config
+
+# Versão de cada prompt: mudar o texto do prompt exige incrementar a versão
+PROMPT_VERSOES = {
+    "analisar_cliente": 2,
+    "sugerir_acao": 1,
+    "gerar_mensagem": 1
+}
+
+def _normalizar(valor):
+    """Espaços colapsados em textos; números inteiros como int"""
+    if isinstance(valor, str):
+        return " ".join(valor.split())
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+class IAMemo:
+    """Memorização de respostas da IA em dois níveis (processo e MongoDB)"""
+
+    def __init__(self):
+        self.local = ResponseCache(
+            max_entries=Config.IA_CACHE_MAX_ENTRIES,
+            default_ttl=min(Config.IA_CACHE_TTL_SECONDS, 3600)
+        )
+        self._lock = threading.Lock()
+        self.metricas = {
+            "hits_memoria": 0, "hits_mongo": 0, "misses": 0,
+            "latencia_economizada_ms": 0.0, "tokens_economizados": 0
+        }
+
+    def chave(self, endpoint, entradas, modelo=None):
+        """Hash de (endpoint, entradas normalizadas, modelo, versão do prompt)"""
+        payload = {
+            "endpoint": endpoint,
+            "entradas": {campo: _normalizar(valor) for campo, valor in entradas.items()},
+            "modelo": modelo or Config.LLM_MODEL,
+            "versao": PROMPT_VERSOES.get(endpoint, 1)
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _registrar(self, metrica, entrada=None):
+        with self._lock:
+            self.metricas[metrica] += 1
+            if entrada:
+                self.metricas["latencia_economizada_ms"] += entrada.get("latencia_ms") or 0
+                self.metricas["tokens_economizados"] += entrada.get("tokens") or 0
+
+    def get(self, chave):
+        """Resposta memorizada ou None"""
+        entrada = self.local.get(chave)
+        if entrada is not None:
+            self._registrar("hits_memoria", entrada)
+            return entrada["resposta"]
+
+        from src.models import IACache
+        try:
+            entrada = IACache.get(chave)
+        except Exception as e:
+            logging.error(f"Erro ao consultar cache da IA: {e}")
+            entrada = None
+        if entrada is None:
+            self._registrar("misses")
+            return None
+
+        entrada.pop("_id", None)
+        self.local.set(chave, entrada)
+        self._registrar("hits_mongo", entrada)
+        return entrada["resposta"]
+
+    def set(self, chave, endpoint, resposta, completion):
+        """Memorizar a resposta de uma chamada real ao modelo"""
+        from src.models import IACache
+
+        entrada = {
+            "resposta": resposta,
+            "latencia_ms": completion.get("latencia_ms"),
+            "tokens": completion.get("uso", {}).get("total_tokens", 0)
+        }
+        self.local.set(chave, entrada)
+        try:
+            IACache.salvar(chave, endpoint, resposta, entrada["latencia_ms"], entrada["tokens"],
+                           Config.IA_CACHE_TTL_SECONDS)
+        except Exception as e:
+            logging.error(f"Erro ao gravar cache da IA: {e}")
+
+    def stats(self):
+        with self._lock:
+            metricas = dict(self.metricas)
+        total = metricas["hits_memoria"] + metricas["hits_mongo"] + metricas["misses"]
+        metricas["hit_rate"] = round((total - metricas["misses"]) / total, 4) if total else 0.0
+        metricas["latencia_economizada_ms"] = round(metricas["latencia_economizada_ms"], 1)
+        metricas["memoria"] = self.local.stats()
+        return metricas
+
+ia_memo = IAMemo()
@@ -0,0 +1,57 @@
+from pymongo import IndexModel, ASCENDING, DESCENDING
+import logging
+
+# Modelos que declaram índices através do atributo `indexes`
+_registry = []
+
+def register_indexes(model):
+    """Decorator que registra o modelo para criação de índices na inicialização"""
+    if model not in _registry:
+        _registry.append(model)
+    return model
+
+def registered_models():
+    """Listar modelos registrados"""
+    return list(_registry)
+
+def index(keys, name, **options):
+    """Declarar índice com nome fixo e criação em background"""
+    options.setdefault('background', True)
+    return IndexModel(keys, name=name, **options)
+
+def apply_indexes(db):
+    """Criar todos os índices declarados (idempotente)"""
+    criados = {}
+    for model in _registry:
+        collection_name = model.collection.name
+        collection = db[collection_name]
+        
+        # Migração que o modelo precisa antes dos índices (ex.: remover duplicatas)
+        preparar = getattr(model, "preparar_indices", None)
+        if preparar is not None:
+            try:
+                preparar(collection)
+            except Exception as e:
+                logging.error(f"Erro ao preparar índices de {collection_name}: {e}")
+        
+        # Um comando por índice: a falha de um não impede a criação dos demais
+        criados[collection_name] = []
+        for modelo_indice in model.indexes:
+            try:
+                criados[collection_name].extend(collection.create_indexes([modelo_indice]))
+            except Exception as e:
+                logging.error(f"Erro ao criar índice {modelo_indice.document['name']} em {collection_name}: {e}")
+    return criados
+
+def index_report(db):
+    """Comparar índices declarados com os existentes no banco"""
+    relatorio = {}
+    for model in _registry:
+        collection_name = model.collection.name
+        declarados = {idx.document['name'] for idx in model.indexes}
+        existentes = set(db[collection_name].index_information().keys()) - {'_id_'}
+        relatorio[collection_name] = {
+            "missing": sorted(declarados - existentes),
+            "extra": sorted(existentes - declarados)
+        }
+    return relatorio
@@ -0,0 +1,106 @@
+import math
+import re
+from collections import deque
+from functools import lru_cache
+from src.text import normalizar
+
+# Palavras-chave padrão do monitoramento de licitações
+PALAVRAS_CHAVE_PADRAO = [
+    "mudança", "mudanças", "remoção", "remoções", "transporte", "transporte de móveis",
+    "transporte de mobiliário", "transporte de equipamentos", "guarda-móveis",
+    "armazenagem", "carga e descarga", "içamento", "embalagem de móveis"
+]
+
+_NAO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+def _dobrar(texto):
+    """Minúsculas, sem acentos e com pontuação/hífens trocados por espaço"""
+    return _NAO_ALFANUMERICO.sub(" ", normalizar(texto)).strip()
+
+class KeywordMatcher:
+    """Casamento de múltiplas palavras-chave em uma passada (Aho-Corasick)"""
+
+    def __init__(self, palavras):
+        self.palavras = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._saida = [[]]  # índices das palavras que terminam em cada nó
+
+        vistas = {}
+        for palavra in palavras:
+            dobrada = _dobrar(palavra)
+            if not dobrada or dobrada in vistas:
+                continue
+            vistas[dobrada] = len(self.palavras)
+            self.palavras.append((palavra, dobrada))
+            self._inserir(dobrada, vistas[dobrada])
+        self._construir_falhas()
+
+    def _inserir(self, texto, indice):
+        no = 0
+        for c in texto:
+            proximo = self._goto[no].get(c)
+            if proximo is None:
+                proximo = len(self._goto)
+                self._goto[no][c] = proximo
+                self._goto.append({})
+                self._fail.append(0)
+                self._saida.append([])
+            no = proximo
+        self._saida[no].append(indice)
+
+    def _construir_falhas(self):
+        fila = deque(self._goto[0].values())
+        while fila:
+            no = fila.popleft()
+            for c, filho in self._goto[no].items():
+                fila.append(filho)
+                falha = self._fail[no]
+                while falha and c not in self._goto[falha]:
+                    falha = self._fail[falha]
+                self._fail[filho] = self._goto[falha].get(c, 0)
+                self._saida[filho] = self._saida[filho] + self._saida[self._fail[filho]]
+
+    def find(self, texto):
+        """Ocorrências (índice da palavra, início) respeitando limites de palavra"""
+        dobrado = _dobrar(texto)
+        ocorrencias = []
+        no = 0
+        for posicao, c in enumerate(dobrado):
+            while no and c not in self._goto[no]:
+                no = self._fail[no]
+            no = self._goto[no].get(c, 0)
+            for indice in self._saida[no]:
+                inicio = posicao - len(self.palavras[indice][1]) + 1
+                fim = posicao + 1
+                if (inicio == 0 or dobrado[inicio - 1] == " ") and (fim == len(dobrado) or dobrado[fim] == " "):
+                    ocorrencias.append((indice, inicio))
+        return ocorrencias, dobrado
+
+    def analisar(self, titulo, descricao=""):
+        """Palavras encontradas e relevância de uma licitação (uma passada)"""
+        titulo_dobrado_len = len(_dobrar(titulo))
+        ocorrencias, _ = self.find(f"{titulo or ''} | {descricao or ''}")
+
+        por_palavra = {}
+        for indice, inicio in ocorrencias:
+            no_titulo, total = por_palavra.get(indice, (False, 0))
+            por_palavra[indice] = (no_titulo or inicio < titulo_dobrado_len, total + 1)
+
+        relevancia = 0.0
+        for no_titulo, total in por_palavra.values():
+            # Palavra no título vale o dobro; repetições somam com retorno decrescente
+            relevancia += (2.0 if no_titulo else 1.0) + 0.5 * math.log1p(total - 1)
+
+        return {
+            "palavras_encontradas": [self.palavras[i][0] for i in sorted(por_palavra)],
+            "relevancia": round(relevancia, 3)
+        }
+
+@lru_cache(maxsize=64)
+def _matcher_cache(chave):
+    return KeywordMatcher(chave)
+
+def get_matcher(palavras):
+    """Matcher compilado uma vez por conjunto de palavras-chave"""
+    return _matcher_cache(tuple(sorted(set(palavras or PALAVRAS_CHAVE_PADRAO))))
@@ -0,0 +1,409 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from src.config import Config
+
+class LLMError(Exception):
+    """Falha ao obter resposta do modelo"""
+
+class LLMIndisponivel(LLMError):
+    """Modelo não configurado ou sem capacidade no momento"""
+
+def _falha_do_servico(erro):
+    """Erros do próprio pedido (4xx de validação) não indicam modelo indisponível"""
+    return getattr(erro, "status_code", None) not in (400, 404, 422)
+
+def _limite_processo():
+    # LLM_MAX_CONCURRENCY é o total da aplicação, dividido entre os workers
+    return max(1, Config.LLM_MAX_CONCURRENCY // max(Config.WEB_CONCURRENCY, 1))
+
+def _percentis(amostras):
+    if not amostras:
+        return {"p50": None, "p95": None, "p99": None}
+    ordenadas = sorted(amostras)
+    ultimo = len(ordenadas) - 1
+    return {f"p{p}": ordenadas[min(ultimo, round(p / 100 * ultimo))] for p in (50, 95, 99)}
+
+class CircuitBreaker:
+    """Disjuntor das chamadas ao modelo: fechado, aberto ou meio-aberto"""
+    # Após N falhas seguidas abre e recusa chamadas na hora; passado o
+    # intervalo, deixa passar uma única chamada de teste que decide se fecha.
+
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    MEIO_ABERTO = "meio_aberto"
+
+    def __init__(self, falhas, aberto_segundos):
+        self.limite_falhas = max(1, falhas)
+        self.aberto_segundos = aberto_segundos
+        self._lock = threading.Lock()
+        self.estado = self.FECHADO
+        self.falhas_seguidas = 0
+        self.aberto_ate = 0.0
+        self.aberturas = 0
+        self.recusadas = 0
+
+    @property
+    def disponivel(self):
+        """Se uma chamada agora seria aceita (sem consumir a chamada de teste)"""
+        with self._lock:
+            return self.estado == self.FECHADO or (
+                self.estado == self.ABERTO and time.monotonic() >= self.aberto_ate
+            )
+
+    def permitir(self):
+        with self._lock:
+            if self.estado == self.FECHADO:
+                return True
+            if self.estado == self.ABERTO and time.monotonic() >= self.aberto_ate:
+                self.estado = self.MEIO_ABERTO
+                return True
+            self.recusadas += 1
+            return False
+
+    def sucesso(self):
+        with self._lock:
+            self.estado = self.FECHADO
+            self.falhas_seguidas = 0
+
+    def falha(self):
+        with self._lock:
+            self.falhas_seguidas += 1
+            if self.estado == self.MEIO_ABERTO or (
+                self.estado == self.FECHADO and self.falhas_seguidas >= self.limite_falhas
+            ):
+                self.estado = self.ABERTO
+                self.aberto_ate = time.monotonic() + self.aberto_segundos
+                self.aberturas += 1
+                logging.warning(
+                    f"Circuito do LLM aberto por {self.aberto_segundos}s após {self.falhas_seguidas} falhas seguidas"
+                )
+
+    def cancelar(self):
+        """Chamada permitida que não chegou a uma resposta útil: devolver a vez de teste"""
+        with self._lock:
+            if self.estado == self.MEIO_ABERTO:
+                self.estado = self.ABERTO
+
+    def stats(self):
+        with self._lock:
+            return {
+                "estado": self.estado,
+                "falhas_seguidas": self.falhas_seguidas,
+                "aberturas": self.aberturas,
+                "recusadas": self.recusadas,
+                "reabre_em_segundos": round(max(0.0, self.aberto_ate - time.monotonic()), 1)
+                if self.estado == self.ABERTO else 0.0
+            }
+
+class LLMClient:
+    """Cliente de chat completions compartilhado pelo processo"""
+    # Uma única sessão HTTP (pool com keep-alive) e um pool de threads
+    # limitado: as chamadas rodam fora da thread da requisição, que espera no
+    # máximo o prazo configurado e recebe erro rápido se não houver vaga.
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._pid = None
+        self._client = None
+        self._executor = None
+        self._vagas = None
+        self._lock = threading.Lock()
+        self.limite = None
+        self.circuito = CircuitBreaker(Config.LLM_BREAKER_FAILURES, Config.LLM_BREAKER_OPEN_SECONDS)
+        self.metricas = {
+            "chamadas": 0, "erros": 0, "timeouts": 0, "rejeitadas": 0, "em_andamento": 0,
+            "hedges": 0, "hedges_vencedores": 0
+        }
+        self._endpoints = {}
+
+    @property
+    def configurado(self):
+        return bool(Config.OPENAI_API_KEY)
+
+    @property
+    def disponivel(self):
+        """Configurado e com o circuito fechado (ou pronto para a chamada de teste)"""
+        return self.configurado and self.circuito.disponivel
+
+    def vagas_em_background(self):
+        """Chamadas simultâneas que um job em background pode fazer neste processo"""
+        # Sempre ao menos uma, mesmo que o processo só tenha uma vaga
+        return max(1, _limite_processo() - Config.LLM_RESERVA_INTERATIVA)
+
+    def _ensure_client(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            import httpx
+            from openai import OpenAI
+
+            self.limite = _limite_processo()
+            timeout = httpx.Timeout(Config.LLM_READ_TIMEOUT, connect=Config.LLM_CONNECT_TIMEOUT)
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=self.limite,
+                    max_keepalive_connections=self.limite,
+                    keepalive_expiry=30
+                ),
+                timeout=timeout
+            )
+            self._client = OpenAI(
+                api_key=Config.OPENAI_API_KEY,
+                base_url=Config.OPENAI_BASE_URL or None,
+                http_client=http_client,
+                timeout=timeout,
+                max_retries=Config.LLM_MAX_RETRIES
+            )
+            self._executor = ThreadPoolExecutor(max_workers=self.limite, thread_name_prefix="llm")
+            self._vagas = threading.BoundedSemaphore(self.limite)
+            self._pid = os.getpid()
+
+    def _chamar(self, modelo, mensagens, max_tokens, temperature):
+        inicio = time.perf_counter()
+        response = self._client.chat.completions.create(
+            model=modelo,
+            messages=mensagens,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        uso = response.usage
+        return {
+            "texto": (response.choices[0].message.content or "").strip(),
+            "modelo": response.model or modelo,
+            "uso": {
+                "prompt_tokens": uso.prompt_tokens if uso else 0,
+                "completion_tokens": uso.completion_tokens if uso else 0,
+                "total_tokens": uso.total_tokens if uso else 0
+            },
+            "latencia_ms": round((time.perf_counter() - inicio) * 1000, 1)
+        }
+
+    def _liberar(self, futuro):
+        self._vagas.release()
+        with self._lock:
+            self.metricas["em_andamento"] -= 1
+            if futuro.exception() is not None:
+                self.metricas["erros"] += 1
+
+    def _endpoint(self, endpoint):
+        # Chamar com self._lock
+        metricas = self._endpoints.get(endpoint)
+        if metricas is None:
+            metricas = self._endpoints[endpoint] = {
+                "chamadas": 0, "erros": 0, "timeouts": 0, "canceladas": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0,
+                "latencias": deque(maxlen=Config.LLM_METRICS_SAMPLES)
+            }
+        return metricas
+
+    def _registrar(self, endpoint, inicio, uso=None, erro=None, timeout=False, cancelada=False):
+        """Resultado de uma chamada: métricas do endpoint e estado do circuito"""
+        if cancelada:
+            self.circuito.cancelar()
+        elif timeout or (erro is not None and _falha_do_servico(erro)):
+            self.circuito.falha()
+        elif erro is None:
+            self.circuito.sucesso()
+        else:
+            self.circuito.cancelar()
+
+        with self._lock:
+            metricas = self._endpoint(endpoint)
+            metricas["chamadas"] += 1
+            if cancelada:
+                metricas["canceladas"] += 1
+            elif timeout:
+                metricas["timeouts"] += 1
+            elif erro is not None:
+                metricas["erros"] += 1
+            else:
+                metricas["latencias"].append((time.perf_counter() - inicio) * 1000)
+                for campo in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                    metricas[campo] += (uso or {}).get(campo, 0)
+
+    def _reservar(self):
+        """Circuito e vaga no pool antes de chamar o modelo"""
+        if not self.configurado:
+            raise LLMIndisponivel("OPENAI_API_KEY não configurada")
+        self._ensure_client()
+
+        if not self.circuito.permitir():
+            raise LLMIndisponivel("Circuito aberto: modelo com falhas recentes")
+
+        # Sem vaga dentro do prazo de fila: falhar rápido em vez de segurar a thread
+        if not self._vagas.acquire(timeout=Config.LLM_QUEUE_TIMEOUT):
+            self.circuito.cancelar()
+            with self._lock:
+                self.metricas["rejeitadas"] += 1
+            raise LLMIndisponivel("Limite de chamadas simultâneas ao modelo atingido")
+
+        with self._lock:
+            self.metricas["chamadas"] += 1
+            self.metricas["em_andamento"] += 1
+
+    def _submeter(self, argumentos):
+        # A vaga já foi reservada; é devolvida quando a tentativa termina
+        try:
+            futuro = self._executor.submit(self._chamar, *argumentos)
+        except Exception:
+            self._vagas.release()
+            with self._lock:
+                self.metricas["em_andamento"] -= 1
+            raise
+        futuro.add_done_callback(self._liberar)
+        return futuro
+
+    def _hedge(self, argumentos):
+        """Tentativa extra só se houver vaga livre agora; None caso contrário"""
+        if not self._vagas.acquire(blocking=False):
+            return None
+        with self._lock:
+            self.metricas["chamadas"] += 1
+            self.metricas["em_andamento"] += 1
+            self.metricas["hedges"] += 1
+        return self._submeter(argumentos)
+
+    def completar(self, mensagens, max_tokens=150, temperature=0.7, modelo=None, timeout=None,
+                  endpoint="geral", hedge=True):
+        """Executar um chat completion; retorna {"texto", "modelo", "uso", "latencia_ms"}"""
+        inicio = time.perf_counter()
+        self._reservar()
+        argumentos = (modelo or Config.LLM_MODEL, mensagens, max_tokens, temperature)
+        try:
+            primeira = self._submeter(argumentos)
+        except Exception:
+            self.circuito.cancelar()
+            raise
+
+        # Orçamento de latência da chamada inteira, tentativa extra incluída.
+        # Se a primeira tentativa demora mais que LLM_HEDGE_AFTER_MS (ou falha
+        # antes disso), uma segunda é disparada e vale a que responder primeiro.
+        prazo = time.monotonic() + (timeout or Config.LLM_LATENCY_BUDGET)
+        atraso_hedge = Config.LLM_HEDGE_AFTER_MS / 1000 if hedge and Config.LLM_HEDGE_AFTER_MS > 0 else None
+        pendentes = {primeira}
+        erro = None
+        while pendentes:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                break
+            espera = min(restante, atraso_hedge) if atraso_hedge else restante
+            concluidos, pendentes = wait(pendentes, timeout=espera, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                if futuro.exception() is None:
+                    resultado = futuro.result()
+                    if futuro is not primeira:
+                        with self._lock:
+                            self.metricas["hedges_vencedores"] += 1
+                    self._registrar(endpoint, inicio, uso=resultado["uso"])
+                    return resultado
+                erro = futuro.exception()
+
+            if atraso_hedge and prazo > time.monotonic():
+                atraso_hedge = None
+                extra = self._hedge(argumentos)
+                if extra is not None:
+                    pendentes.add(extra)
+
+        if pendentes:
+            # As tentativas terminam sozinhas pelo timeout do httpx; a requisição não espera
+            with self._lock:
+                self.metricas["timeouts"] += 1
+            self._registrar(endpoint, inicio, timeout=True)
+            raise LLMError("Tempo limite excedido aguardando o modelo")
+        self._registrar(endpoint, inicio, erro=erro)
+        raise erro
+
+    def stream(self, mensagens, max_tokens=250, temperature=0.7, modelo=None, endpoint="chat_stream"):
+        """Chat completion em streaming: gera ("token", texto) e, por último, ("fim", uso e latência)"""
+        inicio = time.perf_counter()
+        self._reservar()
+
+        # A vaga fica com a requisição enquanto os tokens são repassados;
+        # o timeout de leitura do httpx vale para cada pedaço recebido.
+        modelo = modelo or Config.LLM_MODEL
+        primeiro_token = None
+        uso = None
+        erro = None
+        concluido = False
+        try:
+            resposta = self._client.chat.completions.create(
+                model=modelo,
+                messages=mensagens,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            try:
+                for chunk in resposta:
+                    if chunk.usage:
+                        uso = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if primeiro_token is None:
+                            primeiro_token = time.perf_counter()
+                        yield "token", chunk.choices[0].delta.content
+                concluido = True
+            finally:
+                resposta.close()
+        except Exception as e:
+            erro = e
+            with self._lock:
+                self.metricas["erros"] += 1
+            raise
+        finally:
+            self._vagas.release()
+            with self._lock:
+                self.metricas["em_andamento"] -= 1
+            uso = {
+                "prompt_tokens": uso.prompt_tokens if uso else 0,
+                "completion_tokens": uso.completion_tokens if uso else 0,
+                "total_tokens": uso.total_tokens if uso else 0
+            }
+            # Todo desfecho entra nas métricas, inclusive o cliente que desconecta
+            # (GeneratorExit); antes do primeiro token ele não conta para o circuito
+            if erro is not None:
+                self._registrar(endpoint, inicio, erro=erro)
+            elif not concluido and primeiro_token is None:
+                self._registrar(endpoint, inicio, cancelada=True)
+            else:
+                self._registrar(endpoint, inicio, uso=uso)
+
+        yield "fim", {
+            "modelo": modelo,
+            "uso": uso,
+            "latencia_ms": round((time.perf_counter() - inicio) * 1000, 1),
+            "primeiro_token_ms": round((primeiro_token - inicio) * 1000, 1) if primeiro_token else None
+        }
+
+    def stats(self):
+        with self._lock:
+            endpoints = {
+                nome: {
+                    **{campo: valor for campo, valor in metricas.items() if campo != "latencias"},
+                    "latencia_ms": {p: round(v, 1) if v is not None else None
+                                    for p, v in _percentis(metricas["latencias"]).items()},
+                    "amostras": len(metricas["latencias"])
+                }
+                for nome, metricas in self._endpoints.items()
+            }
+            return {
+                "configurado": self.configurado,
+                "limite_processo": self.limite,
+                **self.metricas,
+                "circuito": self.circuito.stats(),
+                "endpoints": endpoints
+            }
+
+llm = LLMClient()
+
+if hasattr(os, 'register_at_fork'):
+    # Conexões e threads do processo pai não podem ser usadas no filho
+    os.register_at_fork(after_in_child=llm._reset)
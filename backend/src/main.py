@@ -5,7 +5,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, jwt_required
 from src.config import Config
 from src.database import Database
 
@@ -19,6 +19,7 @@ from src.routes.ia import ia_bp
 from src.routes.documentos import documentos_bp
 from src.routes.whatsapp import whatsapp_bp
 from src.routes.integracoes import integracoes_bp
+from src.routes.search import search_bp
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 
@@ -34,6 +35,21 @@ jwt = JWTManager(app)
 # Inicializar banco de dados
 db_instance = Database()
 
+# Criar índices declarados nos modelos e alinhar contadores.
+# Erro de import aqui é bug: deixa a aplicação falhar na inicialização.
+import src.models  # noqa: E402 - registra os modelos
+
+try:
+    db_instance.ensure_indexes()
+    src.models.Orcamento.seed_sequence()
+    src.models.Cliente.backfill_busca()
+    src.models.Lead.backfill_busca()
+    src.models.Lead.backfill_fingerprint()
+except Exception:
+    # Sem índices e contadores a API responde errado: falhar em vez de subir assim
+    app.logger.exception("Erro ao preparar banco de dados")
+    raise
+
 # Registrar blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(clientes_bp, url_prefix='/api/clientes')
@@ -44,12 +60,36 @@ app.register_blueprint(ia_bp, url_prefix='/api/ia')
 app.register_blueprint(documentos_bp, url_prefix='/api/documentos')
 app.register_blueprint(whatsapp_bp, url_prefix='/api/whatsapp')
 app.register_blueprint(integracoes_bp, url_prefix='/api/integracoes')
+app.register_blueprint(search_bp, url_prefix='/api/search')
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Endpoint de verificação de saúde"""
     return {"status": "ok", "message": "VIP Mudanças API está funcionando"}, 200
 
+@app.route('/api/health/indexes', methods=['GET'])
+@jwt_required()
+def health_indexes():
+    """Relatório de índices ausentes ou extras"""
+    try:
+        return {"indexes": db_instance.index_report()}, 200
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@app.route('/api/health/cache', methods=['GET'])
+@jwt_required()
+def health_cache():
+    """Contadores de acerto/erro do cache de respostas"""
+    from src.cache import response_cache
+    return {"cache": response_cache.stats()}, 200
+
+@app.route('/api/health/fetcher', methods=['GET'])
+@jwt_required()
+def health_fetcher():
+    """Métricas do cliente HTTP dos portais de licitação"""
+    from src.fetcher import fetcher
+    return {"fetcher": dict(fetcher.metricas)}, 200
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
@@ -91,5 +131,10 @@ def create_default_user():
         app._user_created = True
 
 if __name__ == '__main__':
+    from src.typeahead import typeahead
+    typeahead.iniciar()
+    if Config.MONITOR_ENABLED:
+        from src.monitoramento import scheduler
+        scheduler.iniciar()
     app.run(host='0.0.0.0', port=5000, debug=True)
 
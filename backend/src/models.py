@@ -1,10 +1,174 @@
-from datetime import datetime
-from bson import ObjectId
+from datetime import datetime, timedelta
+from bson import Binary, ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 from src.database import db
+from src.pagination import paginate
+from src.sequences import Sequence
+from src.cache import invalidate
+from src.typeahead import typeahead, CAMPOS as CAMPOS_TYPEAHEAD
+from src.text import normalizar, normalizar_url, somente_digitos
+from src.indexes import register_indexes, index, ASCENDING, DESCENDING
 import bcrypt
+import hashlib
+import logging
+import zlib
 
+def _chave_status(status):
+    """Normalizar status para uso como chave (minúsculo, sem '.' ou '$')"""
+    chave = (status or "").lower().replace(".", "_").lstrip("$")
+    return chave or "sem_status"
+
+def _estatisticas_por_status(collection, facets=None):
+    """Contagem por status e facets extras em uma única agregação"""
+    pipeline_facets = {
+        "por_status": [
+            {"$group": {"_id": {"$toLower": {"$ifNull": ["$status", ""]}}, "total": {"$sum": 1}}}
+        ],
+        **(facets or {})
+    }
+    resultado = next(collection.aggregate([{"$facet": pipeline_facets}]), {})
+    
+    por_status = {}
+    for item in resultado.get("por_status", []):
+        chave = _chave_status(item["_id"])
+        por_status[chave] = por_status.get(chave, 0) + item["total"]
+    estatisticas = {"por_status": por_status, "total": sum(por_status.values())}
+    for nome in (facets or {}):
+        valores = resultado.get(nome, [])
+        estatisticas[nome] = valores[0] if valores else {}
+    return estatisticas
+
+def _upsert_em_lote(collection, modulo, registros, filtro_de, padroes_de, apos_gravar=None):
+    """Upserts em um único bulk_write não ordenado; retorna contagens"""
+    agora = datetime.utcnow()
+    ignorados = 0
+    
+    # Deduplicar dentro do próprio lote (o último registro prevalece)
+    por_chave = {}
+    for registro in registros:
+        filtro = filtro_de(registro)
+        if filtro is None:
+            ignorados += 1
+            continue
+        chave = tuple(sorted(filtro.items()))
+        if chave in por_chave:
+            ignorados += 1
+        por_chave[chave] = (filtro, registro)
+    
+    # Duas passadas: a primeira só altera (e marca updated_at) documentos que
+    # mudaram de fato; a segunda insere os que ainda não existem
+    alteracoes = []
+    insercoes = []
+    status_operacoes = []
+    for filtro, registro in por_chave.values():
+        # Campos só definidos na inserção não sobrescrevem o trabalho já feito no registro
+        padroes = padroes_de(registro)
+        campos = {k: v for k, v in registro.items() if k not in padroes and k != "_id"}
+        campos.update(filtro)
+        alteracoes.append(UpdateOne(
+            {**filtro, "$or": [{campo: {"$ne": valor}} for campo, valor in campos.items()]},
+            {"$set": {**campos, "updated_at": agora}}
+        ))
+        insercoes.append(UpdateOne(
+            filtro,
+            {"$setOnInsert": {**campos, **padroes, "created_at": agora, "updated_at": agora}},
+            upsert=True
+        ))
+        status_operacoes.append(padroes.get("status"))
+    
+    if not insercoes:
+        return {"inserted": 0, "updated": 0, "skipped": ignorados, "ids": []}
+    
+    alterados = collection.bulk_write(alteracoes, ordered=False).modified_count
+    result = collection.bulk_write(insercoes, ordered=False)
+    
+    ids = []
+    inseridos_por_status = {}
+    for posicao, inserted_id in result.upserted_ids.items():
+        ids.append(str(inserted_id))
+        status = status_operacoes[posicao]
+        inseridos_por_status[status] = inseridos_por_status.get(status, 0) + 1
+    if inseridos_por_status:
+        DashboardCounters.incrementar_lote(modulo, inseridos_por_status)
+    if result.upserted_count or alterados:
+        invalidate(modulo)
+        if apos_gravar is not None:
+            apos_gravar([filtro for filtro, _ in por_chave.values()])
+    
+    return {
+        "inserted": result.upserted_count,
+        "updated": alterados,
+        "skipped": ignorados + len(insercoes) - result.upserted_count - alterados,
+        "ids": ids
+    }
+
+# Campos de texto com cópia normalizada (sem acentos) em `busca`
+CAMPOS_BUSCA = ("nome", "email", "empresa", "cargo")
+
+def _campos_busca(data):
+    """Campos-sombra normalizados usados pelo índice de texto"""
+    busca = {campo: normalizar(data.get(campo)) for campo in CAMPOS_BUSCA}
+    busca["telefone"] = somente_digitos(data.get("telefone"))
+    return busca
+
+def _indice_busca():
+    """Índice de texto em português sobre os campos-sombra"""
+    return index(
+        [(f"busca.{campo}", "text") for campo in CAMPOS_BUSCA + ("telefone",)],
+        "busca_text",
+        default_language="portuguese",
+        language_override="idioma_busca",
+        weights={"busca.nome": 10, "busca.empresa": 5, "busca.telefone": 5, "busca.email": 3, "busca.cargo": 2}
+    )
+
+def _buscar_texto(collection, termo, page=1, limit=20, projection=None):
+    """Busca textual ordenada por relevância, paginada"""
+    consulta = normalizar(termo)
+    digitos = somente_digitos(termo)
+    if digitos and digitos not in consulta:
+        consulta = f"{consulta} {digitos}"
+    if not consulta:
+        return [], False
+    
+    campos = dict(projection) if projection else {"busca": 0}
+    campos["score"] = {"$meta": "textScore"}
+    
+    # Um documento a mais indica se existe próxima página
+    docs = list(
+        collection.find({"$text": {"$search": consulta}}, campos)
+        .sort([("score", {"$meta": "textScore"})])
+        .skip((page - 1) * limit)
+        .limit(limit + 1)
+    )
+    tem_mais = len(docs) > limit
+    docs = docs[:limit]
+    for doc in docs:
+        doc['_id'] = str(doc['_id'])
+    return docs, tem_mais
+
+def _preencher_busca(collection, batch_size=500):
+    """Preencher `busca` em documentos antigos (bulk_write por lote)"""
+    campos = {campo: 1 for campo in CAMPOS_BUSCA + ("telefone",)}
+    operacoes = []
+    total = 0
+    for doc in collection.find({"busca": {"$exists": False}}, campos, batch_size=batch_size):
+        operacoes.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"busca": _campos_busca(doc)}}))
+        if len(operacoes) >= batch_size:
+            collection.bulk_write(operacoes, ordered=False)
+            total += len(operacoes)
+            operacoes = []
+    if operacoes:
+        collection.bulk_write(operacoes, ordered=False)
+        total += len(operacoes)
+    return total
+
+@register_indexes
 class User:
     collection = db.users
+    indexes = [
+        index([("email", ASCENDING)], "email_unique", unique=True)
+    ]
     
     @staticmethod
     def create_user(email, password, name, role='admin'):
@@ -46,8 +210,17 @@ class User:
             user['_id'] = str(user['_id'])
         return user
 
+@register_indexes
 class Cliente:
     collection = db.clientes
+    indexes = [
+        index([("created_at", DESCENDING), ("_id", DESCENDING)], "created_at_-1__id_-1"),
+        index([("status", ASCENDING), ("created_at", DESCENDING)], "status_created_at"),
+        index([("updated_at", ASCENDING)], "updated_at"),
+        index([("perfil", ASCENDING), ("_id", ASCENDING)], "perfil_id"),
+        index([("perfil_atualizado_em", ASCENDING), ("_id", ASCENDING)], "perfil_atualizado_em_id"),
+        _indice_busca()
+    ]
     
     @staticmethod
     def create(data):
@@ -59,10 +232,14 @@ class Cliente:
             "status": data.get("status", "Novo"),
             "perfil": data.get("perfil", ""),
             "documentos": [],
-            "historico": []
+            "historico": [],
+            "busca": _campos_busca(data)
         }
         
         result = Cliente.collection.insert_one(cliente_data)
+        DashboardCounters.incrementar("clientes", cliente_data["status"])
+        invalidate("clientes")
+        typeahead.atualizar("cliente", result.inserted_id, cliente_data)
         return str(result.inserted_id)
     
     @staticmethod
@@ -73,10 +250,15 @@ class Cliente:
             cliente['_id'] = str(cliente['_id'])
         return clientes
     
+    @staticmethod
+    def get_page(cursor=None, limit=50, projection=None):
+        """Listar clientes paginados por cursor"""
+        return paginate(Cliente.collection, cursor=cursor, limit=limit, projection=projection)
+    
     @staticmethod
     def get_by_id(cliente_id):
         """Buscar cliente por ID"""
-        cliente = Cliente.collection.find_one({"_id": ObjectId(cliente_id)})
+        cliente = Cliente.collection.find_one({"_id": ObjectId(cliente_id)}, {"busca": 0})
         if cliente:
             cliente['_id'] = str(cliente['_id'])
         return cliente
@@ -85,14 +267,131 @@ class Cliente:
     def update(cliente_id, data):
         """Atualizar cliente"""
         data["updated_at"] = datetime.utcnow()
-        result = Cliente.collection.update_one(
+        
+        # Recalcular campos de busca quando algum campo pesquisável mudar
+        campos_busca = CAMPOS_BUSCA + ("telefone",)
+        atual = None
+        if any(campo in data for campo in campos_busca):
+            atual = Cliente.collection.find_one(
+                {"_id": ObjectId(cliente_id)},
+                {campo: 1 for campo in campos_busca}
+            ) or {}
+            data["busca"] = _campos_busca({**atual, **data})
+        
+        # Documento anterior para transferir o contador de status
+        anterior = Cliente.collection.find_one_and_update(
             {"_id": ObjectId(cliente_id)},
-            {"$set": data}
+            {"$set": data},
+            projection={"status": 1},
+            return_document=ReturnDocument.BEFORE
         )
-        return result.modified_count > 0
+        if anterior is None:
+            return False
+        
+        # Autocomplete só depois da escrita confirmada (id inexistente não entra no índice)
+        if atual is not None:
+            typeahead.atualizar("cliente", cliente_id, {**atual, **data})
+        
+        if "status" in data and data["status"] != anterior.get("status"):
+            DashboardCounters.transferir("clientes", anterior.get("status"), data["status"])
+        invalidate("clientes")
+        return True
+    
+    @staticmethod
+    def search(termo, page=1, limit=20, projection=None):
+        """Busca textual sem acentos, ordenada por relevância"""
+        return _buscar_texto(Cliente.collection, termo, page, limit, projection)
+    
+    @staticmethod
+    def backfill_busca():
+        """Preencher campos de busca em clientes antigos"""
+        return _preencher_busca(Cliente.collection)
+    
+    @staticmethod
+    def sem_perfil(corte, apos_id=None, limit=100):
+        """Clientes sem perfil ou com perfil calculado antes de `corte`, em ordem de _id"""
+        filtro = {"$or": [
+            {"perfil": {"$in": [None, ""]}},
+            {"perfil_atualizado_em": {"$lt": corte}}
+        ]}
+        if apos_id is not None:
+            filtro["_id"] = {"$gt": apos_id}
+        # Histórico e documentos limitados ao que a pré-classificação usa
+        campos = {
+            "nome": 1, "email": 1, "telefone": 1, "empresa": 1, "status": 1, "perfil": 1,
+            "historico": {"$slice": -5}, "documentos": {"$slice": -5}
+        }
+        return list(Cliente.collection.find(filtro, campos).sort("_id", 1).limit(limit))
+    
+    @staticmethod
+    def gravar_perfis(perfis):
+        """Gravar [(cliente_id, perfil, justificativa, origem)] em um único bulk_write"""
+        if not perfis:
+            return 0
+        agora = datetime.utcnow()
+        operacoes = [
+            UpdateOne({"_id": cliente_id}, {"$set": {
+                "perfil": perfil,
+                "perfil_justificativa": justificativa,
+                "perfil_origem": origem,
+                "perfil_atualizado_em": agora,
+                "updated_at": agora
+            }})
+            for cliente_id, perfil, justificativa, origem in perfis
+        ]
+        result = Cliente.collection.bulk_write(operacoes, ordered=False)
+        invalidate("clientes")
+        return result.modified_count
+    
+    @staticmethod
+    def estatisticas():
+        """Contagem de clientes por status (agregação no banco)"""
+        return _estatisticas_por_status(Cliente.collection)
 
+@register_indexes
 class Lead:
     collection = db.leads
+    indexes = [
+        index([("created_at", DESCENDING), ("_id", DESCENDING)], "created_at_-1__id_-1"),
+        index([("status", ASCENDING), ("created_at", DESCENDING)], "status_created_at"),
+        index([("fingerprint", ASCENDING)], "fingerprint_unique", unique=True,
+              partialFilterExpression={"fingerprint": {"$type": "string"}}),
+        index([("updated_at", ASCENDING)], "updated_at"),
+        _indice_busca()
+    ]
+    
+    @staticmethod
+    def fingerprint(data):
+        """Identificador estável: nome + empresa + linkedin_url normalizados"""
+        partes = [
+            normalizar(data.get("nome")),
+            normalizar(data.get("empresa")),
+            normalizar_url(data.get("linkedin_url"))
+        ]
+        if not partes[0]:
+            return None
+        return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def create_many(registros):
+        """Importar leads em lote, sem duplicar capturas repetidas"""
+        def filtro_de(registro):
+            fingerprint = Lead.fingerprint(registro)
+            return {"fingerprint": fingerprint} if fingerprint else None
+        
+        def padroes_de(registro):
+            return {
+                "status": registro.get("status", "Novo"),
+                "fonte": registro.get("fonte", "LinkedIn"),
+                "convertido": False
+            }
+        
+        def apos_gravar(filtros):
+            # Cursor só é consumido se o autocomplete estiver ativo neste processo
+            typeahead.atualizar_lote("lead", Lead.collection.find({"$or": filtros}, CAMPOS_TYPEAHEAD))
+        
+        registros = [{**registro, "busca": _campos_busca(registro)} for registro in registros]
+        return _upsert_em_lote(Lead.collection, "leads", registros, filtro_de, padroes_de, apos_gravar)
     
     @staticmethod
     def create(data):
@@ -103,10 +402,19 @@ class Lead:
             "updated_at": datetime.utcnow(),
             "status": data.get("status", "Novo"),
             "fonte": data.get("fonte", "LinkedIn"),
-            "convertido": False
+            "convertido": False,
+            "busca": _campos_busca(data),
+            # Mesma chave de create_many: importar depois não duplica o lead
+            "fingerprint": Lead.fingerprint(data)
         }
         
-        result = Lead.collection.insert_one(lead_data)
+        try:
+            result = Lead.collection.insert_one(lead_data)
+        except DuplicateKeyError:
+            raise ValueError("Lead já cadastrado (mesmo nome, empresa e LinkedIn)")
+        DashboardCounters.incrementar("leads", lead_data["status"])
+        invalidate("leads")
+        typeahead.atualizar("lead", result.inserted_id, lead_data)
         return str(result.inserted_id)
     
     @staticmethod
@@ -116,9 +424,153 @@ class Lead:
         for lead in leads:
             lead['_id'] = str(lead['_id'])
         return leads
+    
+    @staticmethod
+    def get_page(cursor=None, limit=50, projection=None):
+        """Listar leads paginados por cursor"""
+        return paginate(Lead.collection, cursor=cursor, limit=limit, projection=projection)
+    
+    @staticmethod
+    def iter_export(campos, batch_size=1000):
+        """Percorrer leads em lotes do cursor, apenas com os campos exportados"""
+        projection = {campo: 1 for campo in campos}
+        projection["_id"] = 0
+        cursor = Lead.collection.find({}, projection, batch_size=batch_size).sort(
+            [("created_at", -1), ("_id", -1)]
+        )
+        try:
+            for lead in cursor:
+                yield lead
+        finally:
+            cursor.close()
+    
+    @staticmethod
+    def search(termo, page=1, limit=20, projection=None):
+        """Busca textual sem acentos, ordenada por relevância"""
+        return _buscar_texto(Lead.collection, termo, page, limit, projection)
+    
+    @staticmethod
+    def backfill_busca():
+        """Preencher campos de busca em leads antigos"""
+        return _preencher_busca(Lead.collection)
+    
+    @staticmethod
+    def backfill_fingerprint(batch_size=500):
+        """Preencher `fingerprint` em leads antigos (duplicados ficam com None)"""
+        existentes = set(Lead.collection.distinct("fingerprint", {"fingerprint": {"$type": "string"}}))
+        campos = {"nome": 1, "empresa": 1, "linkedin_url": 1}
+        operacoes = []
+        total = 0
+        for doc in Lead.collection.find({"fingerprint": {"$exists": False}}, campos, batch_size=batch_size):
+            fingerprint = Lead.fingerprint(doc)
+            if fingerprint in existentes:
+                # Já existe outro lead com a mesma chave: não violar o índice único
+                fingerprint = None
+            elif fingerprint:
+                existentes.add(fingerprint)
+            operacoes.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"fingerprint": fingerprint}}))
+            if len(operacoes) >= batch_size:
+                Lead.collection.bulk_write(operacoes, ordered=False)
+                total += len(operacoes)
+                operacoes = []
+        if operacoes:
+            Lead.collection.bulk_write(operacoes, ordered=False)
+            total += len(operacoes)
+        return total
+    
+    @staticmethod
+    def estatisticas():
+        """Contagem de leads por status (agregação no banco)"""
+        return _estatisticas_por_status(Lead.collection)
 
+@register_indexes
 class Licitacao:
     collection = db.licitacoes
+    indexes = [
+        index([("created_at", DESCENDING), ("_id", DESCENDING)], "created_at_-1__id_-1"),
+        index([("status", ASCENDING), ("created_at", DESCENDING)], "status_created_at"),
+        index([("data_limite", ASCENDING)], "data_limite"),
+        index([("data_abertura", DESCENDING)], "data_abertura"),
+        index([("portal", ASCENDING), ("numero", ASCENDING)], "portal_numero_unique", unique=True,
+              partialFilterExpression={"portal": {"$type": "string"}, "numero": {"$type": "string"}}),
+        index([("updated_at", ASCENDING)], "updated_at"),
+        index([("edital_status", ASCENDING), ("edital_lease_ate", ASCENDING)], "edital_status_lease"),
+        index(
+            [("titulo", "text"), ("descricao", "text"), ("orgao", "text"), ("edital_termos", "text")],
+            "busca_text",
+            default_language="portuguese",
+            language_override="idioma_busca",
+            weights={"titulo": 10, "descricao": 5, "orgao": 3, "edital_termos": 1}
+        )
+    ]
+    
+    # Termos do edital só servem ao índice de texto
+    PROJECAO_PADRAO = {"edital_termos": 0}
+    
+    @staticmethod
+    def preparar_indices(collection, lote=1000):
+        """Remover duplicatas de (portal, numero) antes de criar o índice único"""
+        # Versões antigas do /buscar inseriam a mesma licitação a cada busca.
+        # Fica a cópia atualizada mais recentemente (empate: a mais antiga).
+        if "portal_numero_unique" in collection.index_information():
+            return 0
+        
+        grupos = collection.aggregate([
+            {"$match": {"portal": {"$type": "string"}, "numero": {"$type": "string"}}},
+            {"$sort": {"updated_at": -1, "_id": 1}},
+            {"$group": {
+                "_id": {"portal": "$portal", "numero": "$numero"},
+                "manter": {"$first": "$_id"},
+                "ids": {"$push": "$_id"},
+                "total": {"$sum": 1}
+            }},
+            {"$match": {"total": {"$gt": 1}}}
+        ], allowDiskUse=True)
+        
+        removidos = 0
+        excedentes = []
+        for grupo in grupos:
+            excedentes.extend(_id for _id in grupo["ids"] if _id != grupo["manter"])
+            if len(excedentes) >= lote:
+                removidos += collection.delete_many({"_id": {"$in": excedentes}}).deleted_count
+                excedentes = []
+        if excedentes:
+            removidos += collection.delete_many({"_id": {"$in": excedentes}}).deleted_count
+        
+        if removidos:
+            logging.warning(f"{removidos} licitações duplicadas (portal, numero) removidas")
+            DashboardCounters.rebuild()
+        return removidos
+    
+    @staticmethod
+    def urls_edital(licitacao):
+        """URLs do edital e anexos (str ou {"url": ...})"""
+        urls = []
+        for anexo in [licitacao.get("edital_url")] + list(licitacao.get("anexos") or []):
+            url = anexo.get("url") if isinstance(anexo, dict) else anexo
+            if url and url not in urls:
+                urls.append(url)
+        return urls
+    
+    @staticmethod
+    def create_many(registros):
+        """Importar licitações em lote, chaveadas por (portal, numero)"""
+        def filtro_de(registro):
+            portal, numero = registro.get("portal"), registro.get("numero")
+            if not portal or not numero:
+                return None
+            return {"portal": str(portal), "numero": str(numero)}
+        
+        def padroes_de(registro):
+            padroes = {
+                "status": registro.get("status", "Aberta"),
+                "monitorada": True
+            }
+            if Licitacao.urls_edital(registro):
+                padroes["edital_status"] = "pendente"
+            return padroes
+        
+        return _upsert_em_lote(Licitacao.collection, "licitacoes", registros, filtro_de, padroes_de)
     
     @staticmethod
     def create(data):
@@ -130,42 +582,231 @@ class Licitacao:
             "status": data.get("status", "Aberta"),
             "monitorada": True
         }
+        if Licitacao.urls_edital(data):
+            licitacao_data["edital_status"] = "pendente"
         
         result = Licitacao.collection.insert_one(licitacao_data)
+        DashboardCounters.incrementar("licitacoes", licitacao_data["status"])
+        invalidate("licitacoes")
         return str(result.inserted_id)
     
     @staticmethod
     def get_all():
         """Listar todas as licitações"""
-        licitacoes = list(Licitacao.collection.find().sort("created_at", -1))
+        licitacoes = list(Licitacao.collection.find({}, Licitacao.PROJECAO_PADRAO).sort("created_at", -1))
         for licitacao in licitacoes:
             licitacao['_id'] = str(licitacao['_id'])
         return licitacoes
+    
+    @staticmethod
+    def get_page(cursor=None, limit=50, projection=None):
+        """Listar licitações paginadas por cursor"""
+        return paginate(Licitacao.collection, cursor=cursor, limit=limit,
+                        projection=projection or Licitacao.PROJECAO_PADRAO)
+    
+    @staticmethod
+    def search(termo, page=1, limit=20, projection=None):
+        """Busca textual em título, descrição, órgão e texto dos editais"""
+        return _buscar_texto(Licitacao.collection, termo, page, limit,
+                             projection=projection or Licitacao.PROJECAO_PADRAO)
+    
+    @staticmethod
+    def reservar_edital(dono, duracao_segundos):
+        """Reservar uma licitação com edital pendente (ou com lease vencido)"""
+        agora = datetime.utcnow()
+        return Licitacao.collection.find_one_and_update(
+            {"$or": [
+                {"edital_status": "pendente"},
+                {"edital_status": "processando", "edital_lease_ate": {"$lt": agora}}
+            ]},
+            {
+                "$set": {
+                    "edital_status": "processando",
+                    "edital_lease_dono": dono,
+                    "edital_lease_ate": agora + timedelta(seconds=duracao_segundos)
+                },
+                "$inc": {"edital_tentativas": 1}
+            },
+            projection={"titulo": 1, "descricao": 1, "edital_url": 1, "anexos": 1, "edital_tentativas": 1},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    @staticmethod
+    def concluir_edital(licitacao_id, dono, editais, analise=None, termos=None, erro=None, max_tentativas=3, tentativas=1):
+        """Gravar o resultado do processamento do edital e liberar o lease"""
+        campos = {
+            "editais": editais,
+            "edital_lease_dono": None,
+            "edital_lease_ate": None,
+            "edital_erro": erro,
+            "updated_at": datetime.utcnow()
+        }
+        if erro is None:
+            campos["edital_status"] = "processado"
+            campos["edital_analise"] = analise
+            campos["edital_termos"] = termos or []
+        else:
+            # Volta para a fila até esgotar as tentativas
+            campos["edital_status"] = "pendente" if tentativas < max_tentativas else "erro"
+        Licitacao.collection.update_one(
+            {"_id": licitacao_id, "edital_lease_dono": dono},
+            {"$set": campos}
+        )
+        invalidate("licitacoes")
+    
+    @staticmethod
+    def estatisticas_editais():
+        """Contagem de licitações por situação do edital"""
+        return {
+            item["_id"]: item["total"]
+            for item in Licitacao.collection.aggregate([
+                {"$match": {"edital_status": {"$exists": True}}},
+                {"$group": {"_id": "$edital_status", "total": {"$sum": 1}}}
+            ])
+        }
+    
+    @staticmethod
+    def estatisticas():
+        """Contagem de licitações por status (agregação no banco)"""
+        return _estatisticas_por_status(Licitacao.collection)
+    
+    @staticmethod
+    def estatisticas_detalhadas(inicio=None, fim=None):
+        """Totais, urgentes e distribuições por portal, órgão e prazo"""
+        # Sem microssegundos: o MongoDB devolve os limites do $bucket em milissegundos
+        agora = datetime.utcnow().replace(microsecond=0)
+        
+        filtro = {}
+        if inicio or fim:
+            filtro["data_abertura"] = {}
+            if inicio:
+                filtro["data_abertura"]["$gte"] = inicio
+            if fim:
+                filtro["data_abertura"]["$lt"] = fim
+        
+        # Janelas de prazo em dias até data_limite: 0-3, 4-7 e 8-30
+        limites = [agora + timedelta(days=d) for d in (0, 4, 8, 31)]
+        rotulos = {limites[0]: "0-3", limites[1]: "4-7", limites[2]: "8-30"}
+        
+        pipeline = [
+            {"$match": filtro},
+            {"$facet": {
+                "totais": [
+                    {"$group": {
+                        "_id": None,
+                        "total": {"$sum": 1},
+                        "abertas": {"$sum": {"$cond": [{"$eq": ["$status", "Aberta"]}, 1, 0]}},
+                        "urgentes": {"$sum": {"$cond": [
+                            {"$and": [
+                                {"$eq": [{"$type": "$data_limite"}, "date"]},
+                                {"$lt": ["$data_limite", agora + timedelta(days=8)]}
+                            ]}, 1, 0
+                        ]}},
+                        "valor_total": {"$sum": {"$ifNull": ["$valor_estimado", 0]}}
+                    }}
+                ],
+                "por_portal": [
+                    {"$group": {
+                        "_id": {"$ifNull": ["$portal", "Não informado"]},
+                        "total": {"$sum": 1},
+                        "valor_total": {"$sum": {"$ifNull": ["$valor_estimado", 0]}}
+                    }},
+                    {"$sort": {"total": -1}}
+                ],
+                "por_orgao": [
+                    {"$group": {
+                        "_id": {"$ifNull": ["$orgao", "Não informado"]},
+                        "total": {"$sum": 1},
+                        "valor_total": {"$sum": {"$ifNull": ["$valor_estimado", 0]}}
+                    }},
+                    {"$sort": {"total": -1}},
+                    {"$limit": 20}
+                ],
+                "janelas_prazo": [
+                    {"$match": {"data_limite": {"$gte": limites[0], "$lt": limites[-1]}}},
+                    {"$bucket": {
+                        "groupBy": "$data_limite",
+                        "boundaries": limites,
+                        "output": {"total": {"$sum": 1}}
+                    }}
+                ]
+            }}
+        ]
+        resultado = next(Licitacao.collection.aggregate(pipeline), {})
+        
+        totais = resultado.get("totais") or [{}]
+        estatisticas = {
+            "total": totais[0].get("total", 0),
+            "abertas": totais[0].get("abertas", 0),
+            "urgentes": totais[0].get("urgentes", 0),
+            "valor_total": totais[0].get("valor_total", 0),
+            "por_portal": [
+                {"portal": item["_id"], "total": item["total"], "valor_total": item["valor_total"]}
+                for item in resultado.get("por_portal", [])
+            ],
+            "por_orgao": [
+                {"orgao": item["_id"], "total": item["total"], "valor_total": item["valor_total"]}
+                for item in resultado.get("por_orgao", [])
+            ],
+            "janelas_prazo": {rotulo: 0 for rotulo in rotulos.values()}
+        }
+        for item in resultado.get("janelas_prazo", []):
+            estatisticas["janelas_prazo"][rotulos[item["_id"]]] = item["total"]
+        return estatisticas
 
+@register_indexes
 class Orcamento:
     collection = db.orcamentos
+    indexes = [
+        index([("ano", ASCENDING), ("numero", DESCENDING)], "ano_numero_unique", unique=True),
+        index([("status", ASCENDING), ("created_at", DESCENDING)], "status_created_at")
+    ]
     
     @staticmethod
     def create(data):
         """Criar novo orçamento"""
-        # Gerar número sequencial
-        ultimo = Orcamento.collection.find_one(sort=[("numero", -1)])
-        numero = (ultimo['numero'] if ultimo else 0) + 1
+        # Gerar número sequencial (contador atômico por ano)
+        numero, ano = Sequence.next("orcamento")
         
         orcamento_data = {
             **data,
             "numero": numero,
-            "numero_formatado": f"{numero:03d}-2025",
+            "ano": ano,
+            "numero_formatado": Sequence.format(numero, ano),
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
             "status": data.get("status", "Pendente")
         }
         
         result = Orcamento.collection.insert_one(orcamento_data)
+        DashboardCounters.incrementar("orcamentos", orcamento_data["status"])
+        invalidate("orcamentos")
         return str(result.inserted_id)
+    
+    @staticmethod
+    def seed_sequence():
+        """Alinhar o contador do ano com orçamentos já existentes"""
+        ano = datetime.utcnow().year
+        ultimo = Orcamento.collection.find_one(
+            {"$or": [{"ano": ano}, {"ano": {"$exists": False}, "created_at": {"$gte": datetime(ano, 1, 1)}}]},
+            sort=[("numero", -1)],
+            projection={"numero": 1}
+        )
+        if ultimo:
+            Sequence.ensure_at_least("orcamento", ultimo["numero"], ano)
+    
+    @staticmethod
+    def estatisticas():
+        """Contagem de orçamentos por status (agregação no banco)"""
+        return _estatisticas_por_status(Orcamento.collection)
 
+@register_indexes
 class Financeiro:
     collection = db.financeiro
+    indexes = [
+        index([("created_at", DESCENDING)], "created_at"),
+        index([("tipo", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)], "tipo_status_created_at")
+    ]
     
     @staticmethod
     def create_transacao(data):
@@ -180,10 +821,42 @@ class Financeiro:
         }
         
         result = Financeiro.collection.insert_one(transacao_data)
+        DashboardCounters.incrementar("financeiro", transacao_data["status"])
+        invalidate("financeiro")
         return str(result.inserted_id)
+    
+    @staticmethod
+    def estatisticas():
+        """Transações por status e faturamento do mês corrente"""
+        return _estatisticas_por_status(Financeiro.collection, {
+            "faturamento_mes": Financeiro._pipeline_faturamento_mes()
+        })
+    
+    @staticmethod
+    def faturamento_mes():
+        """Receitas recebidas no mês corrente (consulta pelo índice tipo/status/created_at)"""
+        resultado = next(Financeiro.collection.aggregate(Financeiro._pipeline_faturamento_mes()), None)
+        return resultado["valor"] if resultado else 0
+    
+    @staticmethod
+    def _pipeline_faturamento_mes():
+        agora = datetime.utcnow()
+        inicio_mes = datetime(agora.year, agora.month, 1)
+        return [
+            {"$match": {
+                "tipo": "receita",
+                "status": {"$in": ["pago", "recebido", "Pago", "Recebido"]},
+                "created_at": {"$gte": inicio_mes}
+            }},
+            {"$group": {"_id": None, "valor": {"$sum": "$valor"}}}
+        ]
 
+@register_indexes
 class GuardaMoveis:
     collection = db.guarda_moveis
+    indexes = [
+        index([("status", ASCENDING), ("created_at", DESCENDING)], "status_created_at")
+    ]
     
     @staticmethod
     def create_box(data):
@@ -197,10 +870,21 @@ class GuardaMoveis:
         }
         
         result = GuardaMoveis.collection.insert_one(box_data)
+        DashboardCounters.incrementar("guarda_moveis", box_data["status"])
+        invalidate("guarda_moveis")
         return str(result.inserted_id)
+    
+    @staticmethod
+    def estatisticas():
+        """Contagem de boxes por status (agregação no banco)"""
+        return _estatisticas_por_status(GuardaMoveis.collection)
 
+@register_indexes
 class Estoque:
     collection = db.estoque
+    indexes = [
+        index([("created_at", DESCENDING)], "created_at")
+    ]
     
     @staticmethod
     def create_item(data):
@@ -215,5 +899,364 @@ class Estoque:
         }
         
         result = Estoque.collection.insert_one(item_data)
+        DashboardCounters.incrementar_estoque(item_data["quantidade"] < item_data["quantidade_minima"])
+        invalidate("estoque")
         return str(result.inserted_id)
+    
+    @staticmethod
+    def estatisticas():
+        """Total de itens e itens abaixo da quantidade mínima"""
+        return _estatisticas_por_status(Estoque.collection, {
+            "abaixo_minimo": [
+                {"$match": {"$expr": {"$lt": ["$quantidade", "$quantidade_minima"]}}},
+                {"$count": "total"}
+            ]
+        })
+
+class EditalTexto:
+    """Texto extraído de editais, comprimido e endereçado pelo SHA-256 do arquivo"""
+    collection = db.editais_texto
+    
+    @staticmethod
+    def existe(sha256):
+        return EditalTexto.collection.count_documents({"_id": sha256}, limit=1) > 0
+    
+    @staticmethod
+    def salvar(sha256, comprimido, paginas, caracteres, tamanho_bytes):
+        EditalTexto.collection.update_one(
+            {"_id": sha256},
+            {"$setOnInsert": {
+                "texto_zlib": Binary(comprimido),
+                "paginas": paginas,
+                "caracteres": caracteres,
+                "tamanho_bytes": tamanho_bytes,
+                "created_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+    
+    @staticmethod
+    def texto(sha256):
+        """Texto descomprimido (ou "" se ainda não extraído)"""
+        doc = EditalTexto.collection.find_one({"_id": sha256}, {"texto_zlib": 1})
+        if not doc:
+            return ""
+        return zlib.decompress(doc["texto_zlib"]).decode("utf-8")
+
+class MonitoramentoConfig:
+    """Configuração do monitoramento de licitações (documento único)"""
+    collection = db.monitoramento_config
+    DOC_ID = "licitacoes"
+    
+    @staticmethod
+    def salvar(palavras_chave, portais, email_alertas=True, ativo=True):
+        """Salvar configuração e sincronizar o estado de cada portal"""
+        agora = datetime.utcnow()
+        config = MonitoramentoConfig.collection.find_one_and_update(
+            {"_id": MonitoramentoConfig.DOC_ID},
+            {
+                "$set": {
+                    "palavras_chave": palavras_chave,
+                    "portais": portais,
+                    "email_alertas": email_alertas,
+                    "ativo": ativo,
+                    "updated_at": agora
+                },
+                "$setOnInsert": {"configurado_em": agora}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        MonitoramentoPortal.sincronizar(portais)
+        return config
+    
+    @staticmethod
+    def get():
+        """Configuração atual (None se nunca configurado)"""
+        return MonitoramentoConfig.collection.find_one({"_id": MonitoramentoConfig.DOC_ID})
+
+@register_indexes
+class MonitoramentoPortal:
+    """Estado e lease de varredura por portal"""
+    collection = db.monitoramento_portais
+    indexes = [
+        index([("ativo", ASCENDING), ("proxima_busca", ASCENDING)], "ativo_proxima_busca")
+    ]
+    
+    @staticmethod
+    def sincronizar(portais):
+        """Criar/atualizar portais configurados e desativar os removidos"""
+        agora = datetime.utcnow()
+        nomes = []
+        operacoes = []
+        for portal in portais:
+            nomes.append(portal["nome"])
+            operacoes.append(UpdateOne(
+                {"_id": portal["nome"]},
+                {
+                    "$set": {"intervalo_minutos": portal["intervalo_minutos"], "ativo": True},
+                    "$setOnInsert": {"proxima_busca": agora, "ultima_busca": None}
+                },
+                upsert=True
+            ))
+        if operacoes:
+            MonitoramentoPortal.collection.bulk_write(operacoes, ordered=False)
+        MonitoramentoPortal.collection.update_many(
+            {"_id": {"$nin": nomes}}, {"$set": {"ativo": False}}
+        )
+    
+    @staticmethod
+    def vencidos(agora):
+        """Portais ativos com varredura vencida"""
+        return list(MonitoramentoPortal.collection.find(
+            {"ativo": True, "proxima_busca": {"$lte": agora}}
+        ))
+    
+    @staticmethod
+    def adquirir_lease(portal, dono, duracao_segundos):
+        """Reservar o portal para um worker; None se outro já está varrendo"""
+        agora = datetime.utcnow()
+        return MonitoramentoPortal.collection.find_one_and_update(
+            {
+                "_id": portal,
+                "ativo": True,
+                "proxima_busca": {"$lte": agora},
+                "$or": [{"lease_expira_em": None}, {"lease_expira_em": {"$lte": agora}}]
+            },
+            {"$set": {"lease_dono": dono, "lease_expira_em": agora + timedelta(seconds=duracao_segundos)}},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    @staticmethod
+    def concluir(portal, dono, inicio, proxima_busca, resultado=None, erro=None):
+        """Registrar fim da varredura e liberar o lease"""
+        campos = {
+            "proxima_busca": proxima_busca,
+            "lease_dono": None,
+            "lease_expira_em": None,
+            "ultimo_resultado": resultado,
+            "ultimo_erro": erro
+        }
+        if erro is None:
+            # Só avança a busca incremental quando a varredura terminou bem
+            campos["ultima_busca"] = inicio
+        MonitoramentoPortal.collection.update_one(
+            {"_id": portal, "lease_dono": dono},
+            {"$set": campos}
+        )
+    
+    @staticmethod
+    def get_all():
+        """Estado de todos os portais"""
+        return list(MonitoramentoPortal.collection.find().sort("_id", 1))
 
+class Job:
+    """Estado e checkpoint de jobs em lote, com lease para um executor por vez"""
+    collection = db.jobs
+    
+    @staticmethod
+    def reservar(nome, dono, duracao_segundos):
+        """Adquirir o lease do job; None se outro processo está executando"""
+        agora = datetime.utcnow()
+        try:
+            return Job.collection.find_one_and_update(
+                {"_id": nome, "$or": [
+                    {"lease_dono": None},
+                    {"lease_expira_em": {"$lt": agora}}
+                ]},
+                {"$set": {
+                    "lease_dono": dono,
+                    "lease_expira_em": agora + timedelta(seconds=duracao_segundos)
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            return None
+    
+    @staticmethod
+    def checkpoint(nome, dono, campos=None, incrementos=None, duracao_segundos=None):
+        """Gravar progresso e renovar o lease; False se o lease foi perdido"""
+        atualizacao = {"$set": dict(campos or {})}
+        if duracao_segundos:
+            atualizacao["$set"]["lease_expira_em"] = datetime.utcnow() + timedelta(seconds=duracao_segundos)
+        if incrementos:
+            atualizacao["$inc"] = incrementos
+        result = Job.collection.update_one({"_id": nome, "lease_dono": dono}, atualizacao)
+        return result.matched_count == 1
+    
+    @staticmethod
+    def liberar(nome, dono, campos=None):
+        """Liberar o lease registrando o estado final"""
+        Job.collection.update_one(
+            {"_id": nome, "lease_dono": dono},
+            {"$set": {**(campos or {}), "lease_dono": None, "lease_expira_em": None}}
+        )
+    
+    @staticmethod
+    def get(nome):
+        return Job.collection.find_one({"_id": nome})
+
+@register_indexes
+class IACache:
+    """Respostas da IA Mirante memorizadas por hash da entrada (expiram via TTL)"""
+    collection = db.ia_cache
+    indexes = [
+        index([("expira_em", ASCENDING)], "expira_em_ttl", expireAfterSeconds=0)
+    ]
+    
+    @staticmethod
+    def get(chave):
+        return IACache.collection.find_one(
+            {"_id": chave, "expira_em": {"$gt": datetime.utcnow()}},
+            {"resposta": 1, "latencia_ms": 1, "tokens": 1}
+        )
+    
+    @staticmethod
+    def salvar(chave, endpoint, resposta, latencia_ms, tokens, ttl_segundos):
+        agora = datetime.utcnow()
+        IACache.collection.update_one(
+            {"_id": chave},
+            {"$set": {
+                "endpoint": endpoint,
+                "resposta": resposta,
+                "latencia_ms": latencia_ms,
+                "tokens": tokens,
+                "created_at": agora,
+                "expira_em": agora + timedelta(seconds=ttl_segundos)
+            }},
+            upsert=True
+        )
+
+@register_indexes
+class ChatSessao:
+    """Sessões de chat da IA Mirante (janela de turnos + resumo), expiradas via TTL"""
+    collection = db.chat_sessoes
+    indexes = [
+        index([("expira_em", ASCENDING)], "expira_em_ttl", expireAfterSeconds=0),
+        index([("user", ASCENDING), ("atualizado_em", DESCENDING)], "user_atualizado_em")
+    ]
+    
+    @staticmethod
+    def get(chave):
+        return ChatSessao.collection.find_one({"_id": chave, "expira_em": {"$gt": datetime.utcnow()}})
+    
+    @staticmethod
+    def versao(chave):
+        """Versão atual da sessão (0 se não existe ou expirou), só pelo _id"""
+        doc = ChatSessao.collection.find_one(
+            {"_id": chave, "expira_em": {"$gt": datetime.utcnow()}}, {"versao": 1}
+        )
+        return doc.get("versao", 0) if doc else 0
+    
+    @staticmethod
+    def salvar(chave, sessao, versao_anterior, ttl_segundos):
+        """Gravar se ninguém alterou a sessão desde `versao_anterior`; False em conflito"""
+        agora = datetime.utcnow()
+        campos = {k: v for k, v in sessao.items() if k not in ("_id", "versao")}
+        campos.update({
+            "versao": versao_anterior + 1,
+            "atualizado_em": agora,
+            "expira_em": agora + timedelta(seconds=ttl_segundos)
+        })
+        filtro = {"_id": chave, "versao": versao_anterior}
+        if versao_anterior == 0:
+            # Sessão nova pode ocupar o lugar de uma expirada que o TTL ainda não removeu
+            filtro = {"_id": chave, "$or": [{"versao": 0}, {"expira_em": {"$lte": agora}}]}
+        try:
+            result = ChatSessao.collection.update_one(
+                filtro,
+                {"$set": campos},
+                upsert=versao_anterior == 0
+            )
+        except DuplicateKeyError:
+            return False
+        return result.matched_count == 1 or result.upserted_id is not None
+    
+    @staticmethod
+    def remover(chave):
+        return ChatSessao.collection.delete_one({"_id": chave}).deleted_count > 0
+
+class DashboardCounters:
+    """Contadores do dashboard mantidos com $inc a cada escrita"""
+    collection = db.dashboard_counters
+    DOC_ID = "global"
+    MODULOS = ("clientes", "leads", "licitacoes", "orcamentos", "financeiro", "guarda_moveis", "estoque")
+    
+    @staticmethod
+    def _inc(campos):
+        try:
+            DashboardCounters.collection.update_one(
+                {"_id": DashboardCounters.DOC_ID},
+                {"$inc": campos, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            # Contadores divergentes são corrigidos pela reconciliação
+            logging.error(f"Erro ao atualizar contadores do dashboard: {e}")
+    
+    @staticmethod
+    def incrementar(modulo, status, valor=1):
+        """Somar `valor` ao contador de status do módulo"""
+        DashboardCounters._inc({f"{modulo}.{_chave_status(status)}": valor})
+    
+    @staticmethod
+    def incrementar_lote(modulo, contagem_por_status):
+        """Somar várias contagens de status do módulo em uma única escrita"""
+        campos = {}
+        for status, total in contagem_por_status.items():
+            chave = f"{modulo}.{_chave_status(status)}"
+            campos[chave] = campos.get(chave, 0) + total
+        DashboardCounters._inc(campos)
+    
+    @staticmethod
+    def transferir(modulo, status_anterior, status_novo):
+        """Mover uma unidade de um status para outro"""
+        # Status diferentes com a mesma chave ("Novo" -> "novo") não mudam a contagem
+        if _chave_status(status_anterior) == _chave_status(status_novo):
+            return
+        DashboardCounters._inc({
+            f"{modulo}.{_chave_status(status_anterior)}": -1,
+            f"{modulo}.{_chave_status(status_novo)}": 1
+        })
+    
+    @staticmethod
+    def incrementar_estoque(abaixo_minimo):
+        """Contar novo item de estoque"""
+        campos = {"estoque.total": 1}
+        if abaixo_minimo:
+            campos["estoque.abaixo_minimo"] = 1
+        DashboardCounters._inc(campos)
+    
+    @staticmethod
+    def get():
+        """Ler contadores (reconstrói se ainda não existirem)"""
+        contadores = DashboardCounters.collection.find_one({"_id": DashboardCounters.DOC_ID})
+        if contadores is None:
+            contadores = DashboardCounters.rebuild()
+        return contadores
+    
+    @staticmethod
+    def rebuild():
+        """Reconciliação: recalcular todos os contadores a partir das coleções"""
+        estoque = Estoque.estatisticas()
+        contadores = {
+            "_id": DashboardCounters.DOC_ID,
+            "clientes": Cliente.estatisticas()["por_status"],
+            "leads": Lead.estatisticas()["por_status"],
+            "licitacoes": Licitacao.estatisticas()["por_status"],
+            "orcamentos": Orcamento.estatisticas()["por_status"],
+            "financeiro": Financeiro.estatisticas()["por_status"],
+            "guarda_moveis": GuardaMoveis.estatisticas()["por_status"],
+            "estoque": {
+                "total": estoque["total"],
+                "abaixo_minimo": estoque["abaixo_minimo"].get("total", 0)
+            },
+            "updated_at": datetime.utcnow(),
+            "reconciliado_em": datetime.utcnow()
+        }
+        DashboardCounters.collection.replace_one(
+            {"_id": DashboardCounters.DOC_ID}, contadores, upsert=True
+        )
+        invalidate(*DashboardCounters.MODULOS)
+        return contadores
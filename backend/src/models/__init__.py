@@ -5,7 +5,13 @@ import sys
 import os
 sys.path.append(os.path.dirname(__file__))
 
-from ..models import Cliente, Lead, Licitacao, Orcamento, Financeiro, GuardaMoveis, Estoque
+from ..models import (
+    Cliente, Lead, Licitacao, Orcamento, Financeiro, GuardaMoveis, Estoque, DashboardCounters,
+    EditalTexto, MonitoramentoConfig, MonitoramentoPortal, Job, IACache, ChatSessao
+)
 
-__all__ = ['User', 'Cliente', 'Lead', 'Licitacao', 'Orcamento', 'Financeiro', 'GuardaMoveis', 'Estoque']
+__all__ = [
+    'User', 'Cliente', 'Lead', 'Licitacao', 'Orcamento', 'Financeiro', 'GuardaMoveis', 'Estoque', 'DashboardCounters',
+    'EditalTexto', 'MonitoramentoConfig', 'MonitoramentoPortal', 'Job', 'IACache', 'ChatSessao'
+]
 
@@ -1,10 +1,15 @@
 from bson import ObjectId
 from src.database import db
+from src.indexes import register_indexes, index, ASCENDING
 import bcrypt
 from datetime import datetime
 
+@register_indexes
 class User:
     collection = db.users
+    indexes = [
+        index([("email", ASCENDING)], "email_unique", unique=True)
+    ]
     
     @staticmethod
     def create_user(email, password, name, role='admin'):
@@ -0,0 +1,247 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from src.config import Config
+from src.keywords import get_matcher, PALAVRAS_CHAVE_PADRAO
+
+# Portais com busca disponível
+PORTAIS_SUPORTADOS = ["ComprasNet", "SIGA-RJ"]
+
+# Simular resultados dos portais (em produção, faria scraping real)
+LICITACOES_SIMULADAS = [
+    {
+        "titulo": "Contratação de serviços de mudança para órgão público",
+        "orgao": "Prefeitura Municipal de São Paulo",
+        "numero": "001/2025",
+        "valor_estimado": 150000.00,
+        "data_abertura": datetime(2025, 7, 15),
+        "data_limite": datetime(2025, 7, 30),
+        "status": "Aberta",
+        "portal": "ComprasNet",
+        "url": "https://comprasnet.gov.br/licitacao/001-2025",
+        "descricao": "Serviços de mudança e transporte de móveis e equipamentos"
+    },
+    {
+        "titulo": "Remoção de móveis e equipamentos - Hospital Regional",
+        "orgao": "Secretaria de Saúde - RJ",
+        "numero": "002/2025",
+        "valor_estimado": 85000.00,
+        "data_abertura": datetime(2025, 7, 20),
+        "data_limite": datetime(2025, 8, 5),
+        "status": "Aberta",
+        "portal": "SIGA-RJ",
+        "url": "https://siga.rj.gov.br/licitacao/002-2025",
+        "descricao": "Serviços de remoção e transporte de equipamentos hospitalares"
+    }
+]
+
+def normalizar_portais(portais):
+    """Aceitar ["ComprasNet"] ou [{"nome": ..., "intervalo_minutos": ...}]"""
+    normalizados = []
+    for portal in portais or PORTAIS_SUPORTADOS:
+        if isinstance(portal, str):
+            portal = {"nome": portal}
+        nome = portal.get("nome")
+        if nome not in PORTAIS_SUPORTADOS:
+            raise ValueError(f"Portal não suportado: {nome}")
+        intervalo = int(portal.get("intervalo_minutos") or Config.MONITOR_INTERVALO_MINUTOS)
+        if intervalo < 1:
+            raise ValueError("intervalo_minutos deve ser maior que zero")
+        normalizados.append({"nome": nome, "intervalo_minutos": intervalo})
+    return normalizados
+
+def _simuladas(portal, desde=None):
+    return [
+        dict(licitacao) for licitacao in LICITACOES_SIMULADAS
+        if licitacao["portal"] == portal and (desde is None or licitacao["data_abertura"] >= desde)
+    ]
+
+def _pedidos_portal(portal):
+    # Páginas de listagem sem o filtro "desde": a URL fica estável e o
+    # ETag/Last-Modified da página pode ser reaproveitado entre varreduras
+    url = Config.PORTAL_ENDPOINTS[portal]
+    return [
+        {"portal": portal, "url": url, "params": {"pagina": str(pagina)}}
+        for pagina in range(1, Config.FETCH_PAGES_PER_PORTAL + 1)
+    ]
+
+def _converter_item(portal, item):
+    licitacao = dict(item)
+    licitacao["portal"] = portal
+    for campo in ("data_abertura", "data_limite"):
+        valor = licitacao.get(campo)
+        if isinstance(valor, str):
+            try:
+                licitacao[campo] = datetime.fromisoformat(valor.replace("Z", "")).replace(tzinfo=None)
+            except ValueError:
+                licitacao[campo] = None
+    return licitacao
+
+def buscar_em_portais(portais, desde=None):
+    """Licitações de vários portais em paralelo: ({portal: [licitações]}, {portal: erro}, validadores)"""
+    from src.fetcher import fetcher
+    
+    resultado = {portal: [] for portal in portais}
+    erros = {}
+    validadores = []
+    pedidos = []
+    for portal in portais:
+        if portal in Config.PORTAL_ENDPOINTS:
+            pedidos.extend(_pedidos_portal(portal))
+        else:
+            resultado[portal] = _simuladas(portal, desde)
+    
+    if pedidos:
+        for resposta in fetcher.run(fetcher.fetch_many(pedidos)):
+            portal = resposta["portal"]
+            if resposta["erro"]:
+                erros.setdefault(portal, resposta["erro"])
+                continue
+            if resposta["validadores"]:
+                validadores.append(resposta["validadores"])
+            # 304: página não mudou desde a última varredura
+            for item in resposta["itens"]:
+                licitacao = _converter_item(portal, item)
+                data_abertura = licitacao.get("data_abertura")
+                if desde is None or data_abertura is None or data_abertura >= desde:
+                    resultado[portal].append(licitacao)
+    
+    # ETags só são gravados por processar_licitacoes, depois do upsert dos itens
+    return resultado, erros, validadores
+
+def buscar_no_portal(portal, desde=None):
+    """Licitações publicadas no portal desde a última busca: (licitações, erro, validadores)"""
+    resultado, erros, validadores = buscar_em_portais([portal], desde)
+    return resultado[portal], erros.get(portal), validadores
+
+def processar_licitacoes(licitacoes, palavras_chave=None, validadores=None):
+    """Aplicar palavras-chave, gravar em lote (upsert por portal + numero) e só então os ETags"""
+    from src.models import Licitacao
+    from src.fetcher import fetcher
+    
+    matcher = get_matcher(palavras_chave or PALAVRAS_CHAVE_PADRAO)
+    for licitacao in licitacoes:
+        licitacao.update(matcher.analisar(licitacao.get("titulo", ""), licitacao.get("descricao", "")))
+    resultado = Licitacao.create_many(licitacoes)
+    if validadores:
+        fetcher.salvar_validadores(validadores)
+    return resultado
+
+class MonitorScheduler:
+    """Agendador de varreduras por portal com lease no MongoDB"""
+    # Cada worker roda o seu agendador; o lease garante que um portal é
+    # varrido por apenas um worker por vez.
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._pid = None
+        self._thread = None
+        self._parar = threading.Event()
+        self._executor = None
+        self._em_andamento = set()
+        self._lock = threading.Lock()
+        self.dono = None
+
+    def iniciar(self):
+        """Iniciar o agendador neste processo (idempotente)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.dono = f"{socket.gethostname()}:{self._pid}"
+            self._parar.clear()
+            self._executor = ThreadPoolExecutor(
+                max_workers=Config.MONITOR_MAX_CONCURRENCY,
+                thread_name_prefix="monitor"
+            )
+            self._thread = threading.Thread(target=self._loop, name="monitor-scheduler", daemon=True)
+            self._thread.start()
+            logging.info(f"Monitoramento de licitações iniciado ({self.dono})")
+
+    def parar(self):
+        self._parar.set()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    def _loop(self):
+        from src.models import MonitoramentoPortal
+        
+        while not self._parar.is_set():
+            try:
+                for portal in MonitoramentoPortal.vencidos(datetime.utcnow()):
+                    with self._lock:
+                        if portal["_id"] in self._em_andamento:
+                            continue
+                        self._em_andamento.add(portal["_id"])
+                    self._executor.submit(self._executar_portal, portal["_id"])
+                
+                # Editais pendentes são processados entre as varreduras
+                with self._lock:
+                    if "editais" not in self._em_andamento:
+                        self._em_andamento.add("editais")
+                        self._executor.submit(self._processar_editais)
+            except Exception as e:
+                logging.error(f"Erro no agendador de monitoramento: {e}")
+            
+            # Jitter evita que todos os workers consultem ao mesmo tempo
+            espera = Config.MONITOR_TICK_SECONDS * random.uniform(0.8, 1.2)
+            self._parar.wait(espera)
+
+    def _executar_portal(self, portal):
+        from src.models import MonitoramentoConfig, MonitoramentoPortal
+        
+        try:
+            estado = MonitoramentoPortal.adquirir_lease(portal, self.dono, Config.MONITOR_LEASE_SECONDS)
+            if estado is None:
+                return  # outro worker já está varrendo este portal
+            
+            config = MonitoramentoConfig.get() or {}
+            inicio = datetime.utcnow()
+            intervalo = timedelta(minutes=estado.get("intervalo_minutos", Config.MONITOR_INTERVALO_MINUTOS))
+            proxima = inicio + intervalo * random.uniform(1.0, 1.1)
+            
+            if not config.get("ativo", True):
+                MonitoramentoPortal.concluir(portal, self.dono, inicio, proxima, resultado={"pulado": "inativo"})
+                return
+            
+            try:
+                tempo = time.perf_counter()
+                licitacoes, erro, validadores = buscar_no_portal(portal, desde=estado.get("ultima_busca"))
+                resultado = processar_licitacoes(licitacoes, config.get("palavras_chave"), validadores)
+                resultado.pop("ids", None)
+                resultado["encontradas"] = len(licitacoes)
+                resultado["duracao_s"] = round(time.perf_counter() - tempo, 3)
+                # Com erro parcial, o que chegou é gravado mas ultima_busca não avança
+                MonitoramentoPortal.concluir(portal, self.dono, inicio, proxima, resultado=resultado, erro=erro)
+            except Exception as e:
+                logging.error(f"Erro na varredura do portal {portal}: {e}")
+                MonitoramentoPortal.concluir(portal, self.dono, inicio, proxima, erro=str(e))
+        finally:
+            with self._lock:
+                self._em_andamento.discard(portal)
+
+    def _processar_editais(self):
+        from src.editais import pipeline
+        
+        try:
+            pipeline.processar_pendentes()
+        except Exception as e:
+            logging.error(f"Erro ao processar editais: {e}")
+        finally:
+            with self._lock:
+                self._em_andamento.discard("editais")
+
+scheduler = MonitorScheduler()
+
+if hasattr(os, 'register_at_fork'):
+    # Threads não sobrevivem ao fork: cada worker inicia o seu agendador
+    os.register_at_fork(after_in_child=scheduler._reset)
@@ -0,0 +1,115 @@
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Índice composto que sustenta a paginação por cursor (created_at, _id)
+PAGINATION_INDEX = [("created_at", -1), ("_id", -1)]
+
+def encode_cursor(doc):
+    """Gerar cursor opaco a partir do último documento da página"""
+    payload = {
+        "c": doc["created_at"].isoformat() if doc.get("created_at") else None,
+        "i": str(doc["_id"])
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """Decodificar cursor opaco em (created_at, _id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        created_at = datetime.fromisoformat(payload["c"]) if payload.get("c") else None
+        return created_at, ObjectId(payload["i"])
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+def parse_limit(value):
+    """Validar parâmetro limit"""
+    if value in (None, ""):
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("Parâmetro limit deve ser um número inteiro")
+    if limit < 1:
+        raise ValueError("Parâmetro limit deve ser maior que zero")
+    return min(limit, MAX_LIMIT)
+
+def parse_page(value):
+    """Validar parâmetro page (começa em 1)"""
+    if value in (None, ""):
+        return 1
+    try:
+        page = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("Parâmetro page deve ser um número inteiro")
+    if page < 1:
+        raise ValueError("Parâmetro page deve ser maior que zero")
+    return page
+
+def parse_positive_int(value, name):
+    """Validar inteiro positivo sem teto (ex.: validade_dias)"""
+    if isinstance(value, bool):
+        raise ValueError(f"Parâmetro {name} deve ser um número inteiro")
+    try:
+        numero = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Parâmetro {name} deve ser um número inteiro")
+    if numero < 1:
+        raise ValueError(f"Parâmetro {name} deve ser maior que zero")
+    return numero
+
+def parse_fields(value):
+    """Converter ?fields=nome,email em projeção do MongoDB"""
+    if not value:
+        return None
+    campos = [campo.strip() for campo in value.split(",") if campo.strip()]
+    if not campos:
+        return None
+    projection = {campo: 1 for campo in campos if not campo.startswith("$")}
+    # created_at é necessário para montar o próximo cursor
+    projection["created_at"] = 1
+    return projection
+
+def paginate(collection, query=None, cursor=None, limit=DEFAULT_LIMIT, projection=None):
+    """Paginação por keyset ordenada por (created_at, _id) decrescente"""
+    filtro = dict(query or {})
+
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        if created_at is None:
+            filtro["$or"] = [
+                {"created_at": None, "_id": {"$lt": last_id}}
+            ]
+        else:
+            filtro["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": last_id}},
+                {"created_at": None}
+            ]
+
+    # Campos-sombra de busca não fazem parte da resposta
+    if projection is None:
+        projection = {"busca": 0}
+
+    # Buscar um documento a mais para saber se existe próxima página
+    docs = list(
+        collection.find(filtro, projection)
+        .sort(PAGINATION_INDEX)
+        .limit(limit + 1)
+    )
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1])
+
+    for doc in docs:
+        doc['_id'] = str(doc['_id'])
+
+    return docs, next_cursor
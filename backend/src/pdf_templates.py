@@ -0,0 +1,408 @@
+import copy
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from io import BytesIO
+from xml.sax.saxutils import escape
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+EMPRESA = "VIP MUDANÇAS"
+CNPJ_EMPRESA = "CNPJ: 12.345.678/0001-90"
+
+def create_pdf_styles():
+    """Criar estilos personalizados para PDFs"""
+    styles = getSampleStyleSheet()
+
+    # Estilo para título principal
+    styles.add(ParagraphStyle(
+        name='TituloVIP',
+        parent=styles['Title'],
+        fontSize=18,
+        spaceAfter=30,
+        textColor=colors.HexColor('#1e40af'),
+        alignment=1  # Centralizado
+    ))
+
+    # Estilo para subtítulos
+    styles.add(ParagraphStyle(
+        name='SubtituloVIP',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12,
+        textColor=colors.HexColor('#3b82f6')
+    ))
+
+    return styles
+
+ESTILO_TABELA_DADOS = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+def texto(valor):
+    """Valor informado pelo usuário pronto para o markup do Paragraph"""
+    return escape(str(valor if valor is not None else ""))
+
+class PDFTemplate(ABC):
+    """Modelo de documento: estilos e blocos fixos montados uma vez por processo"""
+    # Os Paragraphs fixos (markup já interpretado) são copiados a cada
+    # documento: o layout grava largura e quebras de linha no objeto, então
+    # cada build precisa da sua cópia, mas o parse do texto não se repete.
+
+    nome = None
+    titulo = None
+
+    def __init__(self):
+        self._fixos = None
+        self._lock = threading.Lock()
+        self.metricas = {"documentos": 0, "segundos": 0.0, "bytes": 0}
+
+    def preparar(self, styles):
+        """Blocos fixos do modelo: {nome: flowable ou lista de flowables}"""
+        return {}
+
+    @abstractmethod
+    def montar(self, dados, styles):
+        """Lista de flowables do documento"""
+
+    def _carregar(self):
+        if self._fixos is None:
+            with self._lock:
+                if self._fixos is None:
+                    styles = _styles()
+                    self._fixos = {
+                        "cabecalho": [
+                            Paragraph(EMPRESA, styles['TituloVIP']),
+                            Paragraph(self.titulo, styles['SubtituloVIP']),
+                            Spacer(1, 20)
+                        ],
+                        **self.preparar(styles)
+                    }
+        return self._fixos
+
+    def fixo(self, nome):
+        """Cópia de um bloco fixo para uso em um documento"""
+        bloco = self._carregar()[nome]
+        if isinstance(bloco, list):
+            return [copy.copy(flowable) for flowable in bloco]
+        return copy.copy(bloco)
+
+    def render(self, dados):
+        """PDF em memória (bytes)"""
+        inicio = time.perf_counter()
+        styles = _styles()
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, title=self.titulo, author=EMPRESA)
+        doc.build(self.montar(dados, styles))
+        pdf = buffer.getvalue()
+        with self._lock:
+            self.metricas["documentos"] += 1
+            self.metricas["segundos"] += time.perf_counter() - inicio
+            self.metricas["bytes"] += len(pdf)
+        return pdf
+
+    def stats(self):
+        with self._lock:
+            metricas = dict(self.metricas)
+        segundos = metricas.pop("segundos")
+        metricas["documentos_por_segundo"] = round(metricas["documentos"] / segundos, 1) if segundos else 0.0
+        return metricas
+
+class ContratoTemplate(PDFTemplate):
+    nome = "contrato"
+    titulo = "CONTRATO DE PRESTAÇÃO DE SERVIÇOS DE MUDANÇA"
+
+    CLAUSULAS = [
+        "1. A VIP MUDANÇAS se compromete a executar os serviços de mudança conforme especificado neste contrato.",
+        "2. O cliente se responsabiliza por embalar adequadamente objetos frágeis e de valor.",
+        "3. A empresa não se responsabiliza por danos em objetos mal embalados pelo cliente.",
+        "4. O pagamento deverá ser efetuado conforme acordado neste contrato.",
+        "5. Cancelamentos com menos de 24h de antecedência estão sujeitos a multa de 30% do valor.",
+        "6. A empresa possui seguro para cobertura de danos durante o transporte.",
+        "7. Este contrato é válido por 30 dias a partir da data de assinatura."
+    ]
+
+    ESTILO_ASSINATURAS = TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ])
+
+    def preparar(self, styles):
+        clausulas = [Paragraph("<b>CLÁUSULAS CONTRATUAIS:</b>", styles['SubtituloVIP'])]
+        for clausula in self.CLAUSULAS:
+            clausulas.append(Paragraph(clausula, styles['Normal']))
+            clausulas.append(Spacer(1, 8))
+        clausulas.append(Spacer(1, 30))
+
+        return {
+            "contratante": Paragraph("<b>CONTRATANTE:</b>", styles['SubtituloVIP']),
+            "servico": Paragraph("<b>DADOS DO SERVIÇO:</b>", styles['SubtituloVIP']),
+            "clausulas": clausulas,
+            "assinaturas": [
+                Paragraph("<b>ASSINATURAS:</b>", styles['SubtituloVIP']),
+                Spacer(1, 40)
+            ]
+        }
+
+    def montar(self, dados, styles):
+        cliente = dados.get('cliente', {})
+        servico = dados.get('servico', {})
+        story = self.fixo("cabecalho")
+
+        # Número do contrato
+        story.append(Paragraph(f"<b>Contrato Nº:</b> {texto(dados['numero'])}", styles['Normal']))
+        story.append(Paragraph(f"<b>Data:</b> {datetime.now().strftime('%d/%m/%Y')}", styles['Normal']))
+        story.append(Spacer(1, 20))
+
+        # Dados do contratante
+        story.append(self.fixo("contratante"))
+        contratante_data = [
+            ['Nome:', cliente.get('nome', '')],
+            ['CPF/CNPJ:', cliente.get('cpf_cnpj', '')],
+            ['Telefone:', cliente.get('telefone', '')],
+            ['Email:', cliente.get('email', '')],
+            ['Endereço:', cliente.get('endereco_origem', '')]
+        ]
+        story.append(Table(contratante_data, colWidths=[1.5*inch, 4*inch], style=ESTILO_TABELA_DADOS))
+        story.append(Spacer(1, 20))
+
+        # Dados do serviço
+        story.append(self.fixo("servico"))
+        servico_data = [
+            ['Tipo de Mudança:', servico.get('tipo', 'Residencial')],
+            ['Data da Mudança:', servico.get('data_mudanca', '')],
+            ['Endereço Origem:', servico.get('endereco_origem', '')],
+            ['Endereço Destino:', servico.get('endereco_destino', '')],
+            ['Valor Total:', f"R$ {servico.get('valor_total', '0,00')}"],
+            ['Forma de Pagamento:', servico.get('forma_pagamento', 'À vista')]
+        ]
+        story.append(Table(servico_data, colWidths=[1.5*inch, 4*inch], style=ESTILO_TABELA_DADOS))
+        story.append(Spacer(1, 20))
+
+        # Cláusulas e assinaturas
+        story.extend(self.fixo("clausulas"))
+        story.extend(self.fixo("assinaturas"))
+        assinaturas_data = [
+            ['_' * 30, '_' * 30],
+            [EMPRESA, 'CONTRATANTE'],
+            [CNPJ_EMPRESA, cliente.get('nome', '')]
+        ]
+        story.append(Table(assinaturas_data, colWidths=[2.5*inch, 2.5*inch], style=self.ESTILO_ASSINATURAS))
+        return story
+
+class OrdemServicoTemplate(PDFTemplate):
+    nome = "ordem_servico"
+    titulo = "ORDEM DE SERVIÇO"
+
+    MATERIAIS = [
+        "□ Caixas de papelão",
+        "□ Plástico bolha",
+        "□ Fita adesiva",
+        "□ Papel pardo",
+        "□ Cobertores",
+        "□ Cintas de amarração",
+        "□ Outros: _______________"
+    ]
+
+    CONTROLE = [
+        ['Início dos trabalhos:', '___:___', 'Responsável:', '_' * 20],
+        ['Término dos trabalhos:', '___:___', 'Responsável:', '_' * 20],
+        ['Assinatura do Cliente:', '_' * 30, 'Data:', '___/___/___']
+    ]
+
+    ESTILO_CONTROLE = TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ])
+
+    def preparar(self, styles):
+        materiais = [Paragraph("<b>MATERIAIS NECESSÁRIOS:</b>", styles['SubtituloVIP'])]
+        materiais.extend(Paragraph(material, styles['Normal']) for material in self.MATERIAIS)
+        materiais.append(Spacer(1, 30))
+
+        return {
+            "cliente": Paragraph("<b>CLIENTE:</b>", styles['SubtituloVIP']),
+            "servico": Paragraph("<b>DETALHES DO SERVIÇO:</b>", styles['SubtituloVIP']),
+            "equipe": Paragraph("<b>EQUIPE DESIGNADA:</b>", styles['SubtituloVIP']),
+            "materiais": materiais,
+            "controle": [
+                Paragraph("<b>CONTROLE DE EXECUÇÃO:</b>", styles['SubtituloVIP']),
+                Spacer(1, 20)
+            ]
+        }
+
+    def montar(self, dados, styles):
+        cliente = dados.get('cliente', {})
+        servico = dados.get('servico', {})
+        equipe = dados.get('equipe', [])
+        story = self.fixo("cabecalho")
+
+        # Dados da OS
+        story.append(Paragraph(f"<b>OS Nº:</b> {texto(dados['numero'])}", styles['Normal']))
+        story.append(Paragraph(f"<b>Data de Emissão:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
+        story.append(Spacer(1, 20))
+
+        # Dados do cliente
+        story.append(self.fixo("cliente"))
+        cliente_info = f"""
+        <b>Nome:</b> {texto(cliente.get('nome', ''))}<br/>
+        <b>Telefone:</b> {texto(cliente.get('telefone', ''))}<br/>
+        <b>Email:</b> {texto(cliente.get('email', ''))}
+        """
+        story.append(Paragraph(cliente_info, styles['Normal']))
+        story.append(Spacer(1, 15))
+
+        # Dados do serviço
+        story.append(self.fixo("servico"))
+        servico_info = f"""
+        <b>Data da Mudança:</b> {texto(servico.get('data_mudanca', ''))}<br/>
+        <b>Horário:</b> {texto(servico.get('horario', '08:00'))}<br/>
+        <b>Origem:</b> {texto(servico.get('endereco_origem', ''))}<br/>
+        <b>Destino:</b> {texto(servico.get('endereco_destino', ''))}<br/>
+        <b>Tipo:</b> {texto(servico.get('tipo', 'Residencial'))}<br/>
+        <b>Observações:</b> {texto(servico.get('observacoes', 'Nenhuma'))}
+        """
+        story.append(Paragraph(servico_info, styles['Normal']))
+        story.append(Spacer(1, 15))
+
+        # Equipe designada
+        if equipe:
+            story.append(self.fixo("equipe"))
+            for membro in equipe:
+                story.append(Paragraph(
+                    f"• {texto(membro.get('nome', ''))} - {texto(membro.get('funcao', ''))}", styles['Normal']
+                ))
+            story.append(Spacer(1, 15))
+
+        # Materiais e controle de execução
+        story.extend(self.fixo("materiais"))
+        story.extend(self.fixo("controle"))
+        story.append(Table(self.CONTROLE, colWidths=[1.5*inch, 1*inch, 1*inch, 1.5*inch], style=self.ESTILO_CONTROLE))
+        return story
+
+class ReciboTemplate(PDFTemplate):
+    nome = "recibo"
+    titulo = "RECIBO DE PAGAMENTO"
+
+    def preparar(self, styles):
+        return {
+            "pagamento": Paragraph("<b>DETALHES DO PAGAMENTO:</b>", styles['SubtituloVIP']),
+            "assinatura": [
+                Spacer(1, 40),
+                Paragraph("_" * 40, styles['Normal']),
+                Paragraph(EMPRESA, styles['Normal']),
+                Paragraph(CNPJ_EMPRESA, styles['Normal'])
+            ]
+        }
+
+    def montar(self, dados, styles):
+        cliente = dados.get('cliente', {})
+        pagamento = dados.get('pagamento', {})
+        story = self.fixo("cabecalho")
+
+        # Dados do recibo
+        story.append(Paragraph(f"<b>Recibo Nº:</b> {texto(dados['numero'])}", styles['Normal']))
+        story.append(Paragraph(f"<b>Data:</b> {datetime.now().strftime('%d/%m/%Y')}", styles['Normal']))
+        story.append(Spacer(1, 20))
+
+        # Valor por extenso (simulado)
+        valor = float(pagamento.get('valor') or 0)
+        valor_extenso = "Valor por extenso aqui"  # Em produção, converter para extenso
+
+        # Corpo do recibo
+        recibo_texto = f"""
+        Recebi de <b>{texto(cliente.get('nome', ''))}</b>, portador do CPF/CNPJ <b>{texto(cliente.get('cpf_cnpj', ''))}</b>,
+        a quantia de <b>R$ {valor:.2f}</b> ({valor_extenso}), referente aos serviços de mudança
+        prestados conforme contrato <b>{texto(pagamento.get('contrato', ''))}</b>.
+        """
+        story.append(Paragraph(recibo_texto, styles['Normal']))
+        story.append(Spacer(1, 30))
+
+        # Detalhes do pagamento
+        story.append(self.fixo("pagamento"))
+        pagamento_data = [
+            ['Forma de Pagamento:', pagamento.get('forma_pagamento', '')],
+            ['Data do Serviço:', pagamento.get('data_servico', '')],
+            ['Observações:', pagamento.get('observacoes', 'Nenhuma')]
+        ]
+        story.append(Table(pagamento_data, colWidths=[2*inch, 3*inch], style=ESTILO_TABELA_DADOS))
+        story.append(Spacer(1, 40))
+
+        # Assinatura
+        story.append(Paragraph("São Paulo, " + datetime.now().strftime('%d de %B de %Y'), styles['Normal']))
+        story.extend(self.fixo("assinatura"))
+        return story
+
+_estilos = None
+_estilos_lock = threading.Lock()
+
+def _styles():
+    """Folha de estilos compartilhada (criada na primeira renderização)"""
+    global _estilos
+    if _estilos is None:
+        with _estilos_lock:
+            if _estilos is None:
+                _estilos = create_pdf_styles()
+    return _estilos
+
+TEMPLATES = {template.nome: template for template in (ContratoTemplate(), OrdemServicoTemplate(), ReciboTemplate())}
+
+def renderizar(nome, dados):
+    """PDF (bytes) do modelo `nome` com os dados do documento"""
+    return TEMPLATES[nome].render(dados)
+
+def stats():
+    return {nome: template.stats() for nome, template in TEMPLATES.items()}
+
+EXEMPLOS = {
+    "contrato": {
+        "numero": "001-2025",
+        "cliente": {"nome": "Maria Silva", "cpf_cnpj": "123.456.789-00", "telefone": "(11) 98888-7777",
+                    "email": "maria@example.com", "endereco_origem": "Rua A, 100 - São Paulo"},
+        "servico": {"tipo": "Residencial", "data_mudanca": "10/03/2025", "endereco_origem": "Rua A, 100",
+                    "endereco_destino": "Av. B, 200", "valor_total": "2.500,00", "forma_pagamento": "Pix"}
+    },
+    "ordem_servico": {
+        "numero": "001-2025",
+        "cliente": {"nome": "Maria Silva", "telefone": "(11) 98888-7777", "email": "maria@example.com"},
+        "servico": {"data_mudanca": "10/03/2025", "endereco_origem": "Rua A, 100", "endereco_destino": "Av. B, 200"},
+        "equipe": [{"nome": "Carlos", "funcao": "Motorista"}, {"nome": "Ana", "funcao": "Embaladora"}]
+    },
+    "recibo": {
+        "numero": "001-2025",
+        "cliente": {"nome": "Maria Silva", "cpf_cnpj": "123.456.789-00"},
+        "pagamento": {"valor": 2500, "contrato": "001-2025", "forma_pagamento": "Pix", "data_servico": "10/03/2025"}
+    }
+}
+
+def benchmark(documentos=200):
+    """Documentos por segundo de cada modelo (sem contar a primeira renderização)"""
+    resultado = {}
+    for nome, template in TEMPLATES.items():
+        template.render(EXEMPLOS[nome])
+        inicio = time.perf_counter()
+        for _ in range(documentos):
+            pdf = template.render(EXEMPLOS[nome])
+        segundos = time.perf_counter() - inicio
+        resultado[nome] = {
+            "documentos_por_segundo": round(documentos / segundos, 1),
+            "ms_por_documento": round(segundos / documentos * 1000, 2),
+            "bytes": len(pdf)
+        }
+    return resultado
+
+if __name__ == '__main__':
+    # python -m src.pdf_templates [documentos]
+    for nome, medida in benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200).items():
+        print(f"{nome:15} {medida['documentos_por_segundo']:8.1f} doc/s  "
+              f"{medida['ms_por_documento']:7.2f} ms/doc  {medida['bytes']} bytes")
@@ -0,0 +1,230 @@
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from src.config import Config
+from src.ia_cache import ia_memo
+from src.llm import llm, LLMError
+from src.perfil_regras import preclassificador
+from src.text import somente_digitos
+
+SISTEMA_ANALISE = "Você é um assistente especializado em análise de clientes para empresa de mudanças."
+
+def prompt_analise(nome, email, telefone, empresa):
+    return f"""
+        Analise o seguinte cliente e classifique seu perfil como A, B ou AA:
+
+        Nome: {nome}
+        Email: {email}
+        Telefone: {telefone}
+        Empresa: {empresa}
+
+        Critérios:
+        - Perfil AA: Cliente premium, empresa grande, alto potencial de faturamento
+        - Perfil A: Cliente bom, empresa média, potencial moderado
+        - Perfil B: Cliente básico, empresa pequena, potencial baixo
+
+        Responda na primeira linha apenas "Perfil: A", "Perfil: B" ou "Perfil: AA"
+        e, nas linhas seguintes, uma breve justificativa de até 100 palavras.
+        """
+
+# "Perfil: AA" / "Classificação - A" em qualquer ponto da primeira linha
+_PERFIL_ROTULADO = re.compile(r"(?i:perfil|classifica[çc][ãa]o)\W{0,3}(AA|A|B)\b")
+# Ou a linha começando pela classificação seguida de pontuação ("AA - ...", "**B**")
+_PERFIL_INICIAL = re.compile(r"^[\s*#>\"'(\[]*(AA|A|B)\s*(?:$|[-–—:.,;)\]*])")
+
+def extrair_perfil(resultado):
+    """Perfil da primeira linha da resposta do modelo; None se não há classificação clara"""
+    # Sem heurística sobre o texto inteiro: "Apesar..." ou "A empresa..." não são perfil A
+    primeira_linha = next((linha for linha in (resultado or "").splitlines() if linha.strip()), "")
+    encontrado = _PERFIL_ROTULADO.search(primeira_linha) or _PERFIL_INICIAL.match(primeira_linha)
+    return encontrado.group(1) if encontrado else None
+
+def analisar_perfil(nome, email, telefone, empresa, cliente=None, usar_llm=True, fallback=False,
+                    endpoint="analisar_cliente", hedge=True):
+    """Classificar: regras primeiro e LLM (com cache) só nos casos de baixa confiança"""
+    # Retorna {"perfil", "justificativa", "origem" (regras, cache ou ia), "confianca"}.
+    # Com fallback=True uma falha do LLM devolve a classificação por regras.
+    regras = preclassificador.classificar(nome, email, telefone, empresa, cliente)
+    por_regras = {
+        "perfil": regras["perfil"], "justificativa": regras["justificativa"],
+        "origem": "regras", "confianca": regras["confianca"]
+    }
+    if preclassificador.decidir(regras, usar_llm) or not usar_llm:
+        return por_regras
+
+    # Mesma entrada, modelo e versão do prompt reaproveitam a resposta anterior
+    chave = ia_memo.chave("analisar_cliente", {
+        "nome": nome, "email": (email or "").lower(), "telefone": somente_digitos(telefone), "empresa": empresa
+    })
+    memorizado = ia_memo.get(chave)
+    if memorizado:
+        return {"perfil": memorizado["perfil"], "justificativa": memorizado["justificativa"],
+                "origem": "cache", "confianca": None}
+
+    try:
+        completion = llm.completar(
+            [
+                {"role": "system", "content": SISTEMA_ANALISE},
+                {"role": "user", "content": prompt_analise(nome, email, telefone, empresa)}
+            ],
+            max_tokens=150,
+            temperature=0.7,
+            endpoint=endpoint,
+            hedge=hedge
+        )
+    except Exception as e:
+        if not fallback:
+            raise
+        logging.warning(f"Erro na API OpenAI: {e}")
+        return por_regras
+    justificativa = completion["texto"]
+    perfil = extrair_perfil(justificativa)
+    if perfil is None:
+        # Resposta sem classificação legível é falha, não perfil padrão
+        erro = LLMError(f"Resposta do modelo sem classificação A/B/AA: {justificativa[:80]!r}")
+        if not fallback:
+            raise erro
+        logging.warning(str(erro))
+        return por_regras
+    ia_memo.set(chave, "analisar_cliente", {"perfil": perfil, "justificativa": justificativa}, completion)
+    return {"perfil": perfil, "justificativa": justificativa, "origem": "ia", "confianca": None}
+
+class PerfilLoteJob:
+    """Classificação em lote dos clientes sem perfil (ou com perfil vencido)"""
+    # O progresso fica no documento do job (último _id processado), então uma
+    # execução interrompida continua de onde parou na próxima chamada.
+
+    NOME = "perfil_clientes"
+
+    def __init__(self):
+        self._thread = None
+        self._lease_perdido = threading.Event()
+
+    def iniciar(self, validade_dias=None, reiniciar=False):
+        """Reservar o job e executar em background; None se já está em execução"""
+        from src.models import Job
+
+        dono = f"{socket.gethostname()}:{os.getpid()}"
+        estado = Job.reservar(self.NOME, dono, Config.PERFIL_LOTE_LEASE_SECONDS)
+        if estado is None:
+            return None
+
+        if reiniciar or estado.get("status") in (None, "concluido"):
+            agora = datetime.utcnow()
+            novo = {
+                "status": "executando",
+                "corte": agora - timedelta(days=validade_dias or Config.PERFIL_VALIDADE_DIAS),
+                "ultimo_id": None,
+                "iniciado_em": agora,
+                "concluido_em": None,
+                "processados": 0,
+                "classificados": 0,
+                "por_regras": 0,
+                "erros": 0,
+                "segundos": 0.0,
+                "ultimo_erro": None
+            }
+        else:
+            novo = {"status": "executando", "ultimo_erro": None}
+        Job.checkpoint(self.NOME, dono, novo)
+        estado.update(novo)
+
+        self._lease_perdido = threading.Event()
+        self._thread = threading.Thread(
+            target=self._executar, args=(dono, estado), name="perfil-lote", daemon=True
+        )
+        self._thread.start()
+        return estado
+
+    def _classificar(self, cliente, dono):
+        from src.models import Job
+
+        try:
+            resultado = analisar_perfil(
+                cliente.get("nome", ""), cliente.get("email", ""),
+                cliente.get("telefone", ""), cliente.get("empresa", ""),
+                cliente=cliente, endpoint="perfil_lote", hedge=False
+            )
+            retorno = cliente["_id"], resultado["perfil"], resultado["justificativa"], resultado["origem"]
+        except Exception as e:
+            retorno = e
+        # Lease renovado a cada cliente: um lote lento não o deixa vencer
+        if not Job.checkpoint(self.NOME, dono, duracao_segundos=Config.PERFIL_LOTE_LEASE_SECONDS):
+            self._lease_perdido.set()
+        return retorno
+
+    def _executar(self, dono, estado):
+        from src.models import Cliente, Job
+
+        ultimo_id = estado.get("ultimo_id")
+        status, erro = "concluido", None
+        # Vagas do LLM para o job; LLM_RESERVA_INTERATIVA ficam livres para as requisições
+        concorrencia = max(1, min(Config.PERFIL_LOTE_CONCURRENCY, llm.vagas_em_background()))
+        try:
+            with ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix="perfil") as executor:
+                while True:
+                    inicio = time.perf_counter()
+                    clientes = Cliente.sem_perfil(estado["corte"], apos_id=ultimo_id,
+                                                  limit=Config.PERFIL_LOTE_CHUNK)
+                    if not clientes:
+                        break
+
+                    resultados = list(executor.map(lambda cliente: self._classificar(cliente, dono), clientes))
+                    perfis = [r for r in resultados if not isinstance(r, Exception)]
+                    falhas = [r for r in resultados if isinstance(r, Exception)]
+                    if perfis:
+                        Cliente.gravar_perfis(perfis)
+
+                    # O checkpoint para antes do primeiro cliente com falha, que volta
+                    # na próxima execução (os seguintes já classificados saem da fila)
+                    primeira_falha = next((i for i, r in enumerate(resultados) if isinstance(r, Exception)), None)
+                    concluidos = clientes if primeira_falha is None else clientes[:primeira_falha]
+                    if concluidos:
+                        ultimo_id = concluidos[-1]["_id"]
+                    if falhas:
+                        status, erro = "interrompido", str(falhas[0])
+
+                    if not Job.checkpoint(
+                        self.NOME, dono,
+                        {"ultimo_id": ultimo_id, "ultimo_erro": erro},
+                        {
+                            "processados": len(clientes),
+                            "classificados": len(perfis),
+                            "por_regras": sum(1 for perfil in perfis if perfil[3] == "regras"),
+                            "erros": len(falhas),
+                            "segundos": time.perf_counter() - inicio
+                        },
+                        duracao_segundos=Config.PERFIL_LOTE_LEASE_SECONDS
+                    ) or self._lease_perdido.is_set():
+                        logging.warning("Lease do job de perfis perdido; interrompendo")
+                        return
+                    if falhas:
+                        break
+        except Exception as e:
+            logging.error(f"Erro no job de perfis: {e}")
+            status, erro = "interrompido", str(e)
+
+        campos = {"status": status, "ultimo_erro": erro}
+        if status == "concluido":
+            campos["concluido_em"] = datetime.utcnow()
+        Job.liberar(self.NOME, dono, campos)
+
+    def status(self):
+        from src.models import Job
+
+        estado = Job.get(self.NOME) or {"status": None}
+        estado.pop("_id", None)
+        if estado.get("ultimo_id") is not None:
+            estado["ultimo_id"] = str(estado["ultimo_id"])
+        segundos = estado.get("segundos") or 0
+        estado["clientes_por_segundo"] = round(estado.get("processados", 0) / segundos, 3) if segundos else 0.0
+        classificados = estado.get("classificados") or 0
+        estado["fracao_por_regras"] = round(estado.get("por_regras", 0) / classificados, 4) if classificados else 0.0
+        return estado
+
+perfil_lote = PerfilLoteJob()
@@ -0,0 +1,180 @@
+import re
+import threading
+import time
+from src.config import Config
+from src.text import normalizar, somente_digitos
+
+# Pesos padrão de cada sinal; PERFIL_PESOS sobrescreve qualquer um deles
+PESOS_PADRAO = {
+    "sem_empresa": -2.0,
+    "empresa": 1.5,
+    "empresa_grande": 2.5,
+    "nome_empresarial": 1.0,
+    "email_corporativo": 1.0,
+    "email_pessoal": -0.5,
+    "email_publico": 4.0,
+    "dominio_da_empresa": 0.5,
+    "telefone_fixo": 0.3,
+    "telefone_corporativo": 1.0,
+    "sem_telefone": -0.3,
+    "historico": 1.0,
+    "documentos": 0.5,
+    "perdido": -0.5,
+    "perfil_anterior": 0.5
+}
+
+# Pontuação mínima de A e de AA; abaixo de LIMIAR_A o perfil é B.
+# Calibrados para que casos claros (residencial, PME com e-mail do próprio
+# domínio, órgão público, grande empresa com canal corporativo) passem de
+# 0,7 de confiança e só os mistos (empresa com e-mail pessoal) vão ao LLM.
+LIMIAR_A = 0.5
+LIMIAR_AA = 5.0
+# Margem até o limiar em que a confiança chega a 50%
+ESCALA_CONFIANCA = 0.35
+
+DESCRICOES = {
+    "sem_empresa": "sem empresa (mudança residencial)",
+    "empresa": "empresa informada",
+    "empresa_grande": "empresa de grande porte",
+    "nome_empresarial": "nome de pessoa jurídica",
+    "email_corporativo": "e-mail corporativo",
+    "email_pessoal": "e-mail pessoal",
+    "email_publico": "e-mail de órgão público",
+    "dominio_da_empresa": "domínio do e-mail é da empresa",
+    "telefone_fixo": "telefone fixo",
+    "telefone_corporativo": "telefone 0800/4004/3003",
+    "sem_telefone": "sem telefone",
+    "historico": "histórico de atendimento",
+    "documentos": "documentos anteriores",
+    "perdido": "negociação perdida",
+    "perfil_anterior": "perfil anterior"
+}
+
+PROVEDORES_PESSOAIS = {
+    "gmail.com", "googlemail.com", "hotmail.com", "hotmail.com.br", "outlook.com", "outlook.com.br",
+    "live.com", "msn.com", "yahoo.com", "yahoo.com.br", "icloud.com", "me.com", "bol.com.br",
+    "uol.com.br", "terra.com.br", "ig.com.br", "globo.com", "globomail.com", "r7.com", "protonmail.com"
+}
+SUFIXOS_PUBLICOS = (".gov.br", ".jus.br", ".mil.br", ".leg.br", ".mp.br", ".edu.br")
+
+_TERMOS_GRANDE_PORTE = re.compile(
+    r"\b(s\.?\s?a\.?|s/a|grupo|holding|industria|industrias|banco|hospital|universidade|"
+    r"prefeitura|secretaria|governo|tribunal|ministerio|multinacional|corporation|inc)\b"
+)
+# Sem "me"/"mei": casariam com nomes de pessoa ("Tiago Me")
+_TERMOS_PESSOA_JURIDICA = re.compile(r"\b(ltda|eireli|epp|s\.?\s?a\.?|s/a|cia|comercio|servicos)\b")
+_PALAVRAS = re.compile(r"[a-z0-9]{4,}")
+
+class PreClassificador:
+    """Classificação A/B/AA por regras, em microssegundos e sem chamar o modelo"""
+    # Modelo linear: cada sinal (0 a 1) multiplica o seu peso e a soma é
+    # comparada com os limiares de A e AA. A confiança cresce com a distância
+    # até o limiar mais próximo; só os casos duvidosos vão para o LLM.
+
+    def __init__(self, pesos=None):
+        self.pesos = {**PESOS_PADRAO, **(pesos if pesos is not None else Config.PERFIL_PESOS)}
+        self._lock = threading.Lock()
+        self.metricas = {"classificados": 0, "decididos": 0, "enviados_llm": 0, "sem_llm": 0, "segundos": 0.0}
+
+    def sinais(self, nome, email, telefone, empresa, cliente=None):
+        """Sinais normalizados (0 a 1, ou -1 a 1 para perfil anterior) que estão presentes"""
+        sinais = {}
+        empresa = normalizar(empresa)
+        nome = normalizar(nome)
+
+        if empresa:
+            sinais["empresa"] = 1.0
+            if _TERMOS_GRANDE_PORTE.search(empresa):
+                sinais["empresa_grande"] = 1.0
+        else:
+            sinais["sem_empresa"] = 1.0
+        if nome and _TERMOS_PESSOA_JURIDICA.search(nome):
+            sinais["nome_empresarial"] = 1.0
+
+        dominio = (email or "").strip().lower().rpartition("@")[2]
+        if "." in dominio:
+            if dominio in PROVEDORES_PESSOAIS:
+                sinais["email_pessoal"] = 1.0
+            else:
+                sinais["email_corporativo"] = 1.0
+                if dominio.endswith(SUFIXOS_PUBLICOS):
+                    sinais["email_publico"] = 1.0
+                base = dominio.split(".")[0]
+                if empresa and any(palavra in base for palavra in _PALAVRAS.findall(empresa)):
+                    sinais["dominio_da_empresa"] = 1.0
+
+        digitos = somente_digitos(telefone)
+        if digitos.startswith("55") and len(digitos) > 11:
+            digitos = digitos[2:]
+        if not digitos:
+            sinais["sem_telefone"] = 1.0
+        elif digitos[:4] in ("0800", "4004", "3003"):
+            sinais["telefone_corporativo"] = 1.0
+        elif len(digitos) == 10 and digitos[2] in "2345":
+            sinais["telefone_fixo"] = 1.0
+
+        if cliente:
+            historico = len(cliente.get("historico") or [])
+            if historico:
+                sinais["historico"] = min(historico, 5) / 5
+            documentos = len(cliente.get("documentos") or [])
+            if documentos:
+                sinais["documentos"] = min(documentos, 5) / 5
+            if cliente.get("status") == "Perdido":
+                sinais["perdido"] = 1.0
+            anterior = {"AA": 1.0, "B": -1.0}.get(cliente.get("perfil"))
+            if anterior:
+                sinais["perfil_anterior"] = anterior
+        return sinais
+
+    def classificar(self, nome, email, telefone, empresa, cliente=None):
+        """{"perfil", "confianca", "pontos", "justificativa"} para os dados do cliente"""
+        inicio = time.perf_counter()
+        sinais = self.sinais(nome, email, telefone, empresa, cliente)
+        contribuicoes = {sinal: valor * self.pesos.get(sinal, 0.0) for sinal, valor in sinais.items()}
+        pontos = sum(contribuicoes.values())
+
+        if pontos >= LIMIAR_AA:
+            perfil, margem = "AA", pontos - LIMIAR_AA
+        elif pontos >= LIMIAR_A:
+            perfil, margem = "A", min(pontos - LIMIAR_A, LIMIAR_AA - pontos)
+        else:
+            perfil, margem = "B", LIMIAR_A - pontos
+        confianca = round(margem / (margem + ESCALA_CONFIANCA), 3)
+
+        principais = sorted(
+            (sinal for sinal, valor in contribuicoes.items() if valor),
+            key=lambda sinal: -abs(contribuicoes[sinal])
+        )[:3]
+        motivos = ", ".join(DESCRICOES.get(sinal, sinal) for sinal in principais) or "poucos dados"
+        justificativa = f"Perfil {perfil} por regras (confiança {confianca:.0%}): {motivos}."
+
+        with self._lock:
+            self.metricas["classificados"] += 1
+            self.metricas["segundos"] += time.perf_counter() - inicio
+        return {"perfil": perfil, "confianca": confianca, "pontos": round(pontos, 3), "justificativa": justificativa}
+
+    def decidir(self, resultado, usar_llm=True):
+        """Se a classificação por regras basta (e contabilizar a decisão)"""
+        # sem_llm: confiança baixa, mas o LLM não estava disponível
+        decidido = resultado["confianca"] >= Config.PERFIL_CONFIANCA_MINIMA
+        with self._lock:
+            if decidido:
+                self.metricas["decididos"] += 1
+            else:
+                self.metricas["enviados_llm" if usar_llm else "sem_llm"] += 1
+        return decidido
+
+    def stats(self):
+        with self._lock:
+            metricas = dict(self.metricas)
+        total = metricas["decididos"] + metricas["enviados_llm"] + metricas["sem_llm"]
+        classificados = metricas.pop("classificados")
+        segundos = metricas.pop("segundos")
+        metricas["fracao_decidida"] = round(metricas["decididos"] / total, 4) if total else 0.0
+        metricas["microssegundos_por_cliente"] = round(segundos / classificados * 1e6, 1) if classificados else 0.0
+        metricas["confianca_minima"] = Config.PERFIL_CONFIANCA_MINIMA
+        metricas["pesos"] = self.pesos
+        return metricas
+
+preclassificador = PreClassificador()
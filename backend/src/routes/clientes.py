@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models import Cliente
+from src.pagination import parse_limit, parse_page, parse_fields
 from datetime import datetime
 
 clientes_bp = Blueprint('clientes', __name__)
@@ -8,10 +9,38 @@ clientes_bp = Blueprint('clientes', __name__)
 @clientes_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_clientes():
-    """Listar todos os clientes"""
+    """Listar clientes com paginação por cursor"""
     try:
-        clientes = Cliente.get_all()
-        return jsonify({"clientes": clientes}), 200
+        limit = parse_limit(request.args.get('limit'))
+        projection = parse_fields(request.args.get('fields'))
+        clientes, next_cursor = Cliente.get_page(
+            cursor=request.args.get('cursor'),
+            limit=limit,
+            projection=projection
+        )
+        return jsonify({"clientes": clientes, "next_cursor": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@clientes_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_clientes():
+    """Buscar clientes por nome, email, empresa, cargo ou telefone (sem acentos)"""
+    try:
+        termo = request.args.get('q', '').strip()
+        if not termo:
+            return jsonify({"error": "Parâmetro q é obrigatório"}), 400
+        
+        page = parse_page(request.args.get('page'))
+        limit = parse_limit(request.args.get('limit'))
+        projection = parse_fields(request.args.get('fields'))
+        
+        clientes, tem_mais = Cliente.search(termo, page=page, limit=limit, projection=projection)
+        return jsonify({"clientes": clientes, "page": page, "has_more": tem_mais}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
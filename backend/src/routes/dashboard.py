@@ -1,45 +1,51 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from src.models import Cliente, Orcamento, Financeiro, GuardaMoveis, Estoque
+from src.models import Financeiro, DashboardCounters
+from src.cache import cached
 from datetime import datetime, timedelta
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+def _contador(contadores, modulo, chave):
+    """Ler um contador (nunca negativo, mesmo antes de reconciliar)"""
+    return max(contadores.get(modulo, {}).get(chave, 0), 0)
+
+def _calcular_badges(contadores):
+    """Badges dos módulos a partir dos contadores do dashboard"""
+    return {
+        "clientes": _contador(contadores, "clientes", "novo"),
+        "visitas": _contador(contadores, "clientes", "visita agendada"),
+        "orcamentos": _contador(contadores, "orcamentos", "pendente"),
+        "self_storage": _contador(contadores, "guarda_moveis", "reservado"),
+        "financeiro": _contador(contadores, "financeiro", "pendente"),
+        "estoque": _contador(contadores, "estoque", "abaixo_minimo"),
+        "leads_linkedin": _contador(contadores, "leads", "novo")
+    }
+
 @dashboard_bp.route('/metricas', methods=['GET'])
 @jwt_required()
+@cached(tags=("clientes", "orcamentos", "financeiro", "guarda_moveis"))
 def get_metricas():
     """Obter métricas principais do dashboard"""
     try:
-        # Buscar dados dos últimos 30 dias
-        data_limite = datetime.utcnow() - timedelta(days=30)
-        
-        # Contar mudanças agendadas (simulado)
-        mudancas_agendadas = 24
-        
-        # Contar visitas pendentes
-        clientes = Cliente.get_all()
-        visitas_pendentes = len([c for c in clientes if c.get('status') == 'Visita Agendada'])
-        
-        # Contar boxes ocupados (simulado)
-        boxes_ocupados = 42
+        # Contadores mantidos com $inc nas escritas (leitura de um documento)
+        contadores = DashboardCounters.get()
+        
+        metricas = {
+            "mudancas_agendadas": _contador(contadores, "orcamentos", "aprovado"),
+            "visitas_pendentes": _contador(contadores, "clientes", "visita agendada"),
+            "boxes_ocupados": _contador(contadores, "guarda_moveis", "ocupado"),
+            "faturamento_mensal": Financeiro.faturamento_mes()
+        }
         
-        # Calcular faturamento mensal (simulado)
-        faturamento_mensal = 45320.00
-        
-        return jsonify({
-            "metricas": {
-                "mudancas_agendadas": mudancas_agendadas,
-                "visitas_pendentes": visitas_pendentes,
-                "boxes_ocupados": boxes_ocupados,
-                "faturamento_mensal": faturamento_mensal
-            }
-        }), 200
+        return jsonify({"metricas": metricas}), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @dashboard_bp.route('/atividades-recentes', methods=['GET'])
 @jwt_required()
+@cached(ttl=60)
 def get_atividades_recentes():
     """Obter atividades recentes"""
     try:
@@ -85,6 +91,7 @@ def get_atividades_recentes():
 
 @dashboard_bp.route('/calendario', methods=['GET'])
 @jwt_required()
+@cached(ttl=60)
 def get_calendario():
     """Obter eventos do calendário"""
     try:
@@ -134,6 +141,7 @@ def get_calendario():
 
 @dashboard_bp.route('/notificacoes', methods=['GET'])
 @jwt_required()
+@cached(ttl=60)
 def get_notificacoes():
     """Obter notificações do sistema"""
     try:
@@ -176,28 +184,29 @@ def get_notificacoes():
 
 @dashboard_bp.route('/resumo-modulos', methods=['GET'])
 @jwt_required()
+@cached(tags=DashboardCounters.MODULOS)
 def get_resumo_modulos():
     """Obter resumo dos módulos com badges de notificação"""
     try:
-        # Contar itens pendentes em cada módulo
-        clientes = Cliente.get_all()
+        # Contar itens pendentes em cada módulo (contadores do dashboard)
+        badges = _calcular_badges(DashboardCounters.get())
         
         resumo = {
-            "clientes": len([c for c in clientes if c.get('status') == 'Novo']),
-            "visitas": len([c for c in clientes if c.get('status') == 'Visita Agendada']),
-            "orcamentos": 4,  # Simulado
+            "clientes": badges["clientes"],
+            "visitas": badges["visitas"],
+            "orcamentos": badges["orcamentos"],
             "contratos": 5,   # Simulado
             "ordens_servico": 6,  # Simulado
-            "self_storage": 7,    # Simulado
-            "financeiro": 8,      # Simulado
+            "self_storage": badges["self_storage"],
+            "financeiro": badges["financeiro"],
             "marketing": 9,       # Simulado
             "vendas": 10,         # Simulado
-            "estoque": 11,        # Simulado
+            "estoque": badges["estoque"],
             "programa_pontos": 12, # Simulado
             "calendario": 13,      # Simulado
             "graficos": 14,        # Simulado
             "configuracoes": 15,   # Simulado
-            "leads_linkedin": 0    # Novo módulo
+            "leads_linkedin": badges["leads_linkedin"]
         }
         
         return jsonify({"resumo_modulos": resumo}), 200
@@ -205,3 +214,17 @@ def get_resumo_modulos():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@dashboard_bp.route('/recalcular-contadores', methods=['POST'])
+@jwt_required()
+def recalcular_contadores():
+    """Reconciliar contadores do dashboard com as coleções"""
+    try:
+        contadores = DashboardCounters.rebuild()
+        contadores.pop("_id", None)
+        return jsonify({
+            "message": "Contadores recalculados com sucesso",
+            "contadores": contadores
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
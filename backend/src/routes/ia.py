@@ -1,14 +1,18 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required
-import openai
-import os
-from src.config import Config
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from src.llm import llm
+from src.ia_cache import ia_memo
+from src.perfil import analisar_perfil, perfil_lote
+from src.perfil_regras import preclassificador
+from src.chat_sessoes import chat_sessoes
+from src.pagination import parse_positive_int
+from src.models import Cliente
+import json
+import logging
+import time
 
 ia_bp = Blueprint('ia', __name__)
 
-# Configurar OpenAI
-openai.api_key = Config.OPENAI_API_KEY
-
 @ia_bp.route('/analisar-cliente', methods=['POST'])
 @jwt_required()
 def analisar_cliente():
@@ -20,62 +24,65 @@ def analisar_cliente():
         telefone = data.get('telefone', '')
         empresa = data.get('empresa', '')
         
-        # Prompt para análise do cliente
-        prompt = f"""
-        Analise o seguinte cliente e classifique seu perfil como A, B ou AA:
+        # Com cliente_id o histórico do cliente entra na pré-classificação
+        cliente = None
+        if data.get('cliente_id'):
+            cliente = Cliente.get_by_id(data['cliente_id'])
+            if not cliente:
+                return jsonify({"error": "Cliente não encontrado"}), 404
+            nome = nome or cliente.get('nome', '')
+            email = email or cliente.get('email', '')
+            telefone = telefone or cliente.get('telefone', '')
+            empresa = empresa or cliente.get('empresa', '')
         
-        Nome: {nome}
-        Email: {email}
-        Telefone: {telefone}
-        Empresa: {empresa}
+        # Casos claros são decididos por regras; o LLM só vê os de baixa
+        # confiança e, sem ele (sem API key ou circuito aberto), vale a regra
+        resultado = analisar_perfil(
+            nome, email, telefone, empresa, cliente=cliente,
+            usar_llm=llm.disponivel, fallback=True
+        )
         
-        Critérios:
-        - Perfil AA: Cliente premium, empresa grande, alto potencial de faturamento
-        - Perfil A: Cliente bom, empresa média, potencial moderado
-        - Perfil B: Cliente básico, empresa pequena, potencial baixo
+        return jsonify({
+            "perfil": resultado["perfil"],
+            "justificativa": resultado["justificativa"],
+            "analisado_por": "IA Mirante",
+            "origem": resultado["origem"],
+            "confianca": resultado["confianca"],
+            "cache": resultado["origem"] == "cache"
+        }), 200
         
-        Responda apenas com a classificação (A, B ou AA) e uma breve justificativa de até 100 palavras.
-        """
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@ia_bp.route('/analisar-clientes/lote', methods=['POST'])
+@jwt_required()
+def iniciar_perfil_lote():
+    """Classificar em background os clientes sem perfil ou com perfil vencido"""
+    try:
+        if not llm.configurado:
+            return jsonify({"error": "IA não configurada (OPENAI_API_KEY)"}), 503
         
-        if not Config.OPENAI_API_KEY:
-            # Simulação quando não há API key
-            perfil = "A"
-            justificativa = "Análise simulada: Cliente com potencial moderado baseado nos dados fornecidos."
-        else:
-            try:
-                response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "Você é um assistente especializado em análise de clientes para empresa de mudanças."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=150,
-                    temperature=0.7
-                )
-                
-                resultado = response.choices[0].message.content.strip()
-                
-                # Extrair perfil e justificativa
-                if "AA" in resultado:
-                    perfil = "AA"
-                elif "A" in resultado:
-                    perfil = "A"
-                else:
-                    perfil = "B"
-                
-                justificativa = resultado
-                
-            except Exception as e:
-                print(f"Erro na API OpenAI: {e}")
-                perfil = "A"
-                justificativa = "Análise padrão aplicada devido a erro na IA."
+        data = request.get_json(silent=True) or {}
+        validade_dias = data.get('validade_dias')
+        if validade_dias is not None:
+            validade_dias = parse_positive_int(validade_dias, 'validade_dias')
         
-        return jsonify({
-            "perfil": perfil,
-            "justificativa": justificativa,
-            "analisado_por": "IA Mirante"
-        }), 200
+        estado = perfil_lote.iniciar(validade_dias=validade_dias, reiniciar=bool(data.get('reiniciar')))
+        if estado is None:
+            return jsonify({"error": "Job já está em execução", "job": perfil_lote.status()}), 409
         
+        return jsonify({"message": "Job iniciado", "job": perfil_lote.status()}), 202
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@ia_bp.route('/analisar-clientes/lote', methods=['GET'])
+@jwt_required()
+def status_perfil_lote():
+    """Progresso e vazão do job de perfis"""
+    try:
+        return jsonify({"job": perfil_lote.status()}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -100,8 +107,15 @@ def sugerir_acao():
         Forneça uma sugestão prática e específica de no máximo 80 palavras.
         """
         
-        if not Config.OPENAI_API_KEY:
-            # Sugestões simuladas
+        chave = ia_memo.chave("sugerir_acao", {
+            "status": cliente_status, "perfil": perfil, "dias_sem_contato": dias_sem_contato
+        })
+        memorizado = ia_memo.get(chave) if llm.configurado else None
+        
+        if memorizado:
+            sugestao = memorizado["sugestao"]
+        elif not llm.disponivel:
+            # Sugestões simuladas (sem API key ou circuito aberto)
             sugestoes = {
                 "Novo": "Entre em contato em até 24h. Envie WhatsApp personalizado apresentando a empresa e agendando visita técnica.",
                 "Em análise": "Acompanhe o processo. Envie materiais informativos e mantenha contato regular a cada 3 dias.",
@@ -110,25 +124,26 @@ def sugerir_acao():
             sugestao = sugestoes.get(cliente_status, "Mantenha contato regular e acompanhe o cliente.")
         else:
             try:
-                response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
+                completion = llm.completar(
+                    [
                         {"role": "system", "content": "Você é um assistente de vendas especializado em mudanças residenciais e comerciais."},
                         {"role": "user", "content": prompt}
                     ],
                     max_tokens=100,
-                    temperature=0.7
+                    temperature=0.7,
+                    endpoint="sugerir_acao"
                 )
-                
-                sugestao = response.choices[0].message.content.strip()
+                sugestao = completion["texto"]
+                ia_memo.set(chave, "sugerir_acao", {"sugestao": sugestao}, completion)
                 
             except Exception as e:
-                print(f"Erro na API OpenAI: {e}")
+                logging.warning(f"Erro na API OpenAI: {e}")
                 sugestao = "Mantenha contato regular e acompanhe o cliente de acordo com o status atual."
         
         return jsonify({
             "sugestao": sugestao,
-            "gerado_por": "IA Mirante"
+            "gerado_por": "IA Mirante",
+            "cache": memorizado is not None
         }), 200
         
     except Exception as e:
@@ -175,8 +190,17 @@ def gerar_mensagem():
         
         prompt = prompts.get(tipo_mensagem, prompts['whatsapp'])
         
-        if not Config.OPENAI_API_KEY:
-            # Mensagens simuladas
+        chave = ia_memo.chave("gerar_mensagem", {
+            "tipo": tipo_mensagem if tipo_mensagem in prompts else 'whatsapp',
+            "nome_cliente": nome_cliente,
+            "contexto": contexto
+        })
+        memorizado = ia_memo.get(chave) if llm.configurado else None
+        
+        if memorizado:
+            mensagem = memorizado["mensagem"]
+        elif not llm.disponivel:
+            # Mensagens simuladas (sem API key ou circuito aberto)
             mensagens_simuladas = {
                 'whatsapp': f"Olá {nome_cliente}! 👋 Somos da VIP Mudanças. Podemos ajudar com sua mudança? Entre em contato: (11) 99999-9999",
                 'email': f"Assunto: Sua mudança com a VIP Mudanças\n\nOlá {nome_cliente},\n\nEsperamos que esteja bem! Entramos em contato para apresentar nossos serviços de mudança...",
@@ -185,35 +209,86 @@ def gerar_mensagem():
             mensagem = mensagens_simuladas.get(tipo_mensagem, mensagens_simuladas['whatsapp'])
         else:
             try:
-                response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
+                completion = llm.completar(
+                    [
                         {"role": "system", "content": "Você é um especialista em comunicação para empresa de mudanças."},
                         {"role": "user", "content": prompt}
                     ],
                     max_tokens=200,
-                    temperature=0.8
+                    temperature=0.8,
+                    endpoint="gerar_mensagem"
                 )
-                
-                mensagem = response.choices[0].message.content.strip()
+                mensagem = completion["texto"]
+                ia_memo.set(chave, "gerar_mensagem", {"mensagem": mensagem}, completion)
                 
             except Exception as e:
-                print(f"Erro na API OpenAI: {e}")
+                logging.warning(f"Erro na API OpenAI: {e}")
                 mensagem = f"Olá {nome_cliente}! Somos da VIP Mudanças e gostaríamos de ajudar com sua mudança. Entre em contato conosco!"
         
         return jsonify({
             "tipo": tipo_mensagem,
             "mensagem": mensagem,
-            "gerado_por": "IA Mirante"
+            "gerado_por": "IA Mirante",
+            "cache": memorizado is not None
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+CHAT_SISTEMA = "Você é a IA Mirante, assistente especializada em mudanças residenciais e comerciais da VIP Mudanças."
+CHAT_SIMULADO = "Olá! Sou a IA Mirante. No momento estou em modo simulação. Como posso ajudar com suas vendas e gestão de clientes?"
+CHAT_ERRO = "Desculpe, estou com dificuldades técnicas no momento. Tente novamente em alguns instantes."
+
+def _evento_sse(evento, dados):
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+def _registrar_turno(ao_concluir, resposta, tokens):
+    if ao_concluir is None:
+        return
+    try:
+        ao_concluir(resposta, tokens)
+    except Exception as e:
+        logging.error(f"Erro ao gravar sessão de chat: {e}")
+
+def _chat_stream(mensagens, ao_concluir=None):
+    """Eventos SSE: "token" a cada pedaço e "fim" com uso e latência"""
+    inicio = time.perf_counter()
+    if not llm.disponivel:
+        # Resposta simulada não entra no histórico da sessão
+        yield _evento_sse("token", {"texto": CHAT_SIMULADO})
+        yield _evento_sse("fim", {
+            "resposta": CHAT_SIMULADO,
+            "uso": None,
+            "latencia_ms": round((time.perf_counter() - inicio) * 1000, 1),
+            "assistente": "IA Mirante"
+        })
+        return
+    
+    partes = []
+    try:
+        for tipo, valor in llm.stream(mensagens, max_tokens=250, temperature=0.7):
+            if tipo == "token":
+                partes.append(valor)
+                yield _evento_sse("token", {"texto": valor})
+            else:
+                _registrar_turno(ao_concluir, "".join(partes), valor["uso"]["total_tokens"])
+                yield _evento_sse("fim", {"resposta": "".join(partes), **valor, "assistente": "IA Mirante"})
+    except Exception as e:
+        logging.warning(f"Erro na API OpenAI: {e}")
+        if not partes:
+            yield _evento_sse("token", {"texto": CHAT_ERRO})
+        yield _evento_sse("fim", {
+            "resposta": "".join(partes) or CHAT_ERRO,
+            "uso": None,
+            "latencia_ms": round((time.perf_counter() - inicio) * 1000, 1),
+            "erro": str(e),
+            "assistente": "IA Mirante"
+        })
+
 @ia_bp.route('/chat', methods=['POST'])
 @jwt_required()
 def chat_ia():
-    """IA Mirante - Chat interativo para vendedores"""
+    """IA Mirante - Chat interativo para vendedores (JSON ou SSE com "stream": true)"""
     try:
         data = request.get_json()
         pergunta = data.get('pergunta', '')
@@ -229,31 +304,88 @@ def chat_ia():
         Máximo 200 palavras.
         """
         
-        if not Config.OPENAI_API_KEY:
-            resposta = "Olá! Sou a IA Mirante. No momento estou em modo simulação. Como posso ajudar com suas vendas e gestão de clientes?"
+        # Com sessao_id o histórico fica no servidor: janela recente + resumo
+        sessao_id = str(data.get('sessao_id') or '').strip()
+        ao_concluir = None
+        if sessao_id:
+            sessao = chat_sessoes.carregar(get_jwt_identity(), sessao_id)
+            if chat_sessoes.excedeu_orcamento(sessao):
+                return jsonify({"error": "Limite de tokens da sessão atingido; inicie uma nova sessão"}), 429
+            mensagens = chat_sessoes.mensagens(sessao, CHAT_SISTEMA, prompt)
+            
+            def ao_concluir(resposta, tokens):
+                chat_sessoes.registrar(sessao, pergunta, resposta, tokens)
+        else:
+            mensagens = [
+                {"role": "system", "content": CHAT_SISTEMA},
+                {"role": "user", "content": prompt}
+            ]
+        
+        # Streaming: tokens chegam ao vendedor assim que o modelo os gera
+        if data.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+            return Response(
+                stream_with_context(_chat_stream(mensagens, ao_concluir)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
+        tokens = 0
+        if not llm.disponivel:
+            # Resposta simulada não entra no histórico da sessão
+            resposta = CHAT_SIMULADO
         else:
             try:
-                response = openai.ChatCompletion.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "Você é a IA Mirante, assistente especializada em mudanças residenciais e comerciais da VIP Mudanças."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=250,
-                    temperature=0.7
-                )
-                
-                resposta = response.choices[0].message.content.strip()
+                completion = llm.completar(mensagens, max_tokens=250, temperature=0.7, endpoint="chat")
+                resposta = completion["texto"]
+                tokens = completion["uso"]["total_tokens"]
+                _registrar_turno(ao_concluir, resposta, tokens)
                 
             except Exception as e:
-                print(f"Erro na API OpenAI: {e}")
-                resposta = "Desculpe, estou com dificuldades técnicas no momento. Tente novamente em alguns instantes."
+                logging.warning(f"Erro na API OpenAI: {e}")
+                resposta = CHAT_ERRO
         
-        return jsonify({
+        resultado = {
             "resposta": resposta,
             "assistente": "IA Mirante"
-        }), 200
+        }
+        if sessao_id:
+            resultado["sessao_id"] = sessao_id
+        return jsonify(resultado), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@ia_bp.route('/chat/sessoes/<sessao_id>', methods=['GET'])
+@jwt_required()
+def get_sessao_chat(sessao_id):
+    """Resumo e turnos recentes de uma sessão de chat do usuário"""
+    try:
+        sessao = chat_sessoes.carregar(get_jwt_identity(), sessao_id)
+        if not sessao.get("versao"):
+            return jsonify({"error": "Sessão não encontrada"}), 404
+        sessao.pop("_id", None)
+        return jsonify({"sessao": sessao}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@ia_bp.route('/chat/sessoes/<sessao_id>', methods=['DELETE'])
+@jwt_required()
+def remover_sessao_chat(sessao_id):
+    """Encerrar uma sessão de chat"""
+    try:
+        if not chat_sessoes.remover(get_jwt_identity(), sessao_id):
+            return jsonify({"error": "Sessão não encontrada"}), 404
+        return jsonify({"message": "Sessão removida"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@ia_bp.route('/status', methods=['GET'])
+@jwt_required()
+def status_ia():
+    """Situação do cliente LLM (circuito e latências por endpoint) e dos caches deste processo"""
+    return jsonify({
+        "llm": llm.stats(),
+        "cache": ia_memo.stats(),
+        "sessoes": chat_sessoes.stats(),
+        "preclassificador": preclassificador.stats()
+    }), 200
@@ -1,16 +1,49 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 from flask_jwt_extended import jwt_required
 from src.models import Lead
+from src.pagination import parse_limit, parse_page, parse_fields
+from datetime import datetime
+import csv
+import io
+import tempfile
 
 leads_bp = Blueprint('leads', __name__)
 
 @leads_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_leads():
-    """Listar todos os leads"""
+    """Listar leads com paginação por cursor"""
     try:
-        leads = Lead.get_all()
-        return jsonify({"leads": leads}), 200
+        limit = parse_limit(request.args.get('limit'))
+        projection = parse_fields(request.args.get('fields'))
+        leads, next_cursor = Lead.get_page(
+            cursor=request.args.get('cursor'),
+            limit=limit,
+            projection=projection
+        )
+        return jsonify({"leads": leads, "next_cursor": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@leads_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_leads():
+    """Buscar leads por nome, email, empresa, cargo ou telefone (sem acentos)"""
+    try:
+        termo = request.args.get('q', '').strip()
+        if not termo:
+            return jsonify({"error": "Parâmetro q é obrigatório"}), 400
+        
+        page = parse_page(request.args.get('page'))
+        limit = parse_limit(request.args.get('limit'))
+        projection = parse_fields(request.args.get('fields'))
+        
+        leads, tem_mais = Lead.search(termo, page=page, limit=limit, projection=projection)
+        return jsonify({"leads": leads, "page": page, "has_more": tem_mais}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -33,6 +66,8 @@ def create_lead():
             "lead_id": lead_id
         }), 201
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -66,46 +101,115 @@ def capturar_leads():
             }
         ]
         
-        leads_criados = []
-        for lead_data in leads_simulados:
-            lead_id = Lead.create(lead_data)
-            leads_criados.append(lead_id)
+        # Upsert em lote: capturas repetidas não duplicam leads
+        resultado = Lead.create_many(leads_simulados)
         
         return jsonify({
-            "message": f"{len(leads_criados)} leads capturados com sucesso",
-            "leads_ids": leads_criados
+            "message": f"{resultado['inserted']} leads capturados com sucesso",
+            "leads_ids": resultado["ids"],
+            "inserted": resultado["inserted"],
+            "updated": resultado["updated"],
+            "skipped": resultado["skipped"]
         }), 201
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Colunas da exportação: (cabeçalho, campo do lead)
+COLUNAS_EXPORTACAO = [
+    ("Nome", "nome"),
+    ("Cargo", "cargo"),
+    ("Empresa", "empresa"),
+    ("Email", "email"),
+    ("Telefone", "telefone"),
+    ("Localização", "localizacao"),
+    ("Status", "status"),
+    ("Data Criação", "created_at")
+]
+
+def _linha_exportacao(lead):
+    """Converter lead em linha da planilha"""
+    linha = []
+    for _, campo in COLUNAS_EXPORTACAO:
+        valor = lead.get(campo, "")
+        if campo == "created_at":
+            valor = valor.strftime("%d/%m/%Y %H:%M") if valor else ""
+        linha.append("" if valor is None else valor)
+    return linha
+
+def _gerar_csv(linhas_por_chunk=500):
+    """Gerar CSV em blocos, sem carregar todos os leads em memória"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    # BOM para o Excel reconhecer UTF-8 (acentos)
+    buffer.write("\ufeff")
+    writer.writerow([cabecalho for cabecalho, _ in COLUNAS_EXPORTACAO])
+    yield buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate(0)
+    
+    campos = [campo for _, campo in COLUNAS_EXPORTACAO]
+    for i, lead in enumerate(Lead.iter_export(campos), start=1):
+        writer.writerow(_linha_exportacao(lead))
+        if i % linhas_por_chunk == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+    
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def _gerar_xlsx():
+    """Gerar XLSX em modo write-only e transmitir o arquivo em blocos"""
+    from openpyxl import Workbook
+    
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet("Leads")
+    planilha.append([cabecalho for cabecalho, _ in COLUNAS_EXPORTACAO])
+    
+    campos = [campo for _, campo in COLUNAS_EXPORTACAO]
+    for lead in Lead.iter_export(campos):
+        planilha.append(_linha_exportacao(lead))
+    
+    # O XLSX é um zip: só pode ser enviado depois de fechado
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as arquivo:
+        workbook.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            chunk = arquivo.read(64 * 1024)
+            if not chunk:
+                break
+            yield chunk
+
 @leads_bp.route('/exportar', methods=['GET'])
 @jwt_required()
 def exportar_leads():
-    """Exportar leads em formato CSV"""
+    """Exportar leads em CSV (padrão) ou XLSX (?formato=xlsx)"""
     try:
-        leads = Lead.get_all()
+        formato = request.args.get('formato', 'csv').lower()
+        nome_arquivo = f"leads_{datetime.utcnow().strftime('%Y%m%d_%H%M')}"
         
-        # Simular exportação CSV (retornar dados estruturados)
-        csv_data = []
-        for lead in leads:
-            csv_data.append({
-                "Nome": lead.get("nome", ""),
-                "Cargo": lead.get("cargo", ""),
-                "Empresa": lead.get("empresa", ""),
-                "Email": lead.get("email", ""),
-                "Telefone": lead.get("telefone", ""),
-                "Localização": lead.get("localizacao", ""),
-                "Status": lead.get("status", ""),
-                "Data Criação": lead.get("created_at", "").strftime("%d/%m/%Y %H:%M") if lead.get("created_at") else ""
-            })
+        if formato == 'xlsx':
+            try:
+                import openpyxl  # noqa: F401
+            except ImportError:
+                return jsonify({"error": "Exportação XLSX indisponível (openpyxl não instalado)"}), 501
+            
+            return Response(
+                _gerar_xlsx(),
+                mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                headers={"Content-Disposition": f"attachment; filename={nome_arquivo}.xlsx"}
+            )
         
-        return jsonify({
-            "message": "Dados preparados para exportação",
-            "data": csv_data,
-            "total": len(csv_data)
-        }), 200
+        if formato != 'csv':
+            return jsonify({"error": "Formato inválido (use csv ou xlsx)"}), 400
+        
+        return Response(
+            _gerar_csv(),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f"attachment; filename={nome_arquivo}.csv"}
+        )
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-
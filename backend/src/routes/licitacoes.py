@@ -1,69 +1,147 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from src.models import Licitacao
-from datetime import datetime
+from src.models import Licitacao, MonitoramentoConfig, MonitoramentoPortal
+from src.pagination import parse_limit, parse_page, parse_fields
+from src.cache import cached
+from src.config import Config
+from src.keywords import PALAVRAS_CHAVE_PADRAO
+from src.monitoramento import normalizar_portais, buscar_em_portais, processar_licitacoes
+from src.editais import pipeline
+from src.similaridade import similaridade, termos_licitacao, tokenizar, CAMPOS
+from bson import ObjectId
+from datetime import datetime, timedelta
+import time
 
 licitacoes_bp = Blueprint('licitacoes', __name__)
 
+def _parse_data(valor):
+    """Converter parâmetro YYYY-MM-DD em datetime"""
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"Data inválida: {valor} (use AAAA-MM-DD)")
+
 @licitacoes_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_licitacoes():
-    """Listar todas as licitações"""
+    """Listar licitações com paginação por cursor"""
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        projection = parse_fields(request.args.get('fields'))
+        licitacoes, next_cursor = Licitacao.get_page(
+            cursor=request.args.get('cursor'),
+            limit=limit,
+            projection=projection
+        )
+        return jsonify({"licitacoes": licitacoes, "next_cursor": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@licitacoes_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_licitacoes():
+    """Buscar licitações por título, descrição, órgão ou texto do edital"""
+    try:
+        termo = request.args.get('q', '').strip()
+        if not termo:
+            return jsonify({"error": "Parâmetro q é obrigatório"}), 400
+        
+        page = parse_page(request.args.get('page'))
+        limit = parse_limit(request.args.get('limit'))
+        projection = parse_fields(request.args.get('fields'))
+        
+        licitacoes, tem_mais = Licitacao.search(termo, page=page, limit=limit, projection=projection)
+        return jsonify({"licitacoes": licitacoes, "page": page, "has_more": tem_mais}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@licitacoes_bp.route('/similares', methods=['GET'])
+@jwt_required()
+def get_similares():
+    """Licitações mais parecidas (cosseno TF-IDF) com uma licitação (?id=) ou texto livre (?q=)"""
     try:
-        licitacoes = Licitacao.get_all()
-        return jsonify({"licitacoes": licitacoes}), 200
+        licitacao_id = request.args.get('id', '').strip()
+        texto = request.args.get('q', '').strip()
+        k = min(parse_limit(request.args.get('k') or 10), 50)
+        
+        if licitacao_id:
+            if not ObjectId.is_valid(licitacao_id):
+                return jsonify({"error": "ID inválido"}), 400
+            referencia = Licitacao.collection.find_one({"_id": ObjectId(licitacao_id)}, CAMPOS)
+            if not referencia:
+                return jsonify({"error": "Licitação não encontrada"}), 404
+            termos = termos_licitacao(referencia)
+        elif texto:
+            termos = tokenizar(texto)
+        else:
+            return jsonify({"error": "Informe id ou q"}), 400
+        
+        inicio = time.perf_counter()
+        ranking = similaridade.similares(termos, k, excluir=licitacao_id or None)
+        tempo_ms = (time.perf_counter() - inicio) * 1000
+        
+        # Manter a ordem do ranking ao buscar os documentos
+        docs = {
+            str(doc["_id"]): doc
+            for doc in Licitacao.collection.find(
+                {"_id": {"$in": [ObjectId(doc_id) for doc_id, _ in ranking]}},
+                Licitacao.PROJECAO_PADRAO
+            )
+        }
+        similares = []
+        for doc_id, score in ranking:
+            doc = docs.get(doc_id)
+            if doc:
+                doc["_id"] = doc_id
+                doc["score"] = score
+                similares.append(doc)
+        
+        return jsonify({
+            "similares": similares,
+            "indice_pronto": similaridade.pronto,
+            "tempo_ms": round(tempo_ms, 3)
+        }), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @licitacoes_bp.route('/buscar', methods=['POST'])
 @jwt_required()
 def buscar_licitacoes():
-    """Simular busca automática de licitações"""
+    """Buscar licitações nos portais"""
     try:
-        data = request.get_json()
-        palavras_chave = data.get('palavras_chave', ['mudança', 'remoção', 'transporte'])
-        
-        # Simular busca em portais (em produção, faria scraping real)
-        licitacoes_simuladas = [
-            {
-                "titulo": "Contratação de serviços de mudança para órgão público",
-                "orgao": "Prefeitura Municipal de São Paulo",
-                "numero": "001/2025",
-                "valor_estimado": 150000.00,
-                "data_abertura": datetime(2025, 7, 15),
-                "data_limite": datetime(2025, 7, 30),
-                "status": "Aberta",
-                "portal": "ComprasNet",
-                "url": "https://comprasnet.gov.br/licitacao/001-2025",
-                "palavras_encontradas": ["mudança", "transporte"],
-                "descricao": "Serviços de mudança e transporte de móveis e equipamentos"
-            },
-            {
-                "titulo": "Remoção de móveis e equipamentos - Hospital Regional",
-                "orgao": "Secretaria de Saúde - RJ",
-                "numero": "002/2025",
-                "valor_estimado": 85000.00,
-                "data_abertura": datetime(2025, 7, 20),
-                "data_limite": datetime(2025, 8, 5),
-                "status": "Aberta",
-                "portal": "SIGA-RJ",
-                "url": "https://siga.rj.gov.br/licitacao/002-2025",
-                "palavras_encontradas": ["remoção"],
-                "descricao": "Serviços de remoção e transporte de equipamentos hospitalares"
-            }
-        ]
-        
-        licitacoes_criadas = []
-        for licitacao_data in licitacoes_simuladas:
-            licitacao_id = Licitacao.create(licitacao_data)
-            licitacoes_criadas.append(licitacao_id)
+        data = request.get_json() or {}
+        palavras_chave = data.get('palavras_chave') or PALAVRAS_CHAVE_PADRAO
+        
+        portais = [portal["nome"] for portal in normalizar_portais(data.get('portais'))]
+        
+        por_portal, erros, validadores = buscar_em_portais(portais)
+        licitacoes_encontradas = []
+        for licitacoes in por_portal.values():
+            licitacoes_encontradas.extend(licitacoes)
+        
+        # Palavras encontradas, relevância e upsert em lote por (portal, numero)
+        resultado = processar_licitacoes(licitacoes_encontradas, palavras_chave, validadores)
         
         return jsonify({
-            "message": f"{len(licitacoes_criadas)} licitações encontradas",
-            "licitacoes_ids": licitacoes_criadas,
-            "palavras_chave_usadas": palavras_chave
+            "message": f"{len(licitacoes_encontradas)} licitações encontradas",
+            "licitacoes_ids": resultado["ids"],
+            "palavras_chave_usadas": palavras_chave,
+            "inserted": resultado["inserted"],
+            "updated": resultado["updated"],
+            "skipped": resultado["skipped"],
+            "erros_portais": erros
         }), 201
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -72,53 +150,101 @@ def buscar_licitacoes():
 def configurar_monitoramento():
     """Configurar monitoramento automático"""
     try:
-        data = request.get_json()
-        palavras_chave = data.get('palavras_chave', [])
-        portais = data.get('portais', [])
+        data = request.get_json() or {}
+        palavras_chave = data.get('palavras_chave') or PALAVRAS_CHAVE_PADRAO
+        portais = normalizar_portais(data.get('portais'))
         email_alertas = data.get('email_alertas', True)
+        ativo = data.get('ativo', True)
         
-        # Simular configuração de monitoramento
-        config_monitoramento = {
-            "palavras_chave": palavras_chave,
-            "portais": portais,
-            "email_alertas": email_alertas,
-            "ativo": True,
-            "ultima_busca": datetime.utcnow(),
-            "configurado_em": datetime.utcnow()
-        }
+        # Persistir configuração; o agendador em background executa as varreduras
+        config_monitoramento = MonitoramentoConfig.salvar(
+            palavras_chave, portais, email_alertas=email_alertas, ativo=ativo
+        )
+        config_monitoramento.pop("_id", None)
         
         return jsonify({
             "message": "Monitoramento configurado com sucesso",
             "configuracao": config_monitoramento
         }), 200
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-@licitacoes_bp.route('/estatisticas', methods=['GET'])
+@licitacoes_bp.route('/monitorar', methods=['GET'])
 @jwt_required()
-def get_estatisticas():
-    """Obter estatísticas das licitações"""
+def get_monitoramento():
+    """Configuração atual e estado das varreduras por portal"""
     try:
-        todas_licitacoes = Licitacao.get_all()
+        config_monitoramento = MonitoramentoConfig.get()
+        if config_monitoramento:
+            config_monitoramento.pop("_id", None)
         
-        # Calcular estatísticas
-        total = len(todas_licitacoes)
-        abertas = len([l for l in todas_licitacoes if l.get('status') == 'Aberta'])
-        urgentes = len([l for l in todas_licitacoes if l.get('data_limite') and 
-                       (l['data_limite'] - datetime.utcnow()).days <= 7])
+        portais = []
+        for portal in MonitoramentoPortal.get_all():
+            portal["nome"] = portal.pop("_id")
+            portais.append(portal)
         
-        valor_total = sum([l.get('valor_estimado', 0) for l in todas_licitacoes])
+        return jsonify({
+            "configuracao": config_monitoramento,
+            "portais": portais
+        }), 200
         
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@licitacoes_bp.route('/editais', methods=['GET'])
+@jwt_required()
+def get_editais():
+    """Situação da fila de editais e métricas de download/extração"""
+    try:
         return jsonify({
-            "estatisticas": {
-                "total": total,
-                "abertas": abertas,
-                "urgentes": urgentes,
-                "valor_total": valor_total
-            }
+            "fila": Licitacao.estatisticas_editais(),
+            "execucao": pipeline.status_job(),
+            "metricas": pipeline.stats()
         }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@licitacoes_bp.route('/editais/processar', methods=['POST'])
+@jwt_required()
+def processar_editais():
+    """Processar em background um lote de editais pendentes"""
+    try:
+        data = request.get_json(silent=True) or {}
+        limite = data.get('limite')
+        limite = parse_limit(limite) if limite is not None else Config.EDITAL_LOTE
+        
+        estado = pipeline.iniciar(limite=limite)
+        if estado is None:
+            return jsonify({"error": "Processamento já está em execução", "execucao": pipeline.status_job()}), 409
+        
+        # Progresso em GET /editais (campo "execucao")
+        return jsonify({"message": "Processamento iniciado", "execucao": estado}), 202
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@licitacoes_bp.route('/estatisticas', methods=['GET'])
+@jwt_required()
+@cached(tags=("licitacoes",))
+def get_estatisticas():
+    """Obter estatísticas das licitações"""
+    try:
+        # Filtro opcional por data de abertura (?inicio=2025-01-01&fim=2025-12-31)
+        inicio = _parse_data(request.args.get('inicio'))
+        fim = _parse_data(request.args.get('fim'))
+        if fim:
+            fim = fim + timedelta(days=1)
+        
+        estatisticas = Licitacao.estatisticas_detalhadas(inicio=inicio, fim=fim)
+        
+        return jsonify({"estatisticas": estatisticas}), 200
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
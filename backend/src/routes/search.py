@@ -0,0 +1,38 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from src.pagination import parse_limit
+from src.typeahead import typeahead
+import time
+
+search_bp = Blueprint('search', __name__)
+
+@search_bp.route('/suggest', methods=['GET'])
+@jwt_required()
+def suggest():
+    """Autocomplete de clientes e leads por nome, empresa ou telefone"""
+    try:
+        termo = request.args.get('q', '').strip()
+        limit = min(parse_limit(request.args.get('limit') or 10), 50)
+        
+        inicio = time.perf_counter()
+        sugestoes = typeahead.suggest(termo, limit) if termo else []
+        tempo_ms = (time.perf_counter() - inicio) * 1000
+        
+        return jsonify({
+            "sugestoes": sugestoes,
+            "indice_pronto": typeahead.pronto,
+            "tempo_ms": round(tempo_ms, 3)
+        }), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@search_bp.route('/suggest/stats', methods=['GET'])
+@jwt_required()
+def suggest_stats():
+    """Tamanho do índice de autocomplete deste processo"""
+    try:
+        return jsonify({"pronto": typeahead.pronto, **typeahead.index.stats()}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
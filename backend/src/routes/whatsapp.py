@@ -4,6 +4,7 @@ import requests
 import json
 from datetime import datetime
 from src.config import Config
+from src.cache import cached, invalidate
 
 whatsapp_bp = Blueprint('whatsapp', __name__)
 
@@ -281,6 +282,7 @@ def criar_campanha():
 
 @whatsapp_bp.route('/bot-config', methods=['GET', 'POST'])
 @jwt_required()
+@cached(ttl=300, tags=("bot_config",))
 def bot_config():
     """Configurar bot de atendimento automático"""
     try:
@@ -307,6 +309,7 @@ def bot_config():
         else:  # POST
             # Atualizar configuração
             nova_config = request.get_json()
+            invalidate("bot_config")
             
             # Em produção, salvar no banco de dados
             return jsonify({
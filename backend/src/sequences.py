@@ -0,0 +1,78 @@
+import os
+import threading
+from datetime import datetime
+from pymongo import ReturnDocument
+from src.config import Config
+from src.database import db
+
+class Sequence:
+    """Numeração sequencial por ano (orçamento, contrato, OS, recibo)"""
+    # Contadores em `counters` com _id "<nome>:<ano>", incrementados com $inc.
+    # Cada processo reserva um bloco de números por ida ao banco; números não
+    # usados por um processo encerrado viram lacunas, nunca duplicidades.
+    collection = db.counters
+
+    _lock = threading.Lock()
+    _blocos = {}  # chave -> [próximo, último]
+
+    @staticmethod
+    def _chave(nome, ano):
+        return f"{nome}:{ano}"
+
+    @staticmethod
+    def reserve(nome, quantidade=1, ano=None):
+        """Reservar um bloco de números consecutivos; retorna (primeiro, último)"""
+        if quantidade < 1:
+            raise ValueError("Quantidade deve ser maior que zero")
+        ano = ano or datetime.utcnow().year
+        contador = Sequence.collection.find_one_and_update(
+            {"_id": Sequence._chave(nome, ano)},
+            {"$inc": {"seq": quantidade}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        ultimo = contador["seq"]
+        return ultimo - quantidade + 1, ultimo
+
+    @staticmethod
+    def next(nome, ano=None):
+        """Próximo número da sequência usando o bloco reservado pelo processo"""
+        ano = ano or datetime.utcnow().year
+        chave = Sequence._chave(nome, ano)
+        with Sequence._lock:
+            bloco = Sequence._blocos.get(chave)
+            if not bloco or bloco[0] > bloco[1]:
+                bloco = list(Sequence.reserve(nome, Config.SEQUENCE_BLOCK_SIZE, ano))
+                Sequence._blocos[chave] = bloco
+            numero = bloco[0]
+            bloco[0] += 1
+        return numero, ano
+
+    @staticmethod
+    def next_formatted(nome, ano=None):
+        """Próximo número no formato 001-2025"""
+        numero, ano = Sequence.next(nome, ano)
+        return Sequence.format(numero, ano)
+
+    @staticmethod
+    def format(numero, ano):
+        return f"{numero:03d}-{ano}"
+
+    @staticmethod
+    def ensure_at_least(nome, valor, ano=None):
+        """Garantir que a sequência não gere números menores ou iguais a `valor`"""
+        ano = ano or datetime.utcnow().year
+        Sequence.collection.update_one(
+            {"_id": Sequence._chave(nome, ano)},
+            {"$max": {"seq": valor}},
+            upsert=True
+        )
+
+    @staticmethod
+    def _reset_after_fork():
+        # Blocos herdados do processo pai seriam usados em duplicidade
+        Sequence._lock = threading.Lock()
+        Sequence._blocos = {}
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=Sequence._reset_after_fork)
@@ -0,0 +1,311 @@
+import logging
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from scipy import sparse
+from src.config import Config
+from src.database import db
+from src.text import normalizar
+
+_PALAVRA = re.compile(r"[0-9a-z]{3,}")
+
+# Palavras muito comuns em editais que não ajudam a diferenciar licitações
+STOPWORDS = frozenset("""
+    para com por das dos nas nos que uma umas uns sua seu suas seus sao ser pelo pela pelos pelas
+    este esta esse essa isso como mais entre sobre sem sob ate ano mes dia item itens lote objeto
+""".split())
+
+CAMPOS = {"titulo": 1, "descricao": 1, "orgao": 1, "edital_termos": 1, "updated_at": 1}
+
+def tokenizar(texto):
+    """Palavras normalizadas (sem acentos) com 3+ caracteres"""
+    return [p for p in _PALAVRA.findall(normalizar(texto)) if p not in STOPWORDS]
+
+def termos_licitacao(doc):
+    """Termos de uma licitação; o título conta em dobro"""
+    termos = tokenizar(doc.get("titulo")) * 2
+    termos += tokenizar(doc.get("descricao"))
+    termos += tokenizar(doc.get("orgao"))
+    # edital_termos já vem normalizado (uma ocorrência por palavra distinta)
+    termos += [t for t in doc.get("edital_termos") or () if t not in STOPWORDS]
+    return termos
+
+class TfidfIndex:
+    """Índice TF-IDF em matriz esparsa (CSR) com inclusão incremental"""
+    # As linhas guardam só o TF sublinear (1 + log tf); o IDF é aplicado
+    # quando a matriz normalizada é montada, então incluir documentos não
+    # exige recalcular as linhas já existentes.
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.vocab = {}                          # termo -> coluna
+        self._df = np.zeros(1024, dtype=np.int32)
+        self.ids = []                            # linha -> id do documento
+        self.posicao = {}                        # id -> linha ativa
+        self._ativos = bytearray()
+        self._tf = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._pendentes = []                     # (colunas, valores) ainda fora da matriz
+        self._matriz = None
+        self._idf = None
+
+    def __len__(self):
+        return len(self.posicao)
+
+    def _linha(self, termos, criar):
+        contagem = {}
+        for termo in termos:
+            coluna = self.vocab.get(termo)
+            if coluna is None:
+                if not criar:
+                    continue
+                coluna = self.vocab[termo] = len(self.vocab)
+            contagem[coluna] = contagem.get(coluna, 0) + 1
+        colunas = np.fromiter(contagem.keys(), dtype=np.int32, count=len(contagem))
+        valores = 1.0 + np.log(np.fromiter(contagem.values(), dtype=np.float32, count=len(contagem)))
+        return colunas, valores.astype(np.float32)
+
+    def _colunas_da_linha(self, linha):
+        if linha < self._tf.shape[0]:
+            return self._tf.indices[self._tf.indptr[linha]:self._tf.indptr[linha + 1]]
+        return self._pendentes[linha - self._tf.shape[0]][0]
+
+    def add(self, doc_id, termos):
+        """Inserir ou substituir um documento"""
+        with self._lock:
+            anterior = self.posicao.pop(doc_id, None)
+            if anterior is not None:
+                self._ativos[anterior] = 0
+                self._df[self._colunas_da_linha(anterior)] -= 1
+
+            colunas, valores = self._linha(termos, criar=True)
+            if len(self.vocab) > len(self._df):
+                self._df = np.concatenate([self._df, np.zeros(max(len(self.vocab), len(self._df)), dtype=np.int32)])
+            self._df[colunas] += 1
+
+            self.posicao[doc_id] = len(self.ids)
+            self.ids.append(doc_id)
+            self._ativos.append(1)
+            self._pendentes.append((colunas, valores))
+            self._matriz = None
+
+    def _consolidar(self):
+        """Juntar as linhas pendentes à matriz CSR"""
+        colunas = len(self.vocab)
+        atual = sparse.csr_matrix(
+            (self._tf.data, self._tf.indices, self._tf.indptr),
+            shape=(self._tf.shape[0], colunas)
+        )
+        if self._pendentes:
+            indptr = np.zeros(len(self._pendentes) + 1, dtype=np.int64)
+            np.cumsum([len(c) for c, _ in self._pendentes], out=indptr[1:])
+            novas = sparse.csr_matrix(
+                (
+                    np.concatenate([v for _, v in self._pendentes]),
+                    np.concatenate([c for c, _ in self._pendentes]),
+                    indptr
+                ),
+                shape=(len(self._pendentes), colunas)
+            )
+            atual = sparse.vstack([atual, novas], format="csr", dtype=np.float32)
+            self._pendentes = []
+        self._tf = atual
+
+    def _preparar(self):
+        """Matriz TF-IDF com linhas normalizadas (recalculada após inclusões)"""
+        if self._matriz is None:
+            self._consolidar()
+            colunas = len(self.vocab)
+            total = max(len(self.posicao), 1)
+            idf = (np.log((1.0 + total) / (1.0 + self._df[:colunas])) + 1.0).astype(np.float32)
+
+            matriz = self._tf.multiply(idf[np.newaxis, :]).tocsr()
+            normas = np.sqrt(np.asarray(matriz.multiply(matriz).sum(axis=1)).ravel())
+            normas[normas == 0] = 1.0
+            # Linhas substituídas ficam zeradas em vez de removidas
+            ativos = np.frombuffer(bytes(self._ativos), dtype=np.uint8).astype(np.float32)
+            self._matriz = (sparse.diags(ativos / normas) @ matriz).tocsr()
+            self._idf = idf
+        return self._matriz, self._idf
+
+    def similares(self, termos, k=10, excluir=None):
+        """Top-k (id, score) por similaridade de cosseno"""
+        with self._lock:
+            matriz, idf = self._preparar()
+            colunas, valores = self._linha(termos, criar=False)
+            if not len(colunas) or not matriz.shape[0]:
+                return []
+            pesos = valores * idf[colunas]
+            pesos /= np.linalg.norm(pesos) or 1.0
+            consulta = sparse.csr_matrix(
+                (pesos, colunas, np.array([0, len(colunas)])),
+                shape=(1, matriz.shape[1])
+            )
+            scores = (matriz @ consulta.T).toarray().ravel()
+            if excluir in self.posicao:
+                scores[self.posicao[excluir]] = 0.0
+
+            k = min(k, len(scores))
+            melhores = np.argpartition(-scores, k - 1)[:k]
+            melhores = melhores[np.argsort(-scores[melhores])]
+            return [(self.ids[i], round(float(scores[i]), 4)) for i in melhores if scores[i] > 0]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documentos": len(self.posicao),
+                "linhas": len(self.ids),
+                "termos": len(self.vocab),
+                "nnz": int(self._tf.nnz) + sum(len(c) for c, _ in self._pendentes)
+            }
+
+    def salvar(self, caminho, ultima_sync):
+        """Gravar o índice em .npz (troca atômica do arquivo)"""
+        with self._lock:
+            self._consolidar()
+            arrays = {
+                "data": self._tf.data,
+                "indices": self._tf.indices,
+                "indptr": self._tf.indptr,
+                "shape": np.array(self._tf.shape, dtype=np.int64),
+                "df": self._df[:len(self.vocab)],
+                "vocab": np.array(list(self.vocab), dtype=str),
+                "ids": np.array(self.ids, dtype=str),
+                "ativos": np.frombuffer(bytes(self._ativos), dtype=np.uint8),
+                "ultima_sync": np.array([ultima_sync.isoformat() if ultima_sync else ""])
+            }
+        diretorio = os.path.dirname(caminho) or "."
+        os.makedirs(diretorio, exist_ok=True)
+        # Temporário no mesmo diretório: os.replace é atômico e leitores nunca veem arquivo parcial
+        descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix=".tfidf-", suffix=".tmp")
+        try:
+            with os.fdopen(descritor, "wb") as arquivo:
+                np.savez(arquivo, **arrays)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            os.replace(temporario, caminho)
+        except BaseException:
+            os.unlink(temporario)
+            raise
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Ler índice salvo; retorna (índice, ultima_sync)"""
+        with np.load(caminho, allow_pickle=False) as dados:
+            index = cls()
+            index.vocab = {termo: coluna for coluna, termo in enumerate(dados["vocab"].tolist())}
+            index._df = dados["df"].astype(np.int32)
+            if not len(index._df):
+                index._df = np.zeros(1024, dtype=np.int32)
+            index.ids = dados["ids"].tolist()
+            index._ativos = bytearray(dados["ativos"].tobytes())
+            index.posicao = {doc_id: linha for linha, doc_id in enumerate(index.ids) if index._ativos[linha]}
+            index._tf = sparse.csr_matrix(
+                (dados["data"], dados["indices"], dados["indptr"]),
+                shape=tuple(dados["shape"])
+            )
+            ultima_sync = str(dados["ultima_sync"][0])
+        return index, datetime.fromisoformat(ultima_sync) if ultima_sync else None
+
+class _Similaridade:
+    """Índice do processo: carregado do disco e sincronizado por updated_at"""
+    # Todos os workers leem o mesmo .npz, mas só o dono do lease `tfidf_arquivo`
+    # o regrava; os demais apenas mantêm o índice em memória.
+
+    collection = db.licitacoes
+    JOB = "tfidf_arquivo"
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.index = TfidfIndex()
+        self.pronto = False
+        self._pid = None
+        self._ultima_sync = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        """Carregar/construir o índice neste processo (uma vez por processo)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._executar, name="tfidf", daemon=True)
+            self._thread.start()
+
+    def _carregar(self, index, desde=None):
+        inicio = datetime.utcnow()
+        filtro = {"updated_at": {"$gte": desde}} if desde else {}
+        total = 0
+        for doc in self.collection.find(filtro, CAMPOS, batch_size=1000):
+            index.add(str(doc["_id"]), termos_licitacao(doc))
+            total += 1
+        self._ultima_sync = inicio
+        return total
+
+    def _salvar(self, caminho):
+        """Gravar o .npz se este processo detém (ou conseguiu) o lease do arquivo"""
+        from src.models import Job
+
+        dono = f"{socket.gethostname()}:{os.getpid()}"
+        duracao = max(3 * Config.TFIDF_REFRESH_SECONDS, 60)
+        if not Job.checkpoint(self.JOB, dono, duracao_segundos=duracao):
+            if Job.reservar(self.JOB, dono, duracao) is None:
+                return False
+        self.index.salvar(caminho, self._ultima_sync)
+        return True
+
+    def _executar(self):
+        caminho = Config.TFIDF_PATH
+        try:
+            inicio = time.perf_counter()
+            if os.path.exists(caminho):
+                self.index, ultima_sync = TfidfIndex.carregar(caminho)
+                # Margem para escritas concorrentes ao salvamento
+                desde = ultima_sync - timedelta(minutes=1) if ultima_sync else None
+                total = self._carregar(self.index, desde=desde)
+            else:
+                total = self._carregar(self.index)
+            self.pronto = True
+            self._salvar(caminho)
+            logging.info(
+                f"TF-IDF: {len(self.index)} licitações ({total} sincronizadas) em {time.perf_counter() - inicio:.1f}s"
+            )
+        except Exception as e:
+            logging.error(f"Erro ao carregar índice TF-IDF: {e}")
+            # Próxima consulta tenta novamente
+            self._pid = None
+            return
+
+        while True:
+            time.sleep(Config.TFIDF_REFRESH_SECONDS)
+            try:
+                stats = self.index.stats()
+                if stats["linhas"] > 2 * max(stats["documentos"], 1000):
+                    # Muitas linhas substituídas: reconstruir e trocar o índice
+                    novo = TfidfIndex()
+                    self._carregar(novo)
+                    self.index = novo
+                elif not self._carregar(self.index, desde=self._ultima_sync):
+                    continue
+                self._salvar(caminho)
+            except Exception as e:
+                logging.error(f"Erro ao sincronizar índice TF-IDF: {e}")
+
+    def similares(self, termos, k=10, excluir=None):
+        self.iniciar()
+        return self.index.similares(termos, k, excluir)
+
+similaridade = _Similaridade()
+
+if hasattr(os, 'register_at_fork'):
+    # Threads não sobrevivem ao fork: cada worker carrega o índice do disco
+    os.register_at_fork(after_in_child=similaridade._reset)
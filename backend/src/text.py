@@ -0,0 +1,26 @@
+import re
+import unicodedata
+
+_ESPACOS = re.compile(r"\s+")
+
+def remover_acentos(texto):
+    """Remover acentos (mudança -> mudanca)"""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+def normalizar(texto):
+    """Texto em minúsculas, sem acentos e com espaços simples"""
+    if not texto:
+        return ""
+    return _ESPACOS.sub(" ", remover_acentos(str(texto)).lower()).strip()
+
+def normalizar_url(url):
+    """URL sem esquema, www e barra final (para comparação)"""
+    url = normalizar(url)
+    url = re.sub(r"^https?://", "", url)
+    url = re.sub(r"^www\.", "", url)
+    return url.rstrip("/")
+
+def somente_digitos(texto):
+    """Manter apenas os dígitos (telefones, CPF/CNPJ)"""
+    return "".join(c for c in str(texto or "") if c.isdigit())
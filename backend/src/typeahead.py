@@ -0,0 +1,232 @@
+import logging
+import os
+import threading
+import time
+from array import array
+from datetime import datetime
+from src.config import Config
+from src.database import db
+from src.text import normalizar, somente_digitos
+
+# Coleções indexadas para autocomplete: tipo -> coleção
+FONTES = {
+    "cliente": db.clientes,
+    "lead": db.leads
+}
+CAMPOS = {"nome": 1, "empresa": 1, "telefone": 1, "updated_at": 1}
+
+class TypeaheadIndex:
+    """Índice de trigramas/prefixos em memória para autocomplete"""
+    # Registros ficam em listas paralelas e as listas de ocorrências são
+    # array('I') de posições, então cada ocorrência custa 4 bytes.
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = []        # id do documento (str)
+        self._tipos = []      # "cliente" / "lead"
+        self._rotulos = []    # (nome, empresa, telefone) para exibição
+        self._textos = []     # texto normalizado para verificação final
+        self._ativos = array('B')
+        self._posicao = {}    # (tipo, id) -> posição
+        self._trigramas = {}  # trigrama -> array('I')
+        self._prefixos = {}   # prefixo de 1-2 letras de uma palavra -> array('I')
+
+    def __len__(self):
+        return len(self._posicao)
+
+    @staticmethod
+    def _texto(doc):
+        partes = [normalizar(doc.get("nome")), normalizar(doc.get("empresa"))]
+        telefone = somente_digitos(doc.get("telefone"))
+        if telefone:
+            partes.append(telefone)
+        return " ".join(p for p in partes if p)
+
+    @staticmethod
+    def _grams(palavra):
+        return {palavra[i:i + 3] for i in range(len(palavra) - 2)}
+
+    def _postar(self, mapa, chave, posicao):
+        lista = mapa.get(chave)
+        if lista is None:
+            lista = mapa[chave] = array('I')
+        lista.append(posicao)
+
+    def add(self, tipo, doc_id, doc):
+        """Inserir ou substituir um registro"""
+        texto = self._texto(doc)
+        with self._lock:
+            anterior = self._posicao.pop((tipo, doc_id), None)
+            if anterior is not None:
+                self._ativos[anterior] = 0
+            if not texto:
+                return
+
+            posicao = len(self._ids)
+            self._ids.append(doc_id)
+            self._tipos.append(tipo)
+            self._rotulos.append((doc.get("nome") or "", doc.get("empresa") or "", doc.get("telefone") or ""))
+            self._textos.append(texto)
+            self._ativos.append(1)
+            self._posicao[(tipo, doc_id)] = posicao
+
+            grams = set()
+            prefixos = set()
+            for palavra in texto.split():
+                grams |= self._grams(palavra)
+                prefixos.add(palavra[:1])
+                prefixos.add(palavra[:2])
+            for gram in grams:
+                self._postar(self._trigramas, gram, posicao)
+            for prefixo in prefixos:
+                self._postar(self._prefixos, prefixo, posicao)
+
+    def _candidatos(self, palavra):
+        if len(palavra) < 3:
+            return self._prefixos.get(palavra[:2], ())
+        listas = [self._trigramas.get(gram) for gram in self._grams(palavra)]
+        if any(lista is None for lista in listas):
+            return ()
+        listas.sort(key=len)
+        resultado = set(listas[0])
+        for lista in listas[1:]:
+            resultado.intersection_update(lista)
+            if not resultado:
+                break
+        return resultado
+
+    def suggest(self, termo, limit=10):
+        """Sugestões para o termo digitado (prefixo de palavra ou trecho)"""
+        palavras = normalizar(termo).split()
+        digitos = somente_digitos(termo)
+        if digitos and len(digitos) >= 3 and digitos not in palavras:
+            palavras = [p for p in palavras if not p.isdigit()] + [digitos]
+        if not palavras:
+            return []
+
+        with self._lock:
+            candidatos = None
+            for palavra in sorted(palavras, key=len, reverse=True):
+                encontrados = self._candidatos(palavra)
+                candidatos = set(encontrados) if candidatos is None else candidatos.intersection(encontrados)
+                if not candidatos:
+                    return []
+
+            resultados = []
+            for posicao in candidatos:
+                if not self._ativos[posicao]:
+                    continue
+                texto = self._textos[posicao]
+                palavras_texto = texto.split()
+                if not all(p in texto for p in palavras):
+                    continue
+                # Prefixo de palavra vale mais que trecho no meio
+                prefixos = sum(1 for p in palavras if any(w.startswith(p) for w in palavras_texto))
+                resultados.append((-prefixos, len(texto), posicao))
+
+            resultados.sort()
+            sugestoes = []
+            for _, _, posicao in resultados[:limit]:
+                nome, empresa, telefone = self._rotulos[posicao]
+                sugestoes.append({
+                    "tipo": self._tipos[posicao],
+                    "id": self._ids[posicao],
+                    "nome": nome,
+                    "empresa": empresa,
+                    "telefone": telefone
+                })
+            return sugestoes
+
+    def stats(self):
+        with self._lock:
+            return {
+                "registros": len(self._posicao),
+                "posicoes": len(self._ids),
+                "trigramas": len(self._trigramas),
+                "ocorrencias": sum(len(l) for l in self._trigramas.values())
+                               + sum(len(l) for l in self._prefixos.values())
+            }
+
+class _Typeahead:
+    """Índice do processo: construído em background e sincronizado por updated_at"""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.index = TypeaheadIndex()
+        self.pronto = False
+        self._pid = None
+        self._ultima_sync = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        """Construir o índice neste processo (uma vez por processo)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._executar, name="typeahead", daemon=True)
+            self._thread.start()
+
+    def _carregar(self, index, desde=None):
+        inicio = datetime.utcnow()
+        total = 0
+        for tipo, collection in FONTES.items():
+            filtro = {"updated_at": {"$gte": desde}} if desde else {}
+            for doc in collection.find(filtro, CAMPOS, batch_size=2000):
+                index.add(tipo, str(doc["_id"]), doc)
+                total += 1
+        self._ultima_sync = inicio
+        return total
+
+    def _executar(self):
+        try:
+            inicio = time.perf_counter()
+            total = self._carregar(self.index)
+            self.pronto = True
+            logging.info(f"Autocomplete: {total} registros indexados em {time.perf_counter() - inicio:.1f}s")
+        except Exception as e:
+            logging.error(f"Erro ao construir índice de autocomplete: {e}")
+            # Próxima consulta tenta construir novamente
+            self._pid = None
+            return
+
+        # Escritas feitas em outros workers chegam pela sincronização incremental
+        while True:
+            time.sleep(Config.TYPEAHEAD_REFRESH_SECONDS)
+            try:
+                stats = self.index.stats()
+                if stats["posicoes"] > 2 * max(stats["registros"], 1000):
+                    # Muitas posições substituídas: reconstruir e trocar o índice
+                    novo = TypeaheadIndex()
+                    self._carregar(novo)
+                    self.index = novo
+                else:
+                    self._carregar(self.index, desde=self._ultima_sync)
+            except Exception as e:
+                logging.error(f"Erro ao sincronizar autocomplete: {e}")
+
+    def atualizar(self, tipo, doc_id, doc):
+        """Hook chamado pelos modelos após criar/atualizar"""
+        if self._pid == os.getpid():
+            self.index.add(tipo, str(doc_id), doc)
+
+    def atualizar_lote(self, tipo, docs):
+        """Hook das importações em lote (docs com _id e os campos de CAMPOS)"""
+        if self._pid == os.getpid():
+            for doc in docs:
+                self.index.add(tipo, str(doc["_id"]), doc)
+
+    def suggest(self, termo, limit=10):
+        self.iniciar()
+        return self.index.suggest(termo, limit)
+
+typeahead = _Typeahead()
+
+if hasattr(os, 'register_at_fork'):
+    # Threads não sobrevivem ao fork: cada worker reconstrói o seu índice
+    os.register_at_fork(after_in_child=typeahead._reset)
@@ -0,0 +1,48 @@
+import os
+import sys
+# Mesmo ajuste de caminho usado em main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.main import app
+from src.config import Config
+
+def _post_fork(server, worker):
+    """Iniciar tarefas em background em cada worker (threads não sobrevivem ao fork)"""
+    from src.typeahead import typeahead
+    typeahead.iniciar()
+    if Config.MONITOR_ENABLED:
+        from src.monitoramento import scheduler
+        scheduler.iniciar()
+
+def run():
+    """Servidor de produção com múltiplos workers (gunicorn)"""
+    from gunicorn.app.base import BaseApplication
+
+    class VIPApplication(BaseApplication):
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    options = {
+        "bind": Config.WEB_BIND,
+        "workers": Config.WEB_CONCURRENCY,
+        "threads": Config.WEB_THREADS,
+        "worker_class": "gthread",
+        # App carregado uma vez no master; cada worker cria seu cliente MongoDB após o fork
+        "preload_app": True,
+        "timeout": 60,
+        "accesslog": "-",
+        "post_fork": _post_fork
+    }
+    VIPApplication(app, options).run()
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,33 @@
+import importlib.util
+import os
+import sys
+
+import mongomock
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import Database
+
+
+@pytest.fixture
+def mongo():
+    """Banco em memória no lugar do MongoDB do processo"""
+    client = mongomock.MongoClient()
+    anterior = (Database._client, Database._db, Database._pid)
+    Database._client = client
+    Database._db = client.get_database("vip_mudancas_test")
+    Database._pid = os.getpid()
+    yield Database._db
+    Database._client, Database._db, Database._pid = anterior
+
+
+@pytest.fixture
+def modelos(mongo, monkeypatch):
+    """Módulo src/models.py (o pacote src/models/ tem o mesmo nome e o esconde no import)"""
+    caminho = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "models.py")
+    spec = importlib.util.spec_from_file_location("src.models", caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, "src.models", modulo)
+    spec.loader.exec_module(modulo)
+    return modulo
@@ -0,0 +1,34 @@
+from flask import Flask, jsonify
+
+from src import cache
+from src.cache import ResponseCache, cached, invalidate
+
+
+def test_invalidacao_em_outro_worker_descarta_resposta(mongo, monkeypatch):
+    contador = {"total": 1}
+    worker_a, worker_b = ResponseCache(), ResponseCache()
+    monkeypatch.setattr(cache, "get_jwt_identity", lambda: None)
+    monkeypatch.setattr(cache, "response_cache", worker_a)
+
+    app = Flask(__name__)
+
+    @app.route("/contagem")
+    @cached(tags=("clientes",))
+    def contagem():
+        return jsonify({"total": contador["total"]})
+
+    cliente = app.test_client()
+    assert cliente.get("/contagem").headers["X-Cache"] == "MISS"
+    assert cliente.get("/contagem").headers["X-Cache"] == "HIT"
+
+    # Escrita atendida pelo worker B: o cache local de A continua com a entrada
+    contador["total"] = 2
+    monkeypatch.setattr(cache, "response_cache", worker_b)
+    invalidate("clientes")
+    monkeypatch.setattr(cache, "response_cache", worker_a)
+    assert worker_a.stats()["entries"] == 1
+
+    resposta = cliente.get("/contagem")
+    assert resposta.headers["X-Cache"] == "MISS"
+    assert resposta.get_json() == {"total": 2}
+    assert cliente.get("/contagem").headers["X-Cache"] == "HIT"
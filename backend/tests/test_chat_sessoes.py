@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from src.chat_sessoes import ChatSessoes
+
+
+def _textos(sessao):
+    return [turno["texto"] for turno in sessao["turnos"] if turno["papel"] == "user"]
+
+
+def test_copia_local_desatualizada_e_relida_do_mongo(modelos):
+    worker_a, worker_b = ChatSessoes(), ChatSessoes()
+
+    worker_a.registrar(worker_a.carregar("u1", "s1"), "primeira", "ok")
+    worker_b.registrar(worker_b.carregar("u1", "s1"), "segunda", "ok")
+
+    sessao = worker_a.carregar("u1", "s1")
+    assert _textos(sessao) == ["primeira", "segunda"]
+    assert sessao["versao"] == 2
+
+
+def test_sessao_removida_em_outro_worker_nao_ressuscita(modelos):
+    worker_a, worker_b = ChatSessoes(), ChatSessoes()
+
+    sessao_a = worker_a.registrar(worker_a.carregar("u1", "s1"), "antiga", "ok")
+    assert worker_b.remover("u1", "s1")
+
+    # Cópia local ainda em memória no worker A
+    assert worker_a.carregar("u1", "s1")["versao"] == 0
+
+    # Mesmo registrando sobre a cópia antiga, o histórico removido não volta
+    sessao = worker_a.registrar(sessao_a, "nova", "ok")
+    assert _textos(sessao) == ["nova"]
+    assert _textos(modelos.ChatSessao.get("u1:s1")) == ["nova"]
+
+
+def test_sessao_expirada_ainda_nao_removida_pelo_ttl(modelos):
+    modelos.ChatSessao.collection.insert_one({
+        "_id": "u1:s1", "user": "u1", "sessao_id": "s1", "turnos": [], "resumo": "antigo",
+        "tokens_usados": 0, "versao": 3, "expira_em": datetime.utcnow() - timedelta(minutes=1)
+    })
+    chat = ChatSessoes()
+
+    sessao = chat.carregar("u1", "s1")
+    assert sessao["versao"] == 0
+
+    sessao = chat.registrar(sessao, "oi", "ok")
+    assert sessao["versao"] == 1
+    gravada = modelos.ChatSessao.get("u1:s1")
+    assert gravada["versao"] == 1
+    assert gravada["resumo"] == ""
+    assert chat.metricas["conflitos"] == 0
+
+
+def test_resposta_simulada_nao_entra_no_historico(modelos, monkeypatch):
+    from src.config import Config
+    from src.routes.ia import _chat_stream, CHAT_SIMULADO
+
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "")
+    turnos = []
+    eventos = list(_chat_stream([], ao_concluir=lambda resposta, tokens: turnos.append(resposta)))
+
+    assert CHAT_SIMULADO in eventos[0]
+    assert turnos == []
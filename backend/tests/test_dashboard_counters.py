@@ -0,0 +1,28 @@
+def _contadores(modelos):
+    return modelos.DashboardCounters.collection.find_one({"_id": "global"})["clientes"]
+
+
+def test_mudanca_de_status_transfere_a_contagem(modelos):
+    Cliente = modelos.Cliente
+    primeiro = Cliente.create({"nome": "Ana", "email": "ana@gmail.com"})
+    Cliente.create({"nome": "Bia", "email": "bia@gmail.com"})
+    assert _contadores(modelos) == {"novo": 2}
+
+    assert Cliente.update(primeiro, {"status": "Em Negociação"})
+    assert _contadores(modelos) == {"novo": 1, "em negociação": 1}
+
+    # Mesmo status (ou mesma chave) não mexe nos contadores
+    assert Cliente.update(primeiro, {"status": "Em Negociação"})
+    assert Cliente.update(primeiro, {"status": "em negociação"})
+    assert _contadores(modelos) == {"novo": 1, "em negociação": 1}
+
+
+def test_contadores_batem_com_a_reconciliacao(modelos):
+    Cliente = modelos.Cliente
+    ids = [Cliente.create({"nome": f"C{i}", "status": "Novo"}) for i in range(3)]
+    Cliente.update(ids[0], {"status": "Fechado"})
+    Cliente.update(ids[1], {"status": "Perdido"})
+
+    incremental = _contadores(modelos)
+    reconstruido = modelos.DashboardCounters.rebuild()["clientes"]
+    assert {k: v for k, v in incremental.items() if v} == reconstruido
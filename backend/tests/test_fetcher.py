@@ -0,0 +1,104 @@
+import json
+import sys
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.config import Config
+from src.fetcher import fetcher
+from src.monitoramento import buscar_em_portais, processar_licitacoes
+
+
+class _Portal:
+    """Página de listagem com ETag que muda a cada nova versão"""
+
+    def __init__(self):
+        self.versao = 1
+        self.pedidos = []
+
+    def itens(self):
+        return [{"numero": f"{self.versao}/2025", "titulo": "Serviços de mudança", "descricao": ""}]
+
+
+@pytest.fixture
+def portal(mongo, monkeypatch):
+    estado = _Portal()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            etag = f'"v{estado.versao}"'
+            estado.pedidos.append(self.headers.get("If-None-Match"))
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            corpo = json.dumps(estado.itens()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    monkeypatch.setattr(Config, "PORTAL_ENDPOINTS", {"ComprasNet": f"http://127.0.0.1:{servidor.server_port}/licitacoes"})
+    monkeypatch.setattr(Config, "FETCH_PAGES_PER_PORTAL", 1)
+    yield estado
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def gravacoes(monkeypatch):
+    """Licitacao.create_many que registra os lotes e pode falhar sob demanda"""
+    registro = {"lotes": [], "falhar": False}
+
+    class Licitacao:
+        @staticmethod
+        def create_many(licitacoes):
+            if registro["falhar"]:
+                raise RuntimeError("falha de escrita")
+            registro["lotes"].append([l["numero"] for l in licitacoes])
+            return {"inserted": len(licitacoes), "updated": 0, "skipped": 0, "ids": []}
+
+    monkeypatch.setitem(sys.modules, "src.models", types.SimpleNamespace(Licitacao=Licitacao))
+    return registro
+
+
+def _varrer():
+    por_portal, erros, validadores = buscar_em_portais(["ComprasNet"])
+    assert erros == {}
+    processar_licitacoes(por_portal["ComprasNet"], validadores=validadores)
+    return por_portal["ComprasNet"]
+
+
+def test_etag_so_e_gravado_depois_dos_itens(portal, gravacoes):
+    # 200: itens gravados e ETag guardado
+    assert [l["numero"] for l in _varrer()] == ["1/2025"]
+    assert fetcher.cache_collection.count_documents({"etag": '"v1"'}) == 1
+
+    # 304: nada novo
+    assert _varrer() == []
+    assert portal.pedidos[-1] == '"v1"'
+
+    # Página muda e a gravação falha: o ETag novo não pode ser guardado
+    portal.versao = 2
+    gravacoes["falhar"] = True
+    with pytest.raises(RuntimeError):
+        _varrer()
+    assert fetcher.cache_collection.count_documents({"etag": '"v2"'}) == 0
+
+    # Nova tentativa recebe a página inteira de novo
+    gravacoes["falhar"] = False
+    assert [l["numero"] for l in _varrer()] == ["2/2025"]
+    assert portal.pedidos[-1] == '"v1"'
+    assert gravacoes["lotes"] == [["1/2025"], [], ["2/2025"]]
+
+    assert _varrer() == []
+    assert portal.pedidos[-1] == '"v2"'
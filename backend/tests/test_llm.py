@@ -0,0 +1,138 @@
+import threading
+
+import pytest
+
+from src.config import Config
+from src.llm import CircuitBreaker, LLMClient, LLMError, LLMIndisponivel
+
+
+class _ErroServico(Exception):
+    status_code = 503
+
+
+def _resultado(texto):
+    return {"texto": texto, "modelo": "teste", "uso": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            "latencia_ms": 0.0}
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "teste")
+    monkeypatch.setattr(Config, "LLM_MAX_CONCURRENCY", 4)
+    monkeypatch.setattr(Config, "WEB_CONCURRENCY", 1)
+    monkeypatch.setattr(Config, "LLM_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(Config, "LLM_BREAKER_OPEN_SECONDS", 30)
+    monkeypatch.setattr(Config, "LLM_HEDGE_AFTER_MS", 0)
+    liberar = threading.Event()
+    cliente = LLMClient()
+    yield cliente, liberar
+    # Tentativas presas no modelo falso terminam antes do próximo teste
+    liberar.set()
+
+
+def test_circuito_abre_testa_uma_chamada_e_fecha():
+    circuito = CircuitBreaker(falhas=2, aberto_segundos=0)
+    assert circuito.permitir()
+    circuito.falha()
+    assert circuito.estado == CircuitBreaker.FECHADO
+    circuito.falha()
+    assert circuito.estado == CircuitBreaker.ABERTO
+
+    # Intervalo vencido: uma única chamada de teste passa
+    assert circuito.permitir()
+    assert circuito.estado == CircuitBreaker.MEIO_ABERTO
+    assert not circuito.permitir()
+
+    # Teste cancelado devolve a vez; falha no teste reabre; sucesso fecha
+    circuito.cancelar()
+    assert circuito.estado == CircuitBreaker.ABERTO
+    assert circuito.permitir()
+    circuito.falha()
+    assert circuito.estado == CircuitBreaker.ABERTO
+    assert circuito.permitir()
+    circuito.sucesso()
+    assert circuito.estado == CircuitBreaker.FECHADO
+    assert circuito.stats()["aberturas"] == 2
+
+
+def test_falhas_do_modelo_abrem_o_circuito(cliente):
+    cliente, _ = cliente
+    chamadas = []
+
+    def chamar(*argumentos):
+        chamadas.append(argumentos)
+        raise _ErroServico("indisponível")
+    cliente._ensure_client()
+    cliente._chamar = chamar
+
+    for _ in range(2):
+        with pytest.raises(_ErroServico):
+            cliente.completar([], endpoint="teste")
+    with pytest.raises(LLMIndisponivel):
+        cliente.completar([], endpoint="teste")
+
+    assert len(chamadas) == 2
+    stats = cliente.stats()
+    assert stats["circuito"]["estado"] == CircuitBreaker.ABERTO
+    assert stats["circuito"]["recusadas"] == 1
+    assert stats["endpoints"]["teste"]["erros"] == 2
+
+
+def test_erro_de_validacao_nao_conta_para_o_circuito(cliente):
+    cliente, _ = cliente
+
+    class _Invalido(Exception):
+        status_code = 400
+
+    def chamar(*argumentos):
+        raise _Invalido("pedido inválido")
+    cliente._ensure_client()
+    cliente._chamar = chamar
+
+    for _ in range(3):
+        with pytest.raises(_Invalido):
+            cliente.completar([])
+    assert cliente.circuito.estado == CircuitBreaker.FECHADO
+
+
+def test_hedge_vence_quando_a_primeira_tentativa_atrasa(cliente, monkeypatch):
+    cliente, liberar = cliente
+    monkeypatch.setattr(Config, "LLM_HEDGE_AFTER_MS", 20)
+    tentativas = []
+    lock = threading.Lock()
+
+    def chamar(*argumentos):
+        with lock:
+            tentativas.append(len(tentativas) + 1)
+            numero = len(tentativas)
+        if numero == 1:
+            liberar.wait(5)
+            return _resultado("lenta")
+        return _resultado("rápida")
+    cliente._ensure_client()
+    cliente._chamar = chamar
+
+    resultado = cliente.completar([], endpoint="teste", timeout=2)
+
+    assert resultado["texto"] == "rápida"
+    assert cliente.metricas["hedges"] == 1
+    assert cliente.metricas["hedges_vencedores"] == 1
+    assert cliente.stats()["endpoints"]["teste"]["total_tokens"] == 2
+
+
+def test_sem_hedge_estoura_o_orcamento_de_latencia(cliente, monkeypatch):
+    cliente, liberar = cliente
+    monkeypatch.setattr(Config, "LLM_HEDGE_AFTER_MS", 20)
+
+    def chamar(*argumentos):
+        liberar.wait(5)
+        return _resultado("lenta")
+    cliente._ensure_client()
+    cliente._chamar = chamar
+
+    with pytest.raises(LLMError, match="Tempo limite"):
+        cliente.completar([], endpoint="teste", timeout=0.1, hedge=False)
+
+    assert cliente.metricas["hedges"] == 0
+    assert cliente.metricas["timeouts"] == 1
+    assert cliente.stats()["endpoints"]["teste"]["timeouts"] == 1
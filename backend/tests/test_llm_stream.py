@@ -0,0 +1,103 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.config import Config
+from src.llm import llm
+
+TOKENS = ["Olá", ", ", "mundo"]
+
+
+class _ModeloFalso(BaseHTTPRequestHandler):
+    """Chat completions em streaming: um pedaço por token e um último só com o uso"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _pedaco(self, dados):
+        bloco = f"data: {dados}\n\n".encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(bloco), bloco))
+        self.wfile.flush()
+
+    def do_POST(self):
+        corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        base = {"id": "x", "object": "chat.completion.chunk", "created": 0, "model": corpo["model"]}
+        try:
+            for token in TOKENS:
+                self._pedaco(json.dumps({**base, "choices": [
+                    {"index": 0, "delta": {"content": token}, "finish_reason": None}
+                ]}))
+                time.sleep(0.05)
+            self._pedaco(json.dumps({**base, "choices": [], "usage": {
+                "prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8
+            }}))
+            self._pedaco("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def modelo(modelos, monkeypatch):
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _ModeloFalso)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    monkeypatch.setattr(Config, "OPENAI_API_KEY", "teste")
+    monkeypatch.setattr(Config, "OPENAI_BASE_URL", f"http://127.0.0.1:{servidor.server_port}/v1")
+    llm._reset()
+    yield
+    llm._reset()
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _eventos(blocos):
+    eventos = []
+    for bloco in blocos:
+        nome, dados = bloco.strip().split("\n")
+        eventos.append((nome.removeprefix("event: "), json.loads(dados.removeprefix("data: "))))
+    return eventos
+
+
+def test_stream_repassa_tokens_e_fim_com_uso(modelo):
+    from src.routes.ia import _chat_stream
+
+    turnos = []
+    eventos = _eventos(_chat_stream(
+        [{"role": "user", "content": "oi"}],
+        ao_concluir=lambda resposta, tokens: turnos.append((resposta, tokens))
+    ))
+
+    assert [nome for nome, _ in eventos] == ["token", "token", "token", "fim"]
+    assert [dados["texto"] for _, dados in eventos[:-1]] == TOKENS
+    fim = eventos[-1][1]
+    assert fim["resposta"] == "Olá, mundo"
+    assert fim["uso"] == {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8}
+    assert fim["primeiro_token_ms"] is not None
+    assert turnos == [("Olá, mundo", 8)]
+    assert llm.metricas["em_andamento"] == 0
+
+
+def test_desconexao_no_meio_do_stream_libera_a_vaga(modelo):
+    from src.routes.ia import _chat_stream
+
+    gerador = _chat_stream([{"role": "user", "content": "oi"}])
+    nome, dados = _eventos([next(gerador)])[0]
+    assert (nome, dados["texto"]) == ("token", "Olá")
+    assert llm.metricas["em_andamento"] == 1
+
+    # Flask fecha o gerador quando o cliente desconecta
+    gerador.close()
+
+    assert llm.metricas["em_andamento"] == 0
+    assert all(llm._vagas.acquire(blocking=False) for _ in range(llm.limite))
+    # A chamada interrompida depois do primeiro token também entra nas métricas
+    assert llm.stats()["endpoints"]["chat_stream"]["chamadas"] == 1
+    assert llm.circuito.estado == "fechado"
@@ -0,0 +1,28 @@
+import ast
+import os
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def _all_do_pacote():
+    with open(os.path.join(SRC, "models", "__init__.py"), encoding="utf-8") as arquivo:
+        arvore = ast.parse(arquivo.read())
+    for no in arvore.body:
+        if isinstance(no, ast.Assign) and any(getattr(alvo, "id", None) == "__all__" for alvo in no.targets):
+            return set(ast.literal_eval(no.value))
+    return set()
+
+
+def test_pacote_src_models_reexporta_tudo_que_o_codigo_importa():
+    # `src.models` é o pacote src/models/: classe nova em models.py precisa ser reexportada
+    importados = set()
+    for raiz, _, arquivos in os.walk(SRC):
+        for nome in arquivos:
+            if not nome.endswith(".py"):
+                continue
+            with open(os.path.join(raiz, nome), encoding="utf-8") as arquivo:
+                for no in ast.walk(ast.parse(arquivo.read())):
+                    if isinstance(no, ast.ImportFrom) and no.module == "src.models":
+                        importados.update(alias.name for alias in no.names)
+
+    assert importados - _all_do_pacote() == set()
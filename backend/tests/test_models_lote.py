@@ -0,0 +1,53 @@
+from datetime import datetime
+
+
+def test_lead_do_formulario_nao_duplica_na_importacao(modelos):
+    Lead = modelos.Lead
+    lead = {"nome": "Ana Souza", "empresa": "Acme", "cargo": "Gerente",
+            "linkedin_url": "https://www.linkedin.com/in/ana-souza/"}
+    Lead.create(lead)
+
+    resultado = Lead.create_many([{**lead, "cargo": "Diretora"}])
+
+    assert resultado["inserted"] == 0
+    assert resultado["updated"] == 1
+    assert Lead.collection.count_documents({}) == 1
+    assert Lead.collection.find_one()["cargo"] == "Diretora"
+
+
+def test_backfill_de_fingerprint_preserva_duplicados_antigos(modelos):
+    Lead = modelos.Lead
+    antigo = {"nome": "Ana Souza", "empresa": "Acme", "created_at": datetime(2024, 1, 1)}
+    Lead.collection.insert_many([dict(antigo), dict(antigo), {"nome": "", "empresa": "Sem nome"}])
+
+    assert Lead.backfill_fingerprint() == 3
+    fingerprints = [doc["fingerprint"] for doc in Lead.collection.find().sort("_id", 1)]
+    assert fingerprints == [Lead.fingerprint(antigo), None, None]
+    assert Lead.backfill_fingerprint() == 0
+
+
+def test_create_many_e_idempotente(modelos):
+    Licitacao = modelos.Licitacao
+    lote = [
+        {"portal": "ComprasNet", "numero": "1/2025", "titulo": "Mudança"},
+        {"portal": "ComprasNet", "numero": "2/2025", "titulo": "Remoção"},
+        {"portal": "ComprasNet", "numero": "2/2025", "titulo": "Remoção"},
+        {"portal": "ComprasNet", "titulo": "Sem número"},
+    ]
+
+    primeiro = Licitacao.create_many(lote)
+    assert (primeiro["inserted"], primeiro["updated"], primeiro["skipped"]) == (2, 0, 2)
+    carimbo = Licitacao.collection.find_one({"numero": "1/2025"})["updated_at"]
+
+    # Reimportar sem mudanças não altera nada, nem updated_at
+    segundo = Licitacao.create_many(lote)
+    assert (segundo["inserted"], segundo["updated"], segundo["skipped"]) == (0, 0, 4)
+    assert Licitacao.collection.find_one({"numero": "1/2025"})["updated_at"] == carimbo
+
+    terceiro = Licitacao.create_many([{"portal": "ComprasNet", "numero": "1/2025", "titulo": "Mudança de sede"}])
+    assert (terceiro["inserted"], terceiro["updated"], terceiro["skipped"]) == (0, 1, 0)
+    doc = Licitacao.collection.find_one({"numero": "1/2025"})
+    assert doc["titulo"] == "Mudança de sede"
+    assert doc["updated_at"] > carimbo
+    assert doc["status"] == "Aberta"
+    assert Licitacao.collection.count_documents({}) == 2
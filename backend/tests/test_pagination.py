@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import pytest
+
+from src.pagination import decode_cursor, encode_cursor, paginate
+
+
+def _percorrer(collection, limit):
+    vistos, cursor = [], None
+    while True:
+        docs, cursor = paginate(collection, cursor=cursor, limit=limit)
+        vistos.extend(doc["_id"] for doc in docs)
+        if cursor is None:
+            return vistos
+
+
+def test_empates_em_created_at_e_datas_nulas_nao_perdem_nem_repetem(mongo):
+    mesmo_instante = datetime(2025, 3, 1, 12, 0)
+    mongo.leads.insert_many(
+        [{"nome": f"empate {i}", "created_at": mesmo_instante} for i in range(5)]
+        + [{"nome": "recente", "created_at": datetime(2025, 4, 1)}]
+        + [{"nome": f"sem data {i}", "created_at": None} for i in range(3)]
+        + [{"nome": "sem campo"}]
+    )
+    esperado = [
+        str(doc["_id"]) for doc in mongo.leads.find().sort([("created_at", -1), ("_id", -1)])
+    ]
+
+    for limit in (1, 2, 3, 4):
+        assert _percorrer(mongo.leads, limit) == esperado
+
+    # Mais recente primeiro; documentos sem data no fim
+    assert esperado[0] == str(mongo.leads.find_one({"nome": "recente"})["_id"])
+
+
+def test_cursor_invalido():
+    assert decode_cursor(encode_cursor({"_id": "0" * 24, "created_at": None}))[0] is None
+    with pytest.raises(ValueError):
+        decode_cursor("nao-e-um-cursor")
@@ -0,0 +1,18 @@
+import pytest
+
+from src.pdf_templates import PDFTemplate, renderizar
+
+
+def test_modelo_sem_montar_falha_ao_instanciar():
+    class SemMontar(PDFTemplate):
+        nome = "incompleto"
+        titulo = "INCOMPLETO"
+
+    with pytest.raises(TypeError):
+        SemMontar()
+
+
+@pytest.mark.parametrize("modelo", ["contrato", "ordem_servico", "recibo"])
+def test_modelos_renderizam_pdf(modelo):
+    pdf = renderizar(modelo, {"numero": "2025-0001", "cliente_nome": "Maria Souza", "valor": 1500})
+    assert pdf.startswith(b"%PDF-")
@@ -0,0 +1,48 @@
+import pytest
+
+from src import perfil
+from src.config import Config
+from src.llm import LLMError
+
+
+@pytest.mark.parametrize("resposta, esperado", [
+    ("Perfil: AA\nEmpresa de grande porte.", "AA"),
+    ("AA - empresa de grande porte", "AA"),
+    ("**B**\nCliente residencial.", "B"),
+    ("Classificação: A. Empresa média.", "A"),
+    ("\nPerfil: B\n", "B"),
+    ("Apesar de informar empresa, não há dados suficientes.", None),
+    ("A empresa parece ser de médio porte.", None),
+    ("Análise inconclusiva\nPerfil: AA", None),
+    ("", None),
+])
+def test_extrair_perfil_so_aceita_classificacao_explicita(resposta, esperado):
+    assert perfil.extrair_perfil(resposta) == esperado
+
+
+@pytest.fixture
+def llm_responde(modelos, monkeypatch):
+    monkeypatch.setattr(Config, "PERFIL_CONFIANCA_MINIMA", 1.01)
+
+    def responder(texto):
+        monkeypatch.setattr(perfil.llm, "completar", lambda *a, **k: {
+            "texto": texto, "modelo": "teste", "uso": {"total_tokens": 1}, "latencia_ms": 0.0
+        })
+    return responder
+
+
+def test_resposta_sem_classificacao_e_falha(llm_responde):
+    llm_responde("Apesar de tudo, difícil dizer.")
+
+    with pytest.raises(LLMError):
+        perfil.analisar_perfil("Paulo", "paulo@gmail.com", "", "Paulo Reformas")
+
+    resultado = perfil.analisar_perfil("Paulo", "paulo@gmail.com", "", "Paulo Reformas", fallback=True)
+    assert resultado["origem"] == "regras"
+
+
+def test_resposta_classificada_vem_do_modelo(llm_responde):
+    llm_responde("Perfil: AA\nEmpresa com potencial alto.")
+
+    resultado = perfil.analisar_perfil("Paulo", "paulo@gmail.com", "", "Paulo Reformas")
+    assert (resultado["perfil"], resultado["origem"]) == ("AA", "ia")
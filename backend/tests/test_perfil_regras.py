@@ -0,0 +1,52 @@
+import pytest
+
+from src.config import Config
+from src.perfil_regras import PreClassificador
+
+# (nome, e-mail, telefone, empresa) -> perfil esperado; None = caso misto, vai ao LLM
+CASOS = [
+    (("Maria Souza", "maria@gmail.com", "11987654321", ""), "B"),
+    (("Carlos Lima", "", "11987654321", ""), "B"),
+    (("Lia Campos", "lia@acme.com.br", "11987654321", ""), "B"),
+    (("João Pereira", "joao@acme.com.br", "1133334444", "Acme Ltda"), "A"),
+    (("João Pereira", "joao@acme.com.br", "11987654321", "Acme Ltda"), "A"),
+    (("Ana Ramos", "ana@educacao.sp.gov.br", "", "Escola Estadual Rui Barbosa"), "AA"),
+    (("Ana Ramos", "ana@campinas.sp.gov.br", "1932321000", "Prefeitura de Campinas"), "AA"),
+    (("Rita Alves", "rita@bancoalfa.com.br", "08007771234", "Banco Alfa S.A."), "AA"),
+    (("Paulo Neto", "paulo@gmail.com", "11987654321", "Paulo Reformas"), None),
+    (("Bruno Dias", "bruno@hotmail.com", "", "Dias Transportes"), None),
+]
+
+
+@pytest.fixture
+def preclassificador(monkeypatch):
+    monkeypatch.setattr(Config, "PERFIL_CONFIANCA_MINIMA", 0.7)
+    return PreClassificador(pesos={})
+
+
+@pytest.mark.parametrize("dados, esperado", CASOS)
+def test_casos_representativos(preclassificador, dados, esperado):
+    resultado = preclassificador.classificar(*dados)
+    decidido = preclassificador.decidir(resultado)
+
+    if esperado is None:
+        assert not decidido, resultado
+    else:
+        assert decidido, resultado
+        assert resultado["perfil"] == esperado
+
+
+def test_fracao_decidida_sem_llm(preclassificador):
+    for dados, _ in CASOS:
+        preclassificador.decidir(preclassificador.classificar(*dados))
+
+    stats = preclassificador.stats()
+    assert stats["decididos"] == 8
+    assert stats["enviados_llm"] == 2
+    assert stats["fracao_decidida"] == 0.8
+
+
+def test_me_e_mei_nao_casam_com_nome_de_pessoa(preclassificador):
+    assert "nome_empresarial" not in preclassificador.sinais("Tiago Me", "", "", "")
+    assert "nome_empresarial" not in preclassificador.sinais("Mei Ling", "", "", "")
+    assert "nome_empresarial" in preclassificador.sinais("Padaria Silva Ltda", "", "", "")
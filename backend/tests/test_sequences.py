@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+
+import src.sequences as sequences
+from src.config import Config
+from src.sequences import Sequence
+
+
+@pytest.fixture
+def relogio(mongo, monkeypatch):
+    """Controlar o "agora" da sequência e começar sem blocos reservados"""
+    agora = {"valor": datetime(2025, 12, 31, 23, 59)}
+
+    class Relogio(datetime):
+        @classmethod
+        def utcnow(cls):
+            return agora["valor"]
+
+    monkeypatch.setattr(sequences, "datetime", Relogio)
+    monkeypatch.setattr(Config, "SEQUENCE_BLOCK_SIZE", 10)
+    Sequence._reset_after_fork()
+    yield agora
+    Sequence._reset_after_fork()
+
+
+def test_numeracao_recomeca_na_virada_do_ano(relogio):
+    assert Sequence.next_formatted("orcamento") == "001-2025"
+    assert Sequence.next_formatted("orcamento") == "002-2025"
+
+    relogio["valor"] = datetime(2026, 1, 1, 0, 1)
+    assert Sequence.next_formatted("orcamento") == "001-2026"
+    assert Sequence.next_formatted("orcamento") == "002-2026"
+
+    # Outra sequência e o ano anterior seguem independentes
+    assert Sequence.next_formatted("contrato") == "001-2026"
+    assert Sequence.next_formatted("orcamento", ano=2025) == "003-2025"
+
+
+def test_blocos_de_processos_diferentes_nao_se_repetem(relogio):
+    primeiro = [Sequence.next("recibo")[0] for _ in range(3)]
+    # Outro processo (após fork) reserva o bloco seguinte
+    Sequence._reset_after_fork()
+    segundo = [Sequence.next("recibo")[0] for _ in range(3)]
+
+    assert primeiro == [1, 2, 3]
+    assert segundo == [11, 12, 13]
+
+
+def test_ensure_at_least_nao_volta_a_numeracao(relogio):
+    Sequence.ensure_at_least("orcamento", 41)
+    assert Sequence.next("orcamento") == (42, 2025)
+    Sequence.ensure_at_least("orcamento", 5)
+    assert Sequence.reserve("orcamento")[0] == 52
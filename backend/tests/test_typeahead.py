@@ -0,0 +1,18 @@
+import os
+
+from bson import ObjectId
+
+from src.typeahead import typeahead
+
+
+def test_update_de_cliente_inexistente_nao_entra_no_autocomplete(modelos, monkeypatch):
+    # Índice ativo neste processo, sem a thread de construção
+    monkeypatch.setattr(typeahead, "_pid", os.getpid())
+    monkeypatch.setattr(typeahead, "index", type(typeahead.index)())
+
+    assert modelos.Cliente.update(str(ObjectId()), {"nome": "Fantasma Silva"}) is False
+    assert typeahead.suggest("fantasma") == []
+
+    cliente_id = modelos.Cliente.create({"nome": "Maria Souza", "email": "maria@gmail.com"})
+    assert modelos.Cliente.update(cliente_id, {"nome": "Mariana Souza"}) is True
+    assert [s["id"] for s in typeahead.suggest("mariana")] == [cliente_id]